@@ -79,7 +79,10 @@ class ClassSchedule(models.Model):
     
     def available_spots(self):
         """Calculate available spots for this specific schedule"""
-        booked_count = self.bookings.filter(status='confirmed').count()
+        # Listings annotate confirmed_count instead of counting per schedule
+        booked_count = getattr(self, 'confirmed_count', None)
+        if booked_count is None:
+            booked_count = self.bookings.filter(status='confirmed').count()
         return max(0, self.effective_capacity - booked_count)
 
 
@@ -1,3 +1,18 @@
-from django.test import TestCase
+from bookings import urls
+from core.testing import QueryBudgetTestCase, budget
 
-# Create your tests here.
+
+class BookingsQueryBudgetTests(QueryBudgetTestCase):
+    """Query and render-time budgets for bookings/urls.py"""
+    urlpatterns = urls.urlpatterns
+    namespace = 'bookings'
+    budgets = {
+        'book_class': budget(5),
+        'my_bookings': budget(11),
+        'cancel_booking': budget(5, kwargs=lambda data: {'booking_id': data.booking.id}),
+    }
+
+    def test_book_class_post_budget(self):
+        """Booking a session is the busiest write path"""
+        entry = budget(11, method='post', data=lambda data: {'schedule_id': data.open_schedule.id})
+        self.assertWithinBudget('member', 'book_class', entry)
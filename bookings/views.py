@@ -3,6 +3,7 @@ from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.utils import timezone
 from django.db import transaction
+from django.db.models import Count, Prefetch, Q
 from datetime import datetime, timedelta
 from .models import GymClass, Booking, ClassSchedule
 from .forms import BookingForm
@@ -13,14 +14,16 @@ def book_class(request):
     """Book a class"""
     # Get all active classes with their upcoming schedules
     today = timezone.now().date()
-    classes = GymClass.objects.filter(is_active=True).prefetch_related('schedules').order_by('name')
-    
-    # Filter schedules to only show upcoming ones
-    for gym_class in classes:
-        gym_class.upcoming_schedules = gym_class.schedules.filter(
-            class_date__gte=today,
-            is_active=True
-        ).order_by('class_date', 'class_time')
+    # Only upcoming schedules, with their confirmed bookings counted in the same query
+    upcoming_schedules = ClassSchedule.objects.filter(
+        class_date__gte=today,
+        is_active=True
+    ).annotate(
+        confirmed_count=Count('bookings', filter=Q(bookings__status='confirmed'))
+    ).order_by('class_date', 'class_time')
+    classes = GymClass.objects.filter(is_active=True).select_related('trainer__user').prefetch_related(
+        Prefetch('schedules', queryset=upcoming_schedules, to_attr='upcoming_schedules')
+    ).order_by('name')
     
     if request.method == 'POST':
         schedule_id = request.POST.get('schedule_id')
@@ -1,3 +1,16 @@
-from django.test import TestCase
+from community import urls
+from core.testing import QueryBudgetTestCase, budget
 
-# Create your tests here.
+
+class CommunityQueryBudgetTests(QueryBudgetTestCase):
+    """Query and render-time budgets for community/urls.py"""
+    urlpatterns = urls.urlpatterns
+    namespace = 'community'
+    budgets = {
+        'feed': budget(26),
+        'create_post': budget(3),
+        'like_post': budget(8, method='post', kwargs=lambda data: {'post_id': data.post.id}),
+        'challenges': budget(5),
+        'challenge_detail': budget(17, kwargs=lambda data: {'challenge_id': data.challenge.id}),
+        'join_challenge': budget(7, method='post', kwargs=lambda data: {'challenge_id': data.challenge.id}),
+    }
@@ -1,10 +1,28 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
+from django.db.models import Count, Max
+from core.conditional import conditional_page
 from .models import Post, Comment, Like, Challenge, UserChallenge
 from .forms import PostForm
 
 
+def _feed_fingerprint(request):
+    # Likes save their post, so they move Max(updated_at) too
+    return tuple(Post.objects.aggregate(last=Max('updated_at'), count=Count('id')).values())
+
+
+def _challenge_fingerprint(request, challenge_id):
+    # None for an unknown challenge, so the view answers with its 404
+    return (
+        Challenge.objects.filter(id=challenge_id)
+        .annotate(joined=Count('participants'), progress=Max('participants__updated_at'))
+        .values_list('updated_at', 'joined', 'progress')
+        .first()
+    )
+
+
+@conditional_page(_feed_fingerprint)
 def feed(request):
     """Community feed"""
     posts = Post.objects.all().order_by('-created_at')[:20]
@@ -75,6 +93,7 @@ def challenges(request):
     return render(request, 'community/challenges.html', context)
 
 
+@conditional_page(_challenge_fingerprint)
 def challenge_detail(request, challenge_id):
     """Challenge detail page"""
     challenge = get_object_or_404(Challenge, id=challenge_id)
@@ -1,6 +1,6 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
-from .models import CustomUser, MembershipPlan, Subscription, Trainer, UserPoints, UserStreak, QRCodeSession, PlanFeature
+from .models import CustomUser, MembershipPlan, Subscription, Trainer, UserPoints, UserStreak, QRCodeSession, PlanFeature, Visit
 
 
 @admin.register(CustomUser)
@@ -115,3 +115,13 @@ class QRCodeSessionAdmin(admin.ModelAdmin):
     search_fields = ['user__username', 'session_token']
     ordering = ['-created_at']
     readonly_fields = ['created_at', 'session_token']
+
+
+@admin.register(Visit)
+class VisitAdmin(admin.ModelAdmin):
+    """Admin interface for Visit"""
+    list_display = ['user', 'visited_at', 'door', 'method']
+    list_filter = ['method', 'door', 'visited_at']
+    search_fields = ['user__username']
+    ordering = ['-visited_at']
+    raw_id_fields = ['user']
@@ -0,0 +1,59 @@
+"""
+Conditional GET for public and member pages
+
+conditional_page wraps Django's condition() decorator: a view supplies a
+cheap fingerprint of the data it renders (page-cache versions, or a
+Max('updated_at') / Count() aggregate), which is hashed together with who is
+viewing and today's date into an ETag. A returning browser that sends the
+ETag back gets a 304 before the view queries or renders anything.
+
+No Last-Modified is sent: the pages mix content timestamps with per-visitor
+state and deletions that a single date cannot express, and If-None-Match
+takes precedence in every client that would send both.
+"""
+import hashlib
+
+from django.utils import timezone
+from django.views.decorators.http import condition
+
+
+def viewer_key(request):
+    """Who the page is rendered for (the navigation differs per user)"""
+    user = request.user
+    return user.pk if user.is_authenticated else 'anonymous'
+
+
+def access_key(user):
+    """
+    The inputs of workouts.utils access checks for `user`: trainers see
+    everything, members what their active plan includes.
+    """
+    from workouts.utils import workout_access_scope
+
+    if not user.is_authenticated:
+        return None
+    scope, plan_id = workout_access_scope(user)
+    return 'trainer' if scope == 'all' else plan_id
+
+
+def conditional_page(fingerprint):
+    """
+    Answer If-None-Match with 304 when the page's data has not changed.
+
+    Args:
+        fingerprint: Function of (request, *args, **kwargs) returning a value
+                     that changes whenever the rendered page would; None
+                     skips conditional handling
+    """
+    def etag(request, *args, **kwargs):
+        # Flash messages are shown once, so a page carrying them is never cached
+        storage = getattr(request, '_messages', None)
+        if storage is not None and len(storage):
+            return None
+        value = fingerprint(request, *args, **kwargs)
+        if value is None:
+            return None
+        key = repr((viewer_key(request), timezone.localdate().isoformat(), value))
+        return hashlib.md5(key.encode()).hexdigest()
+
+    return condition(etag_func=etag)
@@ -0,0 +1,26 @@
+"""
+Per-connection database setup
+
+SQLite's defaults (rollback journal, full fsync, no busy wait) make
+concurrent writers fail fast with "database is locked". Every new SQLite
+connection switches to WAL, so readers never block the writer, relaxes fsync
+to synchronous=NORMAL (safe with WAL) and waits up to busy_timeout for the
+write lock. Write transactions start with BEGIN IMMEDIATE (the
+'transaction_mode' option in settings.DATABASES), so a transaction takes the
+lock up front instead of failing when it upgrades from a read.
+"""
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+
+@receiver(connection_created)
+def configure_sqlite_connection(sender, connection, **kwargs):
+    """Apply the SQLite PRAGMAs from settings to a new connection"""
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        # In-memory test databases stay in 'memory' journal mode
+        cursor.execute(f'PRAGMA journal_mode={settings.SQLITE_JOURNAL_MODE}')
+        cursor.execute(f'PRAGMA synchronous={settings.SQLITE_SYNCHRONOUS}')
+        cursor.execute(f'PRAGMA busy_timeout={int(settings.SQLITE_BUSY_TIMEOUT_MS)}')
@@ -0,0 +1,68 @@
+"""
+Shared pieces of the bulk importers
+
+ImportResult collects an import's counts and per-row errors, and read_rows
+streams the rows of an uploaded CSV or JSON Lines file with their line
+numbers. Used by workouts.importer and core.member_import.
+"""
+import csv
+import json
+
+from django.core.exceptions import ValidationError
+
+# Errors kept in the result; a file that is wrong throughout should not fill memory
+MAX_ERRORS = 1000
+
+
+class ImportResult:
+    """Counts and per-row errors of one import"""
+
+    def __init__(self):
+        self.rows = 0
+        self.created = 0
+        self.skipped = 0
+        self.errors = []
+        self.error_count = 0
+
+    def add_error(self, line, message):
+        self.error_count += 1
+        if len(self.errors) < MAX_ERRORS:
+            self.errors.append((line, message))
+
+
+def _text_lines(lines):
+    """Decode an iterable of byte (or text) lines, dropping a leading BOM"""
+    for index, line in enumerate(lines):
+        if isinstance(line, bytes):
+            line = line.decode('utf-8')
+        if index == 0:
+            line = line.lstrip('﻿')
+        yield line
+
+
+def read_rows(lines, file_format):
+    """
+    Stream (line number, row dict) pairs from a CSV or JSONL file.
+
+    Args:
+        lines: Iterable of lines, e.g. an open file or an UploadedFile
+        file_format: 'csv' or 'jsonl'
+    """
+    lines = _text_lines(lines)
+    if file_format == 'csv':
+        reader = csv.DictReader(lines)
+        for row in reader:
+            yield reader.line_num, row
+        return
+    for number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            yield number, ValidationError(f'Invalid JSON: {e}')
+            continue
+        if not isinstance(row, dict):
+            yield number, ValidationError('Each line must be a JSON object.')
+            continue
+        yield number, row
@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand
+
+from core.models import QRCodeSession, Visit
+
+
+class Command(BaseCommand):
+    help = 'Create Visit rows for historic check-ins recorded on used QR code sessions'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000, help='QR sessions processed per batch')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        sessions = QRCodeSession.objects.filter(used_at__isnull=False).order_by('id')
+        last_id = 0
+        created = 0
+
+        while True:
+            batch = list(
+                sessions.filter(id__gt=last_id).values_list('id', 'user_id', 'used_at')[:batch_size]
+            )
+            if not batch:
+                break
+            last_id = batch[-1][0]
+
+            # Skip check-ins that already have a visit, so the command can be re-run
+            existing = set(
+                Visit.objects.filter(
+                    user_id__in={user_id for _, user_id, _ in batch},
+                    visited_at__in={used_at for _, _, used_at in batch},
+                ).values_list('user_id', 'visited_at')
+            )
+            visits = [
+                Visit(user_id=user_id, visited_at=used_at, method='qr')
+                for _, user_id, used_at in batch
+                if (user_id, used_at) not in existing
+            ]
+            Visit.objects.bulk_create(visits, batch_size=batch_size)
+            created += len(visits)
+            self.stdout.write(f'Processed QR sessions up to id {last_id} ({created} visits created)')
+
+        self.stdout.write(self.style.SUCCESS(f'Backfilled {created} visits.'))
@@ -0,0 +1,251 @@
+"""
+Benchmark hot views and utilities against the current database.
+
+Seed first (`manage.py seed_gym`), then e.g.:
+
+    python manage.py benchmark --output bench/before.json
+    ... apply an optimization ...
+    python manage.py benchmark --output bench/after.json --compare bench/before.json
+
+Views go through the Django test client, so middleware, templates and
+sessions are included. Each iteration that writes runs in a transaction that
+is rolled back, so runs do not change the data being measured.
+"""
+import json
+import logging
+import platform
+import subprocess
+import time
+from pathlib import Path
+
+import django
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Count
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from bookings.models import Booking, ClassSchedule
+from community.models import Post
+from core.models import CustomUser, Subscription, UserPoints
+from core.utils import award_points_and_update_streak, generate_qr_code
+from workouts.models import UserWorkoutCompletion, Workout
+
+
+class Rollback(Exception):
+    """Raised inside an atomic block to discard a benchmark iteration's writes"""
+
+
+def run_and_rollback(func):
+    try:
+        with transaction.atomic():
+            result = func()
+            raise Rollback
+    except Rollback:
+        return result
+
+
+class Command(BaseCommand):
+    help = 'Time hot views and utilities (p50/p95/p99 latency, query counts) and write JSON results'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=50, help='Timed runs per benchmark')
+        parser.add_argument('--warmup', type=int, default=3, help='Untimed runs before timing')
+        parser.add_argument('--only', nargs='+', metavar='NAME', help='Run only these benchmarks')
+        parser.add_argument('--cold', action='store_true', help='Clear the cache before every run')
+        parser.add_argument('--output', help='Write results to this JSON file')
+        parser.add_argument('--compare', help='Earlier results JSON to compare against')
+
+    def handle(self, *args, **options):
+        member = self.pick_member()
+        staff = CustomUser.objects.filter(is_staff=True).order_by('id').first()
+        if member is None or staff is None:
+            raise CommandError(
+                'Needs at least one member and one staff user. Run `manage.py seed_gym` first '
+                '(it creates a staff account too), or add one with `manage.py createsuperuser`.'
+            )
+
+        benchmarks = self.build_benchmarks(member, staff)
+        if options['only']:
+            unknown = set(options['only']) - set(benchmarks)
+            if unknown:
+                raise CommandError(f"Unknown benchmarks: {', '.join(sorted(unknown))}. Choose from {', '.join(benchmarks)}.")
+            benchmarks = {name: benchmarks[name] for name in options['only']}
+
+        # Every slow run would otherwise log a query-budget warning
+        logging.getLogger('core.middleware').setLevel(logging.ERROR)
+
+        results = {}
+        for name, func in benchmarks.items():
+            results[name] = self.measure(func, options['iterations'], options['warmup'], options['cold'])
+            self.stdout.write(self.format_row(name, results[name]))
+
+        report = {'meta': self.metadata(options), 'results': results}
+
+        if options['compare']:
+            self.compare(report, options['compare'])
+
+        if options['output']:
+            path = Path(options['output'])
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(json.dumps(report, indent=2, default=str))
+            self.stdout.write(self.style.SUCCESS(f'Results written to {path}'))
+
+    # Setup
+
+    def pick_member(self):
+        """The busiest member with an active subscription (worst case for member pages)"""
+        active = Subscription.objects.filter(status='active').values('user_id')
+        return (
+            CustomUser.objects.filter(is_staff=False, id__in=active)
+            .annotate(completions=Count('workout_completions'))
+            .order_by('-completions', 'id')
+            .first()
+        ) or CustomUser.objects.filter(is_staff=False).order_by('id').first()
+
+    def client_for(self, user):
+        # The test client's default host is not in ALLOWED_HOSTS outside tests
+        hosts = [host for host in settings.ALLOWED_HOSTS if host and '*' not in host]
+        host = hosts[0].lstrip('.') if hosts else 'localhost'
+        client = Client(HTTP_HOST=host)
+        client.force_login(user)
+        return client
+
+    def build_benchmarks(self, member, staff):
+        member_client = self.client_for(member)
+        staff_client = self.client_for(staff)
+
+        schedule = (
+            ClassSchedule.objects.filter(is_active=True, gym_class__is_active=True, class_date__gte=timezone.localdate())
+            .exclude(bookings__user=member)
+            .order_by('class_date', 'class_time')
+            .first()
+        )
+
+        def get(client, url):
+            def run():
+                response = client.get(url)
+                if response.status_code >= 400:
+                    raise CommandError(f'GET {url} returned {response.status_code}')
+                return response
+            return run
+
+        def book_class_post():
+            if schedule is None:
+                raise CommandError('No upcoming class session to book; seed more schedules.')
+            return run_and_rollback(
+                lambda: member_client.post(reverse('bookings:book_class'), {'schedule_id': schedule.id})
+            )
+
+        return {
+            'library': get(member_client, reverse('workouts:library')),
+            'book_class_get': get(member_client, reverse('bookings:book_class')),
+            'book_class_post': book_class_post,
+            'dashboard': get(member_client, reverse('dashboard')),
+            'feed': get(member_client, reverse('community:feed')),
+            'reports_dashboard': get(staff_client, reverse('staff:reports')),
+            'generate_qr_code': lambda: generate_qr_code(member),
+            'award_points_and_update_streak': lambda: run_and_rollback(
+                lambda: award_points_and_update_streak(member, points=10, source='workout', description='Benchmark')
+            ),
+        }
+
+    # Measurement
+
+    def measure(self, func, iterations, warmup, cold):
+        for _ in range(warmup):
+            if cold:
+                cache.clear()
+            func()
+
+        durations = []
+        query_counts = []
+        for _ in range(iterations):
+            if cold:
+                cache.clear()
+            with CaptureQueriesContext(connection) as queries:
+                start = time.perf_counter()
+                func()
+                durations.append((time.perf_counter() - start) * 1000)
+            # Savepoint statements from the rollback wrapper are not the code under test
+            query_counts.append(sum(
+                1 for query in queries.captured_queries if 'SAVEPOINT' not in query['sql'].upper()
+            ))
+
+        durations = np.array(durations)
+        query_counts = np.array(query_counts)
+        p50, p95, p99 = np.percentile(durations, [50, 95, 99])
+        return {
+            'iterations': iterations,
+            'p50_ms': round(float(p50), 2),
+            'p95_ms': round(float(p95), 2),
+            'p99_ms': round(float(p99), 2),
+            'mean_ms': round(float(durations.mean()), 2),
+            'min_ms': round(float(durations.min()), 2),
+            'max_ms': round(float(durations.max()), 2),
+            'queries_p50': int(np.median(query_counts)),
+            'queries_max': int(query_counts.max()),
+        }
+
+    def format_row(self, name, result):
+        return (
+            f"{name:32} p50 {result['p50_ms']:9.2f} ms  p95 {result['p95_ms']:9.2f} ms  "
+            f"p99 {result['p99_ms']:9.2f} ms  queries {result['queries_p50']:4d} (max {result['queries_max']})"
+        )
+
+    def metadata(self, options):
+        try:
+            commit = subprocess.run(
+                ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                cwd=settings.BASE_DIR, timeout=5,
+            ).stdout.strip() or None
+        except (OSError, subprocess.SubprocessError):
+            commit = None
+
+        return {
+            'commit': commit,
+            'timestamp': timezone.now().isoformat(),
+            'database': connection.vendor,
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'iterations': options['iterations'],
+            'warmup': options['warmup'],
+            'cold_cache': options['cold'],
+            'rows': {
+                'users': CustomUser.objects.count(),
+                'workouts': Workout.objects.count(),
+                'class_schedules': ClassSchedule.objects.count(),
+                'bookings': Booking.objects.count(),
+                'user_points': UserPoints.objects.count(),
+                'workout_completions': UserWorkoutCompletion.objects.count(),
+                'posts': Post.objects.count(),
+            },
+        }
+
+    def compare(self, report, baseline_path):
+        try:
+            baseline = json.loads(Path(baseline_path).read_text())
+        except (OSError, ValueError) as e:
+            raise CommandError(f'Could not read {baseline_path}: {e}')
+
+        self.stdout.write(f"\nCompared with {baseline_path} (commit {baseline['meta'].get('commit')}):")
+        for name, result in report['results'].items():
+            before = baseline['results'].get(name)
+            if before is None:
+                self.stdout.write(f'{name:32} (not in baseline)')
+                continue
+            change = (result['p50_ms'] - before['p50_ms']) / before['p50_ms'] * 100 if before['p50_ms'] else 0.0
+            line = (
+                f"{name:32} p50 {before['p50_ms']:9.2f} -> {result['p50_ms']:9.2f} ms ({change:+6.1f}%)  "
+                f"queries {before['queries_p50']} -> {result['queries_p50']}"
+            )
+            if change <= -5:
+                line = self.style.SUCCESS(line)
+            elif change >= 5:
+                line = self.style.WARNING(line)
+            self.stdout.write(line)
@@ -0,0 +1,57 @@
+import csv
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.member_import import BATCH_SIZE, import_members
+
+
+class Command(BaseCommand):
+    help = 'Import members (and their subscriptions) from a CSV, e.g. an export of the previous system'
+
+    def add_arguments(self, parser):
+        parser.add_argument('file', help='.csv file, one member per row')
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE, help='Users inserted per bulk_create')
+        parser.add_argument('--workers', type=int, default=None, help='Password hashing processes (default: CPU count)')
+        parser.add_argument(
+            '--reset-links',
+            help='Write a CSV of password reset links for members imported without a password',
+        )
+        parser.add_argument(
+            '--base-url', default='http://localhost:8000',
+            help='Scheme and host of the reset links (default: %(default)s)',
+        )
+
+    def handle(self, *args, **options):
+        reset_links = [] if options['reset_links'] else None
+        started = time.perf_counter()
+        try:
+            with open(options['file'], 'rb') as lines:
+                result = import_members(
+                    lines,
+                    batch_size=options['batch_size'],
+                    workers=options['workers'],
+                    reset_links=reset_links,
+                    base_url=options['base_url'],
+                )
+        except (OSError, ValueError) as e:
+            raise CommandError(f'Could not read the import: {e}')
+        elapsed = time.perf_counter() - started
+
+        for line, message in result.errors:
+            self.stderr.write(f'Line {line}: {message}')
+        if result.error_count > len(result.errors):
+            self.stderr.write(f'... and {result.error_count - len(result.errors)} more errors')
+
+        if reset_links:
+            with open(options['reset_links'], 'w', newline='') as output:
+                writer = csv.writer(output)
+                writer.writerow(['email', 'username', 'reset_url'])
+                writer.writerows(reset_links)
+            self.stdout.write(f'Wrote {len(reset_links)} password reset links to {options["reset_links"]}.')
+
+        summary = (
+            f'Created {result.created} of {result.rows} members in {elapsed:.1f}s '
+            f'({result.skipped} already existed, {result.error_count} with errors).'
+        )
+        self.stdout.write(self.style.WARNING(summary) if result.error_count else self.style.SUCCESS(summary))
@@ -0,0 +1,244 @@
+"""
+Concurrent booking load test.
+
+Fires one booking request per user at the same ClassSchedule, all released
+at once from threads or processes, then checks that confirmed bookings never
+exceed the session's effective_capacity. Runs against whatever database
+DATABASES points at (SQLite file or PostgreSQL); the in-memory test database
+cannot be shared between workers.
+
+    python manage.py loadtest_booking --users 200 --capacity 20 --workers 32
+    python manage.py loadtest_booking --mode processes --workers 16
+
+Exits with an error if the session was overbooked.
+"""
+import logging
+import multiprocessing
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import time as dt_time, timedelta
+
+import numpy as np
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+
+LOADTEST_PREFIX = 'loadtest_'
+
+# Statements that wait for a lock: the row lock on PostgreSQL, the database
+# write lock (busy_timeout) on SQLite, where select_for_update is a no-op
+LOCKING_SQL = ('INSERT', 'UPDATE', 'DELETE', 'BEGIN')
+# select_for_update's clause, at the very end of the SELECT
+FOR_UPDATE_RE = re.compile(r' FOR UPDATE( OF [^()]+)?( NOWAIT| SKIP LOCKED)?$')
+
+# Booking outcomes, matched against the message book_class leaves
+OUTCOMES = [
+    ('booked', 'Successfully booked'),
+    ('full', 'fully booked'),
+    ('duplicate', 'already booked'),
+    ('unavailable', 'not found or no longer available'),
+    ('error', 'Error booking class'),
+]
+
+
+def takes_lock(sql):
+    """
+    Whether a statement waits for a lock, judged by its leading keyword (a
+    SELECT naming updated_at is not an UPDATE) or a trailing FOR UPDATE.
+    """
+    statement = sql.strip().upper()
+    return statement.startswith(LOCKING_SQL) or (
+        statement.startswith('SELECT') and FOR_UPDATE_RE.search(statement) is not None
+    )
+
+
+def _init_worker():
+    """Process pool initializer (spawned workers start without Django)"""
+    import django
+    django.setup()
+
+
+def book(user_id, schedule_id, start_at):
+    """
+    Wait until `start_at`, then POST one booking as `user_id`.
+
+    Returns:
+        dict: outcome, message, latency_ms, db_ms and lock_ms (time in
+              statements that take a lock, see takes_lock)
+    """
+    from django.contrib.messages import get_messages
+    from django.test import Client
+    from django.urls import reverse
+    from core.models import CustomUser
+
+    client = Client(HTTP_HOST='localhost')
+    client.force_login(CustomUser.objects.get(id=user_id))
+    url = reverse('bookings:book_class')
+    timings = {'db': 0.0, 'lock': 0.0}
+
+    def timed(execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            timings['db'] += elapsed
+            if takes_lock(sql):
+                timings['lock'] += elapsed
+
+    delay = start_at - time.time()
+    if delay > 0:
+        time.sleep(delay)
+
+    started = time.perf_counter()
+    with connection.execute_wrapper(timed):
+        response = client.post(url, {'schedule_id': schedule_id})
+    latency = time.perf_counter() - started
+
+    message = ' '.join(str(m) for m in get_messages(response.wsgi_request))
+    outcome = next((name for name, text in OUTCOMES if text in message), 'other')
+    connections.close_all()
+    return {
+        'outcome': outcome,
+        'message': message,
+        'latency_ms': latency * 1000,
+        'db_ms': timings['db'] * 1000,
+        'lock_ms': timings['lock'] * 1000,
+    }
+
+
+class Command(BaseCommand):
+    help = 'Fire concurrent booking requests at one class session and verify it is never overbooked'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100, help='Members competing for the session (one request each)')
+        parser.add_argument('--capacity', type=int, default=10, help='Capacity of the load-test session')
+        parser.add_argument('--workers', type=int, default=16, help='Concurrent threads or processes')
+        parser.add_argument('--mode', choices=['threads', 'processes'], default='threads')
+        parser.add_argument('--schedule', type=int, help='Use this existing ClassSchedule instead of creating one')
+        parser.add_argument('--keep', action='store_true', help='Keep the load-test users, class and bookings afterwards')
+
+    def handle(self, *args, **options):
+        from bookings.models import Booking, ClassSchedule
+
+        self.stdout.write(f'Database: {connection.vendor} ({connection.settings_dict["NAME"]})')
+        if connection.vendor == 'sqlite' and connection.is_in_memory_db():
+            raise CommandError('An in-memory SQLite database cannot be shared between workers.')
+
+        # Requests stuck behind the lock would each log a budget warning
+        logging.getLogger('core.middleware').setLevel(logging.ERROR)
+
+        created_schedule = options['schedule'] is None
+        schedule = self.create_schedule(options['capacity']) if created_schedule else self.get_schedule(options['schedule'])
+        user_ids = self.create_users(options['users'])
+        capacity = schedule.effective_capacity
+        already_confirmed = Booking.objects.filter(class_schedule=schedule, status='confirmed').count()
+
+        self.stdout.write(
+            f'{len(user_ids)} users -> session {schedule.id} (capacity {capacity}, '
+            f'{already_confirmed} already confirmed) with {options["workers"]} {options["mode"]}'
+        )
+
+        try:
+            results, wall = self.run(user_ids, schedule.id, options['workers'], options['mode'])
+            confirmed = Booking.objects.filter(class_schedule=schedule, status='confirmed').count()
+            self.report(results, wall, confirmed, capacity)
+        finally:
+            if not options['keep']:
+                self.cleanup(schedule if created_schedule else None)
+
+        if confirmed > capacity:
+            raise CommandError(f'OVERBOOKED: {confirmed} confirmed bookings for a capacity of {capacity}.')
+        self.stdout.write(self.style.SUCCESS(f'OK: {confirmed}/{capacity} confirmed, never over capacity.'))
+
+    # Setup
+
+    def create_schedule(self, capacity):
+        from django.utils import timezone
+        from bookings.models import ClassSchedule, GymClass
+
+        gym_class = GymClass.objects.create(
+            name=f'{LOADTEST_PREFIX}class', description='Concurrent booking load test',
+            duration=60, max_capacity=capacity,
+        )
+        return ClassSchedule.objects.create(
+            gym_class=gym_class,
+            class_date=timezone.localdate() + timedelta(days=1),
+            class_time=dt_time(18, 0),
+        )
+
+    def get_schedule(self, schedule_id):
+        from bookings.models import ClassSchedule
+        try:
+            return ClassSchedule.objects.select_related('gym_class').get(id=schedule_id)
+        except ClassSchedule.DoesNotExist:
+            raise CommandError(f'ClassSchedule {schedule_id} does not exist.')
+
+    def create_users(self, count):
+        from core.models import CustomUser
+
+        password = make_password(None)  # Unusable; workers use force_login
+        existing = set(
+            CustomUser.objects.filter(username__startswith=LOADTEST_PREFIX).values_list('username', flat=True)
+        )
+        CustomUser.objects.bulk_create([
+            CustomUser(username=f'{LOADTEST_PREFIX}user{index:05d}', password=password)
+            for index in range(count)
+            if f'{LOADTEST_PREFIX}user{index:05d}' not in existing
+        ])
+        return list(
+            CustomUser.objects.filter(username__startswith=f'{LOADTEST_PREFIX}user')
+            .order_by('username').values_list('id', flat=True)[:count]
+        )
+
+    def cleanup(self, schedule):
+        from core.models import CustomUser
+
+        # Deleting the users removes their bookings too
+        CustomUser.objects.filter(username__startswith=LOADTEST_PREFIX).delete()
+        if schedule is not None:
+            schedule.gym_class.delete()
+
+    # Run
+
+    def run(self, user_ids, schedule_id, workers, mode):
+        # Give every worker time to start and log in before the shared start time
+        start_at = time.time() + 2 + len(user_ids) * 0.005
+        args = [(user_id, schedule_id, start_at) for user_id in user_ids]
+
+        if mode == 'threads':
+            executor = ThreadPoolExecutor(max_workers=workers)
+        else:
+            # Spawned workers do not inherit this process's database connections
+            connections.close_all()
+            executor = ProcessPoolExecutor(
+                max_workers=workers, mp_context=multiprocessing.get_context('spawn'), initializer=_init_worker,
+            )
+
+        with executor:
+            futures = [executor.submit(book, *arg) for arg in args]
+            results = [future.result() for future in futures]
+        # Wall time from the shared start to the last response
+        wall = max(time.time() - start_at, 1e-9)
+        return results, wall
+
+    def report(self, results, wall, confirmed, capacity):
+        counts = {}
+        for result in results:
+            counts[result['outcome']] = counts.get(result['outcome'], 0) + 1
+
+        latency = np.array([result['latency_ms'] for result in results])
+        db = np.array([result['db_ms'] for result in results])
+        lock = np.array([result['lock_ms'] for result in results])
+
+        self.stdout.write(f'Requests: {len(results)} in {wall:.2f}s ({len(results) / wall:.1f} req/s)')
+        self.stdout.write('Outcomes: ' + ', '.join(f'{name} {count}' for name, count in sorted(counts.items())))
+        for label, values in [('Latency', latency), ('DB time', db), ('Lock wait', lock)]:
+            p50, p95, p99 = np.percentile(values, [50, 95, 99])
+            self.stdout.write(f'{label:10} p50 {p50:8.1f} ms  p95 {p95:8.1f} ms  p99 {p99:8.1f} ms  max {values.max():8.1f} ms')
+
+        errors = sorted({result['message'] for result in results if result['outcome'] in ('error', 'other')})
+        for message in errors[:5]:
+            self.stdout.write(self.style.WARNING(f'  {message or "(no message)"}'))
+        self.stdout.write(f'Confirmed bookings: {confirmed} / capacity {capacity}')
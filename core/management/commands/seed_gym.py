@@ -0,0 +1,527 @@
+"""
+Generate a synthetic gym at production scale for local benchmarking.
+
+Example (roughly production volumes):
+
+    python manage.py seed_gym --users 100000 --workouts 2000 --schedules 50000 \
+        --bookings 2000000 --points 3000000 --completions 2000000 --visits 1000000
+
+Rows are sampled with NumPy from a fixed seed, so the same arguments always
+produce the same data:
+- member activity is log-normal (a few very active members, a long tail)
+- workout popularity follows a Zipf curve
+- sign-ups grow over time
+- visits and class times cluster around morning and evening peaks
+
+Everything is written with bulk_create in batches. Every seeded user,
+including the <prefix>_staff account the staff pages and `manage.py
+benchmark` log in as, shares one pre-hashed password, so no per-user hashing
+is done.
+"""
+import math
+from contextlib import contextmanager
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+from decimal import Decimal
+
+import numpy as np
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from bookings.models import Booking, ClassSchedule, GymClass
+from community.models import Like, Post
+from core.models import CustomUser, MembershipPlan, Subscription, Trainer, UserPoints, UserStreak, Visit
+from workouts.models import UserWorkoutCompletion, Workout
+
+# Relative traffic per hour of the day (00-23): morning and evening peaks
+HOUR_WEIGHTS = np.array([
+    0, 0, 0, 0, 0, 1, 6, 9, 8, 5, 3, 2,
+    2, 2, 2, 2, 3, 6, 9, 10, 7, 4, 1, 0,
+], dtype=float)
+CLASS_HOURS = [6, 7, 8, 9, 12, 17, 18, 19, 20]
+
+POINT_SOURCES = ['checkin', 'workout', 'class', 'challenge']
+POINT_SOURCE_WEIGHTS = [0.4, 0.4, 0.15, 0.05]
+POINT_VALUES = {'checkin': 5, 'workout': 10, 'class': 15, 'challenge': 50}
+
+SUBSCRIPTION_STATUSES = ['active', 'cancelled', 'past_due', 'trialing']
+SUBSCRIPTION_STATUS_WEIGHTS = [0.7, 0.15, 0.1, 0.05]
+
+DEFAULT_PLANS = [
+    ('Basic', '999.00', '1_month'),
+    ('Pro', '2499.00', '3_months'),
+    ('Elite', '8999.00', '12_months'),
+]
+
+FIRST_NAMES = ['Aarav', 'Diya', 'Vihaan', 'Ananya', 'Arjun', 'Isha', 'Kabir', 'Meera', 'Rohan', 'Saanvi',
+               'Alex', 'Sam', 'Jordan', 'Priya', 'Rahul', 'Neha', 'Karan', 'Pooja', 'Vikram', 'Sneha']
+LAST_NAMES = ['Sharma', 'Patel', 'Iyer', 'Reddy', 'Singh', 'Gupta', 'Nair', 'Das', 'Khan', 'Joshi',
+              'Smith', 'Brown', 'Mehta', 'Rao', 'Kapoor', 'Verma', 'Bose', 'Pillai', 'Shah', 'Menon']
+
+
+@contextmanager
+def manual_timestamps(*models):
+    """Let bulk_create keep the historic created_at/updated_at values we set"""
+    fields = [
+        field for model in models for field in model._meta.concrete_fields
+        if getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False)
+    ]
+    saved = [(field, field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+class Command(BaseCommand):
+    help = 'Generate a synthetic gym (members, classes, bookings, workouts, points, ...) for benchmarking'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=2000, help='Members to create')
+        parser.add_argument('--trainers', type=int, default=20)
+        parser.add_argument('--workouts', type=int, default=200)
+        parser.add_argument('--classes', type=int, default=40)
+        parser.add_argument('--schedules', type=int, default=5000, help='Class sessions across all classes')
+        parser.add_argument('--bookings', type=int, default=40000)
+        parser.add_argument('--completions', type=int, default=40000, help='Workout completions')
+        parser.add_argument('--points', type=int, default=60000, help='UserPoints rows')
+        parser.add_argument('--visits', type=int, default=30000)
+        parser.add_argument('--posts', type=int, default=2000)
+        parser.add_argument('--likes', type=int, default=20000)
+        parser.add_argument('--days', type=int, default=365, help='Days of history to spread activity over')
+        parser.add_argument('--seed', type=int, default=42, help='Random seed (same seed, same data)')
+        parser.add_argument('--batch-size', type=int, default=5000, help='Rows per bulk_create batch')
+        parser.add_argument('--prefix', default='seed', help='Username prefix for generated accounts')
+        parser.add_argument('--password', default='password', help='Password for every generated account')
+
+    def handle(self, *args, **options):
+        self.options = options
+        self.rng = np.random.default_rng(options['seed'])
+        self.batch_size = options['batch_size']
+        self.now = timezone.now().replace(microsecond=0)
+        self.today = timezone.localdate()
+        self.days = max(1, options['days'])
+        self.prefix = options['prefix']
+        # Hashed once and shared: hashing per user would dominate the run
+        self.password_hash = make_password(options['password'])
+
+        if CustomUser.objects.filter(username__startswith=f"{self.prefix}_").exists():
+            raise CommandError(
+                f"Users with the prefix '{self.prefix}_' already exist. Use --prefix to seed another batch."
+            )
+
+        started = timezone.now()
+        plans = self.seed_plans()
+        self.seed_staff()
+        trainers = self.seed_trainers()
+        workout_ids = self.seed_workouts(plans)
+        user_ids, signups = self.seed_members()
+        self.seed_subscriptions(user_ids, signups, plans)
+        schedules = self.seed_classes(trainers)
+        activity = self.activity_weights(len(user_ids))
+        self.seed_bookings(user_ids, signups, activity, schedules)
+        self.seed_completions(user_ids, signups, activity, workout_ids)
+        self.seed_points(user_ids, signups, activity)
+        self.seed_streaks(user_ids, activity)
+        self.seed_visits(user_ids, signups, activity)
+        self.seed_posts(user_ids, signups, activity)
+
+        # bulk_create bypasses the signals that keep these in sync
+        from staff.metrics import invalidate_dashboard_metrics
+        from staff.search import rebuild_member_index
+        from workouts.popularity import refresh_workout_stats
+        from workouts.recommendations import refresh_workout_neighbors
+        from workouts.similarity import refresh_similar_workouts
+        invalidate_dashboard_metrics()
+        rebuild_member_index()
+        refresh_workout_stats()
+        refresh_workout_neighbors()
+        refresh_similar_workouts()
+
+        elapsed = (timezone.now() - started).total_seconds()
+        self.stdout.write(self.style.SUCCESS(f'Seeded gym in {elapsed:.0f}s.'))
+
+    # Helpers
+
+    def bulk_create(self, model, objects, label=None):
+        """bulk_create an iterable of unsaved objects in batches"""
+        created = 0
+        batch = []
+        with manual_timestamps(model):
+            for obj in objects:
+                batch.append(obj)
+                if len(batch) >= self.batch_size:
+                    with transaction.atomic():
+                        model.objects.bulk_create(batch)
+                    created += len(batch)
+                    batch = []
+            if batch:
+                with transaction.atomic():
+                    model.objects.bulk_create(batch)
+                created += len(batch)
+        self.stdout.write(f'  {label or model._meta.verbose_name_plural}: {created}')
+        return created
+
+    def activity_weights(self, count):
+        """Log-normal share of activity per member (sums to 1)"""
+        weights = self.rng.lognormal(mean=0.0, sigma=1.0, size=count)
+        return weights / weights.sum()
+
+    def random_times(self, starts, ends):
+        """
+        Random timestamps between per-row start and end datetimes, with the
+        hour of day drawn from HOUR_WEIGHTS.
+        """
+        start_days = np.array([start.timestamp() for start in starts]) // 86400
+        end_days = np.array([end.timestamp() for end in ends]) // 86400
+        days = start_days + np.floor(self.rng.random(len(starts)) * (end_days - start_days + 1))
+        hours = self.rng.choice(24, size=len(starts), p=HOUR_WEIGHTS / HOUR_WEIGHTS.sum())
+        seconds = days * 86400 + hours * 3600 + self.rng.integers(0, 3600, size=len(starts))
+        # Local wall-clock hours -> UTC
+        seconds -= int(timezone.localtime().utcoffset().total_seconds())
+        seconds = np.minimum(seconds, self.now.timestamp())
+        return [datetime.fromtimestamp(int(value), tz=dt_timezone.utc) for value in seconds]
+
+    def sample_rows(self, user_ids, signups, activity, count):
+        """Pick members for `count` activity rows and a time after each member's sign-up"""
+        picks = self.rng.choice(len(user_ids), size=count, p=activity)
+        times = self.random_times([signups[index] for index in picks], [self.now] * count)
+        return picks, times
+
+    # Reference data
+
+    def seed_plans(self):
+        plans = list(MembershipPlan.objects.filter(is_active=True))
+        if not plans:
+            plans = [
+                MembershipPlan.objects.create(name=name, price=Decimal(price), features='Gym access', duration=duration)
+                for name, price, duration in DEFAULT_PLANS
+            ]
+            self.stdout.write(f'  membership plans: {len(plans)}')
+        return plans
+
+    def seed_staff(self):
+        # The staff pages (and `manage.py benchmark`) need a staff login
+        CustomUser.objects.create(
+            username=f'{self.prefix}_staff',
+            email=f'{self.prefix}_staff@example.com',
+            first_name='Front',
+            last_name='Desk',
+            password=self.password_hash,
+            is_staff=True,
+            created_at=self.now - timedelta(days=self.days),
+        )
+        self.stdout.write(f'  staff accounts: 1 ({self.prefix}_staff)')
+
+    def seed_trainers(self):
+        count = self.options['trainers']
+        self.bulk_create(CustomUser, (
+            CustomUser(
+                username=f'{self.prefix}_trainer{index:04d}',
+                email=f'{self.prefix}_trainer{index:04d}@example.com',
+                first_name=FIRST_NAMES[index % len(FIRST_NAMES)],
+                last_name=LAST_NAMES[(index * 7) % len(LAST_NAMES)],
+                password=self.password_hash,
+                created_at=self.now - timedelta(days=self.days),
+            )
+            for index in range(count)
+        ), label='trainer accounts')
+        trainer_users = CustomUser.objects.filter(
+            username__startswith=f'{self.prefix}_trainer'
+        ).order_by('id').values_list('id', flat=True)
+        self.bulk_create(Trainer, (
+            Trainer(user_id=user_id, bio='Certified coach', specializations='Strength, HIIT, Mobility', created_at=self.now)
+            for user_id in trainer_users
+        ))
+        return list(Trainer.objects.filter(user_id__in=trainer_users).order_by('id'))
+
+    def seed_workouts(self, plans):
+        categories = [choice for choice, label in Workout.CATEGORY_CHOICES]
+        count = self.options['workouts']
+        category_picks = self.rng.integers(0, len(categories), size=count)
+        levels = self.rng.choice(['1', '2', '3'], size=count, p=[0.45, 0.35, 0.2])
+        first_id = (Workout.objects.order_by('-id').values_list('id', flat=True).first() or 0)
+        self.bulk_create(Workout, (
+            Workout(
+                title=f'{categories[category].replace("_", " ").title()} Workout {index + 1}',
+                description=f'Synthetic {categories[category]} workout #{index + 1}.',
+                category=categories[category],
+                difficulty_level=level,
+                sets=int(self.rng.integers(1, 6)),
+                is_free=bool(self.rng.random() < 0.2),
+                created_at=self.now - timedelta(days=int(self.rng.integers(0, self.days))),
+                updated_at=self.now,
+            )
+            for index, (category, level) in enumerate(zip(category_picks, levels))
+        ))
+        workout_ids = list(Workout.objects.filter(id__gt=first_id).order_by('id').values_list('id', flat=True))
+
+        # Higher tiers include more of the library
+        through = MembershipPlan.included_workouts.through
+        rows = []
+        for tier, plan in enumerate(sorted(plans, key=lambda plan: plan.price), start=1):
+            share = min(1.0, tier / len(plans))
+            included = self.rng.choice(workout_ids, size=int(len(workout_ids) * share), replace=False)
+            rows.extend(through(membershipplan_id=plan.id, workout_id=int(workout_id)) for workout_id in included)
+        through.objects.bulk_create(rows, batch_size=self.batch_size, ignore_conflicts=True)
+        return workout_ids
+
+    # Members
+
+    def seed_members(self):
+        count = self.options['users']
+        # Beta(2, 1): sign-ups grow towards the present
+        ages = (1 - self.rng.beta(2, 1, size=count)) * self.days * 86400
+        first_names = self.rng.integers(0, len(FIRST_NAMES), size=count)
+        last_names = self.rng.integers(0, len(LAST_NAMES), size=count)
+        self.bulk_create(CustomUser, (
+            CustomUser(
+                username=f'{self.prefix}_member{index:07d}',
+                email=f'{self.prefix}_member{index:07d}@example.com',
+                first_name=FIRST_NAMES[first],
+                last_name=LAST_NAMES[last],
+                phone_number=f'9{index:09d}',
+                password=self.password_hash,
+                created_at=self.now - timedelta(seconds=int(age)),
+            )
+            for index, (first, last, age) in enumerate(zip(first_names, last_names, ages))
+        ), label='member accounts')
+        members = list(
+            CustomUser.objects.filter(username__startswith=f'{self.prefix}_member')
+            .order_by('id').values_list('id', 'created_at')
+        )
+        return [member_id for member_id, _ in members], [created_at for _, created_at in members]
+
+    def seed_subscriptions(self, user_ids, signups, plans):
+        # Cheaper plans are more common
+        weights = 1 / np.arange(1, len(plans) + 1)
+        plan_picks = self.rng.choice(len(plans), size=len(user_ids), p=weights / weights.sum())
+        statuses = self.rng.choice(SUBSCRIPTION_STATUSES, size=len(user_ids), p=SUBSCRIPTION_STATUS_WEIGHTS)
+
+        def rows():
+            for user_id, signup, plan_index, status in zip(user_ids, signups, plan_picks, statuses):
+                plan = plans[plan_index]
+                subscription = Subscription(
+                    user_id=user_id, plan=plan, status=status,
+                    current_period_start=max(signup, self.now - timedelta(days=20)),
+                    created_at=signup, updated_at=signup,
+                )
+                subscription.current_period_end = subscription.calculate_period_end()
+                yield subscription
+
+        self.bulk_create(Subscription, rows())
+
+    # Classes and bookings
+
+    def seed_classes(self, trainers):
+        count = self.options['classes']
+        self.bulk_create(GymClass, (
+            GymClass(
+                name=f'{name} {index + 1}',
+                description=f'Synthetic {name.lower()} class.',
+                trainer=trainers[index % len(trainers)] if trainers else None,
+                duration=int(self.rng.choice([30, 45, 60])),
+                max_capacity=int(self.rng.choice([12, 15, 20, 25, 30])),
+                is_paid=bool(index % 4 == 0),
+                price=Decimal('299.00') if index % 4 == 0 else None,
+                created_at=self.now - timedelta(days=self.days),
+                updated_at=self.now,
+            )
+            for index, name in enumerate(
+                ['Yoga', 'HIIT', 'Spin', 'Pilates', 'Boxing', 'Zumba', 'CrossFit', 'Strength'][i % 8] for i in range(count)
+            )
+        ))
+        classes = list(GymClass.objects.order_by('-id').values_list('id', 'max_capacity')[:count])[::-1]
+
+        # Sessions from the start of the history window to two weeks ahead,
+        # sampled per class without repeating a (date, time) slot
+        total_days = self.days + 14
+        grid = total_days * len(CLASS_HOURS)
+        per_class = min(grid, math.ceil(self.options['schedules'] / max(1, len(classes))))
+        first_day = self.today - timedelta(days=self.days)
+        schedules = []
+
+        def rows():
+            for class_id, capacity in classes:
+                for slot in np.sort(self.rng.choice(grid, size=per_class, replace=False)):
+                    day, hour_index = divmod(int(slot), len(CLASS_HOURS))
+                    class_date = first_day + timedelta(days=day)
+                    hour = CLASS_HOURS[hour_index]
+                    schedules.append((class_id, class_date, capacity, hour))
+                    yield ClassSchedule(
+                        gym_class_id=class_id, class_date=class_date, class_time=time(hour, 0),
+                        created_at=self.now, updated_at=self.now,
+                    )
+
+        self.bulk_create(ClassSchedule, rows())
+        schedule_ids = ClassSchedule.objects.filter(
+            gym_class_id__in=[class_id for class_id, _ in classes]
+        ).order_by('gym_class_id', 'class_date', 'class_time').values_list('id', flat=True)
+        # rows() yields in the same (class, date, time) order.
+        # Each entry: (schedule_id, class_id, class_date, capacity, hour)
+        return [(schedule_id, *schedule) for schedule_id, schedule in zip(schedule_ids, schedules)]
+
+    def seed_bookings(self, user_ids, signups, activity, schedules):
+        if not schedules or not user_ids:
+            return
+        count = self.options['bookings']
+        schedule_ids = np.array([row[0] for row in schedules], dtype=np.int64)
+        class_ids = np.array([row[1] for row in schedules], dtype=np.int64)
+        days = np.array([row[2].toordinal() for row in schedules], dtype=np.int64)
+        capacities = np.array([row[3] for row in schedules], dtype=np.int64)
+        # Peak-hour sessions are booked more often
+        popularity = HOUR_WEIGHTS[[row[4] for row in schedules]] + 1
+        popularity /= popularity.sum()
+        signup_days = np.array([timezone.localtime(signup).date().toordinal() for signup in signups], dtype=np.int64)
+
+        day_span = days.max() - days.min() + 1
+
+        def valid(members, sessions):
+            # Members cannot book sessions before they joined
+            keep = days[sessions] >= signup_days[members]
+            members, sessions = members[keep], sessions[keep]
+
+            # One booking per member, class and date (the model's unique_together)
+            key = (members * (class_ids.max() + 1) + class_ids[sessions]) * day_span + (days[sessions] - days.min())
+            _, first = np.unique(key, return_index=True)
+            members, sessions = members[first], sessions[first]
+
+            # Never exceed a session's capacity
+            order = np.argsort(sessions, kind='stable')
+            members, sessions = members[order], sessions[order]
+            rank = np.arange(len(sessions)) - np.searchsorted(sessions, sessions, side='left')
+            keep = rank < capacities[sessions]
+            return members[keep], sessions[keep]
+
+        # Rejected draws are replaced until the target is met or sessions are full
+        members = np.empty(0, dtype=np.int64)
+        sessions = np.empty(0, dtype=np.int64)
+        for _ in range(8):
+            missing = count - len(members)
+            if missing <= 0:
+                break
+            draw = missing * 2
+            members, sessions = valid(
+                np.concatenate([members, self.rng.choice(len(user_ids), size=draw, p=activity)]),
+                np.concatenate([sessions, self.rng.choice(len(schedules), size=draw, p=popularity)]),
+            )
+        if len(members) > count:
+            subset = np.sort(self.rng.choice(len(members), size=count, replace=False))
+            members, sessions = members[subset], sessions[subset]
+        elif len(members) < count:
+            self.stdout.write(self.style.WARNING(
+                f'  Only {len(members)} bookings fit; add --schedules or --classes for more capacity.'
+            ))
+
+        today = self.today.toordinal()
+        roll = self.rng.random(len(sessions))
+        past = days[sessions] < today
+        statuses = np.where(
+            past,
+            np.where(roll < 0.8, 'completed', np.where(roll < 0.88, 'no_show', 'cancelled')),
+            np.where(roll < 0.9, 'confirmed', 'cancelled'),
+        )
+
+        def rows():
+            for member, session, status in zip(members, sessions, statuses):
+                schedule_id, class_id, class_date, _, _ = schedules[session]
+                booked_at = max(signups[member], timezone.make_aware(datetime.combine(class_date, time.min)) - timedelta(days=2))
+                yield Booking(
+                    user_id=user_ids[member], gym_class_id=class_id, class_schedule_id=schedule_id,
+                    booking_date=class_date, status=str(status),
+                    created_at=min(booked_at, self.now), updated_at=min(booked_at, self.now),
+                )
+
+        self.bulk_create(Booking, rows())
+
+    # Activity
+
+    def seed_completions(self, user_ids, signups, activity, workout_ids):
+        if not workout_ids or not user_ids:
+            return
+        count = self.options['completions']
+        # Zipf-like popularity: a few workouts account for most completions
+        ranks = np.arange(1, len(workout_ids) + 1)
+        popularity = 1 / ranks ** 1.1
+        popularity = self.rng.permutation(popularity / popularity.sum())
+
+        picks, times = self.sample_rows(user_ids, signups, activity, count)
+        workouts = self.rng.choice(len(workout_ids), size=count, p=popularity)
+        # A member completes a workout at most once per day
+        rows = {}
+        for member, workout, completed_at in zip(picks, workouts, times):
+            rows.setdefault((user_ids[member], workout_ids[workout], timezone.localdate(completed_at)), completed_at)
+        self.bulk_create(UserWorkoutCompletion, (
+            UserWorkoutCompletion(
+                user_id=user_id, workout_id=workout_id, completed_on=completed_on, completed_at=completed_at,
+            )
+            for (user_id, workout_id, completed_on), completed_at in rows.items()
+        ))
+
+    def seed_points(self, user_ids, signups, activity):
+        if not user_ids:
+            return
+        count = self.options['points']
+        picks, times = self.sample_rows(user_ids, signups, activity, count)
+        sources = self.rng.choice(POINT_SOURCES, size=count, p=POINT_SOURCE_WEIGHTS)
+        self.bulk_create(UserPoints, (
+            UserPoints(
+                user_id=user_ids[member], points=POINT_VALUES[source], source=str(source),
+                description=f'Synthetic {source} points', created_at=created_at,
+            )
+            for member, source, created_at in zip(picks, sources, times)
+        ), label='user points')
+
+    def seed_streaks(self, user_ids, activity):
+        # More active members keep longer streaks
+        scale = activity * len(user_ids)
+        current = np.minimum(self.rng.poisson(scale * 3), 120)
+        longest = current + np.minimum(self.rng.poisson(scale * 5), 240)
+        active_today = self.rng.random(len(user_ids)) < np.minimum(0.9, scale * 0.3)
+        self.bulk_create(UserStreak, (
+            UserStreak(
+                user_id=user_id, current_streak=int(streak), longest_streak=int(best),
+                last_activity_date=self.today if today else self.today - timedelta(days=2), updated_at=self.now,
+            )
+            for user_id, streak, best, today in zip(user_ids, current, longest, active_today)
+        ))
+
+    def seed_visits(self, user_ids, signups, activity):
+        if not user_ids:
+            return
+        picks, times = self.sample_rows(user_ids, signups, activity, self.options['visits'])
+        doors = self.rng.choice(['main', 'main', 'main', 'side'], size=len(picks))
+        self.bulk_create(Visit, (
+            Visit(user_id=user_ids[member], visited_at=visited_at, door=str(door), method='qr')
+            for member, visited_at, door in zip(picks, times, doors)
+        ))
+
+    def seed_posts(self, user_ids, signups, activity):
+        count = self.options['posts']
+        if not count or not user_ids:
+            return
+        picks, times = self.sample_rows(user_ids, signups, activity, count)
+
+        # Decide likes first so each post is created with its likes_count
+        likers = self.rng.choice(len(user_ids), size=self.options['likes'], p=activity)
+        liked = self.rng.choice(count, size=self.options['likes'], p=self.activity_weights(count))
+        pairs = np.unique(np.stack([liked, likers], axis=1), axis=0) if len(liked) else np.empty((0, 2), dtype=np.int64)
+        likes_count = np.bincount(pairs[:, 0], minlength=count) if len(pairs) else np.zeros(count, dtype=np.int64)
+
+        first_id = Post.objects.order_by('-id').values_list('id', flat=True).first() or 0
+        self.bulk_create(Post, (
+            Post(
+                user_id=user_ids[member], content=f'Workout done! Day {index % 100 + 1} of staying consistent.',
+                likes_count=int(likes), created_at=created_at, updated_at=created_at,
+            )
+            for index, (member, created_at, likes) in enumerate(zip(picks, times, likes_count))
+        ))
+        post_ids = list(Post.objects.filter(id__gt=first_id).order_by('id').values_list('id', flat=True))
+        self.bulk_create(Like, (
+            Like(post_id=post_ids[post], user_id=user_ids[liker], created_at=self.now)
+            for post, liker in pairs
+        ))
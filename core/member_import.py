@@ -0,0 +1,250 @@
+"""
+Bulk member import
+
+import_members streams a CSV of members (e.g. exported from a previous
+system), validates each row, and creates the users and their initial
+subscriptions with bulk_create a batch at a time. Password hashing (PBKDF2
+by default, hundreds of milliseconds per user) is spread over a process
+pool; rows without a password get an unusable one and, on request, a
+password reset link so members choose their own.
+
+Columns: email (required), username (default: from the email), first_name,
+last_name, phone_number, date_of_birth (YYYY-MM-DD), password, plan (name or
+id of a MembershipPlan), status (default active), period_start / period_end
+(ISO dates; the end defaults to start + the plan's duration). Members whose
+email or username already exists are skipped.
+"""
+import multiprocessing
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, time
+from itertools import repeat
+
+from django.contrib.auth.hashers import get_hasher, make_password
+from django.contrib.auth.tokens import default_token_generator
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from django.utils.encoding import force_bytes
+from django.utils.http import urlsafe_base64_encode
+
+from .importing import ImportResult, read_rows
+
+BATCH_SIZE = 1000
+_USERNAME_INVALID_RE = re.compile(r'[^\w.@+-]')
+
+
+def hash_password(password, hasher):
+    """make_password with an explicit hasher (runs in a worker process)"""
+    return make_password(password, hasher=hasher)
+
+
+def _value(row, key):
+    return (row.get(key) or '').strip()
+
+
+def _parse_moment(value, field, errors):
+    """An aware datetime from an ISO date or date-time, or None"""
+    if not value:
+        return None
+    try:
+        moment = parse_datetime(value)
+        if moment is None:
+            day = parse_date(value)
+            moment = datetime.combine(day, time.min) if day else None
+    except ValueError:
+        moment = None
+    if moment is None:
+        errors.append(f'{field}: "{value}" is not a date (YYYY-MM-DD).')
+        return None
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+class MemberImporter:
+    """Builds members from rows, against existing users and earlier rows of the file"""
+
+    def __init__(self, plans, existing_usernames, existing_emails):
+        self.plans = plans
+        self.usernames = existing_usernames
+        self.emails = existing_emails
+
+    def unique_username(self, wanted, email):
+        base = _USERNAME_INVALID_RE.sub('', wanted or email.split('@')[0])[:140] or 'member'
+        username, suffix = base, 1
+        while username.lower() in self.usernames:
+            suffix += 1
+            username = f'{base}{suffix}'
+        return username
+
+    def build(self, row):
+        """
+        Unsaved (CustomUser, password or None, Subscription or None) for one row.
+
+        Returns:
+            tuple or None: None when the member already exists
+
+        Raises:
+            ValidationError: With every problem found in the row
+        """
+        from .models import CustomUser, Subscription
+
+        errors = []
+        email = _value(row, 'email').lower()
+        username = _value(row, 'username')
+        if email in self.emails or (username and username.lower() in self.usernames):
+            return None
+
+        user = CustomUser(
+            username=self.unique_username(username, email),
+            email=email,
+            first_name=_value(row, 'first_name'),
+            last_name=_value(row, 'last_name'),
+            phone_number=_value(row, 'phone_number') or None,
+            date_joined=timezone.now(),
+        )
+        date_of_birth = _value(row, 'date_of_birth')
+        if date_of_birth:
+            try:
+                user.date_of_birth = parse_date(date_of_birth)
+            except ValueError:
+                pass
+            if user.date_of_birth is None:
+                errors.append(f'date_of_birth: "{date_of_birth}" is not a date (YYYY-MM-DD).')
+        if not email:
+            errors.append('email: This field cannot be blank.')
+        try:
+            # Uniqueness is checked against the sets above, not a query per row
+            user.full_clean(exclude=['password'], validate_unique=False, validate_constraints=False)
+        except ValidationError as e:
+            errors.extend(
+                f'{field}: {message}' for field, messages in e.message_dict.items() for message in messages
+            )
+
+        subscription = None
+        plan_key = _value(row, 'plan')
+        if plan_key:
+            plan = self.plans.get(plan_key.lower())
+            if plan is None:
+                errors.append(f'plan: No membership plan "{plan_key}".')
+            status = _value(row, 'status').lower() or 'active'
+            if status not in dict(Subscription.STATUS_CHOICES):
+                errors.append(f'status: "{status}" is not one of {", ".join(dict(Subscription.STATUS_CHOICES))}.')
+            start = _parse_moment(_value(row, 'period_start'), 'period_start', errors) or timezone.now()
+            end = _parse_moment(_value(row, 'period_end'), 'period_end', errors)
+            subscription = Subscription(plan=plan, status=status, current_period_start=start, current_period_end=end)
+            if plan and not end:
+                # bulk_create skips Subscription.save(), which would fill this in
+                subscription.current_period_end = subscription.calculate_period_end()
+
+        if errors:
+            raise ValidationError(errors)
+        self.usernames.add(user.username.lower())
+        self.emails.add(email)
+        return user, _value(row, 'password') or None, subscription
+
+
+def _write_batch(batch, hasher, executor, workers, result, reset_links, base_url):
+    """Hash the batch's passwords, then bulk_create its users and subscriptions"""
+    from .models import CustomUser, Subscription
+
+    passwords = [password for _, _, password, _ in batch if password]
+    if passwords:
+        if executor:
+            # Several passwords per task, so workers spend their time hashing, not messaging
+            chunksize = max(1, len(passwords) // (workers * 4))
+            hashes = iter(executor.map(hash_password, passwords, repeat(hasher), chunksize=chunksize))
+        else:
+            hashes = (hash_password(password, hasher) for password in passwords)
+    for _, user, password, _ in batch:
+        # An unusable password ('!' + random) costs nothing to make
+        user.password = next(hashes) if password else make_password(None)
+
+    with transaction.atomic():
+        users = CustomUser.objects.bulk_create([user for _, user, _, _ in batch])
+        subscriptions = []
+        for user, (_, _, _, subscription) in zip(users, batch):
+            if subscription:
+                subscription.user = user
+                subscriptions.append(subscription)
+        Subscription.objects.bulk_create(subscriptions)
+    result.created += len(users)
+
+    if reset_links is not None:
+        for user, (_, _, password, _) in zip(users, batch):
+            if not password:
+                path = reverse('password_reset_confirm', kwargs={
+                    'uidb64': urlsafe_base64_encode(force_bytes(user.pk)),
+                    'token': default_token_generator.make_token(user),
+                })
+                reset_links.append((user.email, user.username, base_url.rstrip('/') + path))
+
+
+def import_members(lines, batch_size=BATCH_SIZE, workers=None, reset_links=None, base_url=''):
+    """
+    Create members (and subscriptions) from CSV lines.
+
+    Args:
+        lines: Iterable of the CSV's lines (bytes or text)
+        batch_size: Users per bulk_create
+        workers: Hashing processes (default: CPU count); 1 hashes in-process
+        reset_links: List to append (email, username, reset URL) to for
+                     members imported without a password, or None
+        base_url: Scheme and host the reset URLs start with
+
+    Returns:
+        ImportResult
+    """
+    from staff.metrics import invalidate_dashboard_metrics
+    from staff.search import rebuild_member_index
+    from .models import CustomUser, MembershipPlan
+
+    plans = {}
+    for plan in MembershipPlan.objects.all():
+        plans[str(plan.pk)] = plan
+        plans.setdefault(plan.name.lower(), plan)
+    importer = MemberImporter(
+        plans,
+        {username.lower() for username in CustomUser.objects.values_list('username', flat=True)},
+        {email.lower() for email in CustomUser.objects.exclude(email='').values_list('email', flat=True)},
+    )
+
+    # Resolved here, so test settings (and overrides) reach the workers
+    hasher = get_hasher()
+    workers = workers or os.cpu_count() or 1
+    result = ImportResult()
+    executor = ProcessPoolExecutor(
+        max_workers=workers, mp_context=multiprocessing.get_context('spawn'),
+    ) if workers > 1 else None
+
+    try:
+        batch = []
+        for line, row in read_rows(lines, 'csv'):
+            result.rows += 1
+            try:
+                built = importer.build(row)
+            except ValidationError as e:
+                result.add_error(line, ' '.join(e.messages))
+                continue
+            if built is None:
+                result.skipped += 1
+                continue
+            batch.append((line, *built))
+            if len(batch) >= batch_size:
+                _write_batch(batch, hasher, executor, workers, result, reset_links, base_url)
+                batch = []
+        if batch:
+            _write_batch(batch, hasher, executor, workers, result, reset_links, base_url)
+    finally:
+        if executor:
+            executor.shutdown()
+
+    if result.created:
+        # bulk_create sends no post_save, so do what staff.signals would
+        invalidate_dashboard_metrics()
+        rebuild_member_index()
+    return result
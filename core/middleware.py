@@ -0,0 +1,207 @@
+"""
+Per-view request instrumentation
+
+RequestMetricsMiddleware counts the SQL queries each request runs (via
+connection.execute_wrapper), and times database work, template rendering
+(through the core.template_backends.DjangoTemplates backend) and the whole
+request; a streamed response is measured until its last chunk is sent.
+Samples are kept per view name in process memory, so the staff performance
+page shows the worker that served it. Requests over the configured query or
+latency budget are logged as warnings.
+"""
+import logging
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+
+import numpy as np
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+_current = ContextVar('request_metrics', default=None)
+
+
+class RequestMetrics:
+    """Counters for the request being served"""
+    __slots__ = ('queries', 'db_time', 'template_time', 'template_depth')
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.template_time = 0.0
+        self.template_depth = 0
+
+
+class MetricsStore:
+    """Bounded, thread-safe sample buffers keyed by view name"""
+
+    def __init__(self, max_samples):
+        self.max_samples = max_samples
+        self._samples = defaultdict(lambda: deque(maxlen=self.max_samples))
+        self._over_budget = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def add(self, view_name, queries, db_ms, template_ms, total_ms, over_budget):
+        with self._lock:
+            self._samples[view_name].append((queries, db_ms, template_ms, total_ms))
+            if over_budget:
+                self._over_budget[view_name] += 1
+
+    def reset(self):
+        with self._lock:
+            self._samples.clear()
+            self._over_budget.clear()
+
+    def summary(self):
+        """
+        Percentiles per view, slowest p95 latency first.
+
+        Returns:
+            list: dicts with view, requests, over_budget, queries / db_ms /
+                  template_ms / total_ms (each a dict of p50, p95, p99, max)
+        """
+        with self._lock:
+            snapshot = {view: list(samples) for view, samples in self._samples.items()}
+            over_budget = dict(self._over_budget)
+
+        rows = []
+        for view_name, samples in snapshot.items():
+            values = np.array(samples, dtype=float)
+            p50, p95, p99 = np.percentile(values, [50, 95, 99], axis=0)
+            peak = values.max(axis=0)
+            row = {'view': view_name, 'requests': len(samples), 'over_budget': over_budget.get(view_name, 0)}
+            for column, name in enumerate(['queries', 'db_ms', 'template_ms', 'total_ms']):
+                row[name] = {
+                    'p50': round(float(p50[column]), 1),
+                    'p95': round(float(p95[column]), 1),
+                    'p99': round(float(p99[column]), 1),
+                    'max': round(float(peak[column]), 1),
+                }
+            rows.append(row)
+
+        rows.sort(key=lambda row: row['total_ms']['p95'], reverse=True)
+        return rows
+
+
+metrics_store = MetricsStore(getattr(settings, 'REQUEST_METRICS_SAMPLES', 500))
+
+
+def _query_wrapper(execute, sql, params, many, context):
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.queries += 1
+        metrics.db_time += time.perf_counter() - start
+
+
+@contextmanager
+def template_timer():
+    """
+    Add the time spent inside to the current request's template time.
+
+    Used by core.template_backends around every render; nested renders
+    (include, render_to_string) are already inside the outer timing.
+    """
+    metrics = _current.get()
+    if metrics is None or metrics.template_depth:
+        yield
+        return
+    metrics.template_depth += 1
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.template_time += time.perf_counter() - start
+        metrics.template_depth -= 1
+
+
+@contextmanager
+def _measuring(metrics):
+    """Count and time the queries run inside, on every connection, into `metrics`"""
+    token = _current.set(metrics)
+    try:
+        with ExitStack() as stack:
+            for alias in connections:
+                stack.enter_context(connections[alias].execute_wrapper(_query_wrapper))
+            yield
+    finally:
+        _current.reset(token)
+
+
+def query_budget(view_name):
+    """Maximum queries allowed for a view before the request is logged"""
+    return getattr(settings, 'QUERY_BUDGETS', {}).get(
+        view_name, getattr(settings, 'QUERY_BUDGET_DEFAULT', 50)
+    )
+
+
+class RequestMetricsMiddleware:
+    """Record query count, DB time, template time and latency for every view"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.enabled = getattr(settings, 'REQUEST_METRICS_ENABLED', True)
+        self.ignored_namespaces = set(getattr(settings, 'REQUEST_METRICS_IGNORE_NAMESPACES', []))
+
+    def __call__(self, request):
+        if not self.enabled:
+            return self.get_response(request)
+
+        metrics = RequestMetrics()
+        start = time.perf_counter()
+        with _measuring(metrics):
+            response = self.get_response(request)
+
+        match = request.resolver_match
+        if match is None or set(match.namespaces) & self.ignored_namespaces:
+            return response
+
+        if response.streaming and not response.is_async:
+            # Streamed exports query while the body is sent, after this returns
+            response.streaming_content = self._stream(response.streaming_content, request, metrics, start)
+        else:
+            self.record(request, metrics, time.perf_counter() - start)
+        return response
+
+    def _stream(self, content, request, metrics, start):
+        """Yield `content`, measuring each chunk; record the request once it is sent"""
+        iterator = iter(content)
+        try:
+            while True:
+                # Measured per chunk: the server may pull chunks from a different context
+                with _measuring(metrics):
+                    try:
+                        chunk = next(iterator)
+                    except StopIteration:
+                        return
+                yield chunk
+        finally:
+            self.record(request, metrics, time.perf_counter() - start)
+
+    def record(self, request, metrics, total):
+        """Store the request's sample and log it if it went over budget"""
+        view_name = request.resolver_match.view_name
+        total_ms = total * 1000
+        budget = query_budget(view_name)
+        time_budget_ms = getattr(settings, 'REQUEST_TIME_BUDGET_MS', 1000)
+        over_budget = metrics.queries > budget or total_ms > time_budget_ms
+        metrics_store.add(
+            view_name, metrics.queries, metrics.db_time * 1000,
+            metrics.template_time * 1000, total_ms, over_budget,
+        )
+
+        if over_budget:
+            logger.warning(
+                'Request over budget: %s %s (view %s) ran %d queries (budget %d) '
+                'in %.0f ms (budget %d ms; db %.0f ms, templates %.0f ms)',
+                request.method, request.path, view_name, metrics.queries, budget,
+                total_ms, time_budget_ms, metrics.db_time * 1000, metrics.template_time * 1000,
+            )
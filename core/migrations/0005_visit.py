@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-18 23:40
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_personaltrainersubscription'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Visit',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('visited_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('door', models.CharField(blank=True, help_text='Door or kiosk where the member checked in', max_length=50)),
+                ('method', models.CharField(choices=[('qr', 'QR Code'), ('manual', 'Manual')], default='qr', max_length=20)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='visits', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-visited_at'],
+                'indexes': [models.Index(fields=['user', 'visited_at'], name='core_visit_user_time_idx'), models.Index(fields=['visited_at'], name='core_visit_time_idx')],
+            },
+        ),
+    ]
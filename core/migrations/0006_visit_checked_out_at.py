@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 23:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_visit'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='visit',
+            name='checked_out_at',
+            field=models.DateTimeField(blank=True, help_text='Set when staff check the member out explicitly', null=True),
+        ),
+    ]
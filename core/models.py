@@ -243,3 +243,27 @@ class QRCodeSession(models.Model):
     
     def __str__(self):
         return f"{self.user.username} - {self.session_token[:10]}..."
+
+
+class Visit(models.Model):
+    """Gym visits (check-ins) - the fact table for attendance analytics"""
+    METHOD_CHOICES = [
+        ('qr', 'QR Code'),
+        ('manual', 'Manual'),
+    ]
+    
+    user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='visits')
+    visited_at = models.DateTimeField(default=timezone.now)
+    door = models.CharField(max_length=50, blank=True, help_text="Door or kiosk where the member checked in")
+    method = models.CharField(max_length=20, choices=METHOD_CHOICES, default='qr')
+    checked_out_at = models.DateTimeField(blank=True, null=True, help_text="Set when staff check the member out explicitly")
+    
+    class Meta:
+        ordering = ['-visited_at']
+        indexes = [
+            models.Index(fields=['user', 'visited_at'], name='core_visit_user_time_idx'),
+            models.Index(fields=['visited_at'], name='core_visit_time_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.user.username} - {self.visited_at:%Y-%m-%d %H:%M}"
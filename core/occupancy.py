@@ -0,0 +1,111 @@
+"""
+Live gym occupancy
+
+Members on site are kept in the cache as {user_id: leave_timestamp}. A check-in
+adds the member until GYM_EXPECTED_DWELL_MINUTES from now, an explicit
+check-out removes them, and expired entries are pruned on read - so counting
+never touches the database. If the cache entry is missing (restart, eviction)
+it is rebuilt from the Visit table with one indexed range query.
+
+The read-modify-write on the cache entry is not atomic; with several workers
+use a shared cache (Redis/Memcached), where an occasional lost update only
+skews the count until that member's window ends.
+"""
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+OCCUPANCY_CACHE_KEY = 'core:occupancy'
+
+
+def _dwell():
+    return timedelta(minutes=getattr(settings, 'GYM_EXPECTED_DWELL_MINUTES', 90))
+
+
+def _rebuild():
+    """Rebuild the on-site map from recent visits that were not checked out"""
+    from .models import Visit
+
+    dwell = _dwell()
+    recent = Visit.objects.filter(
+        visited_at__gte=timezone.now() - dwell,
+        checked_out_at__isnull=True
+    ).values_list('user_id', 'visited_at')
+
+    on_site = {}
+    for user_id, visited_at in recent:
+        leaves_at = (visited_at + dwell).timestamp()
+        on_site[user_id] = max(on_site.get(user_id, 0), leaves_at)
+    return on_site
+
+
+def _load():
+    """Get the on-site map with expired entries removed"""
+    on_site = cache.get(OCCUPANCY_CACHE_KEY)
+    if on_site is None:
+        on_site = _rebuild()
+        _store(on_site)
+    now = time.time()
+    return {user_id: leaves_at for user_id, leaves_at in on_site.items() if leaves_at > now}
+
+
+def _store(on_site):
+    cache.set(OCCUPANCY_CACHE_KEY, on_site, int(_dwell().total_seconds()))
+
+
+def record_checkin(user_id, visited_at=None):
+    """Mark a member as on site for the expected dwell time"""
+    visited_at = visited_at or timezone.now()
+    on_site = _load()
+    on_site[user_id] = (visited_at + _dwell()).timestamp()
+    _store(on_site)
+
+
+def record_checkout(user_id):
+    """Close the member's open visits and remove them from the on-site count"""
+    from .models import Visit
+
+    now = timezone.now()
+    Visit.objects.filter(
+        user_id=user_id,
+        visited_at__gte=now - _dwell(),
+        checked_out_at__isnull=True
+    ).update(checked_out_at=now)
+
+    on_site = _load()
+    if on_site.pop(user_id, None) is not None:
+        _store(on_site)
+
+
+def is_on_site(user_id):
+    """Check whether a member is currently counted as on site"""
+    return user_id in _load()
+
+
+def get_occupancy():
+    """
+    Get the current gym occupancy.
+
+    Returns:
+        dict: count, capacity, percent and level ('quiet', 'moderate' or 'busy')
+    """
+    count = len(_load())
+    capacity = getattr(settings, 'GYM_CAPACITY', 100)
+    percent = min(100, round(count * 100 / capacity)) if capacity else 0
+
+    if percent < 40:
+        level = 'quiet'
+    elif percent < 75:
+        level = 'moderate'
+    else:
+        level = 'busy'
+
+    return {
+        'count': count,
+        'capacity': capacity,
+        'percent': percent,
+        'level': level,
+    }
@@ -0,0 +1,87 @@
+"""
+Full-page cache for anonymous visitors
+
+Public pages render the same for every logged-out visitor, so the first
+render is cached and replayed. Keys carry the current version of each data
+group the page depends on ('plans', 'workouts', 'classes', 'sessions');
+core.signals bumps a group's version when its models change, which orphans
+every page built from the old data. PAGE_CACHE_TIMEOUT bounds staleness of
+anything not covered by a group (e.g. the member count on the homepage).
+"""
+import hashlib
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+
+VERSION_KEY = 'page_cache:version:{}'
+
+
+def get_page_versions(groups):
+    """Current version of each group, starting missing ones at the clock"""
+    keys = [VERSION_KEY.format(group) for group in groups]
+    versions = cache.get_many(keys)
+    missing = {key: int(time.time()) for key in keys if key not in versions}
+    if missing:
+        # A time-based start never reuses a version whose pages may still be cached
+        cache.set_many(missing, None)
+        versions.update(missing)
+    return [versions[key] for key in keys]
+
+
+def bump_page_version(*groups):
+    """Invalidate every cached page built from these groups"""
+    for group in groups:
+        key = VERSION_KEY.format(group)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, int(time.time()), None)
+
+
+def page_cache_key(request, groups):
+    path = hashlib.md5(request.get_full_path().encode()).hexdigest()
+    versions = '.'.join(str(version) for version in get_page_versions(groups))
+    return f'page_cache:{request.resolver_match.view_name}:{path}:{versions}'
+
+
+def is_cacheable_request(request):
+    """Anonymous GET/HEAD with no flash messages waiting to be shown"""
+    if request.method not in ('GET', 'HEAD') or request.user.is_authenticated:
+        return False
+    storage = getattr(request, '_messages', None)
+    return storage is None or not len(storage)
+
+
+def cache_anonymous_page(*groups):
+    """
+    Serve the view's response from cache for anonymous visitors.
+
+    Args:
+        *groups: Data groups the page renders (see core.signals)
+    """
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            if not getattr(settings, 'PAGE_CACHE_ENABLED', True) or not is_cacheable_request(request):
+                return view_func(request, *args, **kwargs)
+
+            key = page_cache_key(request, groups)
+            response = cache.get(key)
+            if response is not None:
+                return response
+
+            response = view_func(request, *args, **kwargs)
+            # Pages carrying a CSRF token or setting cookies are per visitor
+            if (
+                request.method == 'GET'
+                and response.status_code == 200
+                and not response.streaming
+                and not response.cookies
+                and not request.META.get('CSRF_COOKIE_NEEDS_UPDATE')
+            ):
+                cache.set(key, response, getattr(settings, 'PAGE_CACHE_TIMEOUT', 300))
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,109 @@
+"""
+Read-replica routing
+
+Reporting pages (settings.READ_REPLICA_VIEWS) read from the replica
+database so their heavy queries stay off the primary that bookings and
+check-ins write to. Everything else, and every write, uses the primary.
+
+ReplicaRoutingMiddleware marks the current request as replica-eligible.
+After a user's own write, their reads stay on the primary for
+READ_REPLICA_STICKY_SECONDS (a cookie), so they never see a replica that has
+not caught up with them yet.
+"""
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+_state = ContextVar('replica_routing', default=None)
+
+STICKY_COOKIE = 'primary_reads'
+
+
+class RoutingState:
+    """Routing decisions for the request being served"""
+    __slots__ = ('use_replica', 'wrote')
+
+    def __init__(self):
+        self.use_replica = False
+        self.wrote = False
+
+
+def replica_alias():
+    """The replica's alias in settings.DATABASES, or None when there is none"""
+    return getattr(settings, 'READ_REPLICA_ALIAS', None)
+
+
+class ReplicaRouter:
+    """Send reads from replica-eligible requests to the replica, all else to the primary"""
+
+    def db_for_read(self, model, **hints):
+        state = _state.get()
+        alias = replica_alias()
+        # Reads after a write in the same request must see that write
+        if alias and state is not None and state.use_replica and not state.wrote:
+            return alias
+        return None
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None:
+            state.wrote = True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # The replica is a copy of the primary, never migrated on its own
+        if db == replica_alias():
+            return False
+        return None
+
+
+def _stream_with_state(content, state):
+    """Yield `content`, routing the queries that produce each chunk with `state`"""
+    iterator = iter(content)
+    while True:
+        # Set per chunk: the server may pull chunks from a different context
+        token = _state.set(state)
+        try:
+            chunk = next(iterator)
+        except StopIteration:
+            return
+        finally:
+            _state.reset(token)
+        yield chunk
+
+
+class ReplicaRoutingMiddleware:
+    """Route reads of READ_REPLICA_VIEWS to the replica; keep writers on the primary"""
+
+    def __init__(self, get_response):
+        if not replica_alias():
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        state = RoutingState()
+        token = _state.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            _state.reset(token)
+
+        if response.streaming and not response.is_async:
+            # Streamed exports query while the body is sent, after this returns
+            response.streaming_content = _stream_with_state(response.streaming_content, state)
+
+        if state.wrote:
+            response.set_cookie(
+                STICKY_COOKIE, '1', max_age=settings.READ_REPLICA_STICKY_SECONDS,
+                httponly=True, samesite='Lax',
+            )
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        state = _state.get()
+        state.use_replica = (
+            request.method in ('GET', 'HEAD')
+            and STICKY_COOKIE not in request.COOKIES
+            and request.resolver_match.view_name in settings.READ_REPLICA_VIEWS
+        )
@@ -0,0 +1,44 @@
+from django.db.models.signals import post_save, post_delete, m2m_changed
+from django.dispatch import receiver
+
+from bookings.models import GymClass, ClassSchedule, Booking
+from workouts.featured import invalidate_featured_workouts
+from workouts.models import Workout
+from .models import MembershipPlan, PlanFeature, Trainer
+from .page_cache import bump_page_version
+
+
+@receiver(post_save, sender=MembershipPlan)
+@receiver(post_delete, sender=MembershipPlan)
+@receiver(post_save, sender=PlanFeature)
+@receiver(post_delete, sender=PlanFeature)
+@receiver(m2m_changed, sender=MembershipPlan.included_workouts.through)
+def plans_changed(sender, **kwargs):
+    """Drop cached pricing pages when plans, their features or workouts change"""
+    bump_page_version('plans')
+
+
+@receiver(post_save, sender=Workout)
+@receiver(post_delete, sender=Workout)
+def workouts_changed(sender, **kwargs):
+    """Drop cached homepage and library pages when workouts change"""
+    bump_page_version('workouts')
+    invalidate_featured_workouts()
+
+
+@receiver(post_save, sender=GymClass)
+@receiver(post_delete, sender=GymClass)
+@receiver(post_save, sender=Trainer)
+@receiver(post_delete, sender=Trainer)
+def classes_changed(sender, **kwargs):
+    """Drop cached pages listing classes when a class or its trainer changes"""
+    bump_page_version('classes')
+
+
+@receiver(post_save, sender=ClassSchedule)
+@receiver(post_delete, sender=ClassSchedule)
+@receiver(post_save, sender=Booking)
+@receiver(post_delete, sender=Booking)
+def sessions_changed(sender, **kwargs):
+    """Drop the cached schedule page when sessions or their free spots change"""
+    bump_page_version('sessions')
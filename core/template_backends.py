@@ -0,0 +1,29 @@
+"""
+Template backend with render timing
+
+DjangoTemplates is Django's own backend whose templates add their render time
+to the current request's metrics (see core.middleware), so template time is
+measured without patching Django's Template class. Configured as the BACKEND
+in settings.TEMPLATES.
+"""
+from django.template.backends.django import DjangoTemplates as BaseDjangoTemplates, Template
+
+from .middleware import template_timer
+
+
+class TimedTemplate(Template):
+    """A Django template whose render time counts towards the request's template time"""
+
+    def render(self, context=None, request=None):
+        with template_timer():
+            return super().render(context, request)
+
+
+class DjangoTemplates(BaseDjangoTemplates):
+    """The Django template backend, returning TimedTemplate instances"""
+
+    def from_string(self, template_code):
+        return TimedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        return TimedTemplate(super().get_template(template_name).template, self)
@@ -0,0 +1,335 @@
+"""
+Test helpers: a seeded gym and per-URL query / render-time budgets
+
+QueryBudgetTestCase seeds a realistic dataset once per test class, then
+requests URLs as each role (staff, trainer, member, anonymous) and fails if
+a request runs more SQL queries or takes longer than its budget. Budgets are
+declared per URL name in each app's tests.py; every named URL of the app's
+urlconf must have one, so new pages cannot slip in unbudgeted.
+"""
+import logging
+import random
+import time
+from datetime import time as dt_time, timedelta
+from unittest import SkipTest
+from decimal import Decimal
+from types import SimpleNamespace
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLPattern, URLResolver, reverse
+from django.utils import timezone
+
+ROLES = ['staff', 'trainer', 'member', 'anonymous']
+
+SEED_MEMBERS = 40
+SEED_WORKOUTS = 36
+SEED_CLASSES = 6
+SEED_DAYS = 14
+
+
+def seed_gym_data(members=SEED_MEMBERS, workouts=SEED_WORKOUTS, classes=SEED_CLASSES, days=SEED_DAYS, seed=1):
+    """
+    Create a small but realistic gym: plans, trainers, classes with schedules,
+    workouts, members with subscriptions, bookings, completions, visits,
+    posts, likes and challenges.
+
+    Every list is large enough that a per-row query shows up as a budget
+    failure. Deterministic for a given seed.
+
+    Returns:
+        SimpleNamespace: the objects tests build URLs from (staff, trainer,
+        member, plan, gym_class, schedule, booking, workout, workout_plan,
+        post, challenge, trainer_subscription, ...)
+    """
+    from core.models import (
+        CustomUser, MembershipPlan, PlanFeature, Subscription, Trainer,
+        PersonalTrainerSubscription, UserPoints, UserStreak, Visit,
+    )
+    from bookings.models import GymClass, ClassSchedule, Booking
+    from workouts.models import (
+        Workout, UserWorkoutCompletion, WorkoutPlan, UserWorkoutPlan, TrainerAssignedWorkout,
+    )
+    from community.models import Post, Comment, Like, Challenge, UserChallenge
+    from workouts.popularity import refresh_workout_stats
+    from workouts.recommendations import refresh_workout_neighbors
+    from workouts.similarity import refresh_similar_workouts
+
+    rng = random.Random(seed)
+    now = timezone.now()
+    today = timezone.localdate()
+
+    staff = CustomUser.objects.create_user(
+        'staff', 'staff@example.com', 'password', first_name='Sam', last_name='Staff',
+        is_staff=True, is_superuser=True,
+    )
+
+    categories = [choice for choice, _ in Workout.CATEGORY_CHOICES]
+    workout_list = [
+        Workout.objects.create(
+            title=f'Workout {index}',
+            description=f'Seeded workout {index}',
+            category=categories[index % len(categories)],
+            difficulty_level=str(index % 3 + 1),
+            sets=rng.randint(1, 5),
+            is_free=index % 3 == 0,
+        )
+        for index in range(workouts)
+    ]
+
+    plans = []
+    for index, (name, price, duration) in enumerate([
+        ('Basic', '999.00', '1_month'),
+        ('Pro', '2499.00', '3_months'),
+        ('Elite', '8999.00', '12_months'),
+    ]):
+        plan = MembershipPlan.objects.create(name=name, price=Decimal(price), features='Gym access', duration=duration)
+        plan.included_workouts.set(workout_list[: (index + 1) * workouts // 3])
+        for order in range(3):
+            PlanFeature.objects.create(plan=plan, feature_text=f'{name} feature {order}', order=order)
+        plans.append(plan)
+
+    trainers = []
+    for index in range(3):
+        user = CustomUser.objects.create_user(
+            f'trainer{index}', f'trainer{index}@example.com', 'password',
+            first_name='Trainer', last_name=str(index),
+        )
+        trainers.append(Trainer.objects.create(user=user, bio='Certified coach', specializations='Strength, HIIT'))
+
+    gym_classes = []
+    schedules = []
+    for index in range(classes):
+        gym_class = GymClass.objects.create(
+            name=f'Class {index}',
+            description=f'Seeded class {index}',
+            trainer=trainers[index % len(trainers)],
+            duration=60,
+            max_capacity=20,
+            is_paid=index % 2 == 1,
+            price=Decimal('299.00') if index % 2 == 1 else None,
+        )
+        gym_classes.append(gym_class)
+        for day in range(-2, days):
+            schedules.append(ClassSchedule.objects.create(
+                gym_class=gym_class,
+                class_date=today + timedelta(days=day),
+                class_time=dt_time(6 + index * 2, 0),
+            ))
+
+    challenges = [
+        Challenge.objects.create(
+            name=f'{goal_type.title()} Challenge',
+            description='Seeded challenge',
+            start_date=today - timedelta(days=7),
+            end_date=today + timedelta(days=21),
+            goal_type=goal_type,
+        )
+        for goal_type, _ in Challenge.GOAL_TYPES
+    ]
+
+    workout_plans = []
+    for index, trainer in enumerate(trainers):
+        workout_plan = WorkoutPlan.objects.create(trainer=trainer, name=f'Plan {index}', description='Seeded plan')
+        workout_plan.workouts.set(rng.sample(workout_list, 6))
+        workout_plans.append(workout_plan)
+
+    member_list = []
+    posts = []
+    for index in range(members):
+        member = CustomUser.objects.create_user(
+            f'member{index}', f'member{index}@example.com', 'password',
+            first_name='Member', last_name=str(index), phone_number=f'98765{index:05d}',
+        )
+        member_list.append(member)
+
+        plan = plans[index % len(plans)]
+        Subscription.objects.create(
+            user=member, plan=plan, status='active' if index % 5 else 'cancelled',
+            current_period_start=now - timedelta(days=10),
+        )
+        UserStreak.objects.create(user=member, current_streak=index % 7, longest_streak=index % 11, last_activity_date=today)
+
+        member_schedules = rng.sample([s for s in schedules if s.class_date >= today], 3)
+        for schedule in member_schedules:
+            Booking.objects.create(
+                user=member, gym_class=schedule.gym_class, class_schedule=schedule,
+                booking_date=schedule.class_date, status='confirmed',
+            )
+
+        for workout in rng.sample(workout_list, 5):
+            UserWorkoutCompletion.objects.create(user=member, workout=workout)
+            UserPoints.objects.create(user=member, points=10, source='workout', description=f'Completed {workout.title}')
+
+        for day in range(3):
+            Visit.objects.create(user=member, visited_at=now - timedelta(days=day, hours=rng.randint(0, 12)))
+            UserPoints.objects.create(user=member, points=5, source='checkin', description='Gym check-in')
+
+        post = Post.objects.create(user=member, content=f'Post by member {index}')
+        posts.append(post)
+
+        for challenge in challenges[: 1 + index % len(challenges)]:
+            UserChallenge.objects.create(user=member, challenge=challenge, progress=rng.randint(0, 20))
+
+        trainer = trainers[index % len(trainers)]
+        UserWorkoutPlan.objects.create(user=member, plan=workout_plans[index % len(workout_plans)])
+        TrainerAssignedWorkout.objects.create(trainer=trainer, user=member, workout=rng.choice(workout_list))
+
+    for post in posts:
+        likers = rng.sample(member_list, 5)
+        for liker in likers:
+            Like.objects.create(post=post, user=liker)
+        post.likes_count = len(likers)
+        post.save(update_fields=['likes_count'])
+        Comment.objects.create(post=post, user=rng.choice(member_list), content='Nice!')
+
+    refresh_workout_stats()
+    refresh_workout_neighbors()
+    refresh_similar_workouts()
+
+    member = member_list[1]
+    trainer_subscription = PersonalTrainerSubscription.objects.create(
+        user=member, trainer=trainers[0], price=Decimal('4999.00'),
+    )
+    booking = member.bookings.order_by('id').first()
+    trainer_booking = Booking.objects.filter(gym_class__trainer=trainers[0]).order_by('id').first()
+    # A session the member has not booked yet
+    open_schedule = ClassSchedule.objects.filter(class_date__gt=today).exclude(bookings__user=member).order_by('id').first()
+
+    return SimpleNamespace(
+        staff=staff,
+        trainer=trainers[0].user,
+        trainer_profile=trainers[0],
+        member=member,
+        members=member_list,
+        plan=plans[1],
+        plans=plans,
+        gym_class=trainers[0].gymclass_set.order_by('id').first(),
+        schedule=booking.class_schedule,
+        booking=booking,
+        trainer_booking=trainer_booking,
+        open_schedule=open_schedule,
+        workout=workout_list[0],
+        workout_plan=workout_plans[0],
+        post=posts[0],
+        challenge=challenges[0],
+        trainer_subscription=trainer_subscription,
+    )
+
+
+def named_patterns(urlpatterns):
+    """Names of every named URL in a urlpatterns list (includes are not followed)"""
+    names = set()
+    for pattern in urlpatterns:
+        if isinstance(pattern, URLPattern) and pattern.name:
+            names.add(pattern.name)
+        elif isinstance(pattern, URLResolver):
+            names |= named_patterns(pattern.url_patterns)
+    return names
+
+
+def budget(queries, method='get', data=None, kwargs=None, **role_queries):
+    """
+    Budget for one URL.
+
+    Args:
+        queries: Max queries for any role without its own entry
+        method: 'get' or 'post'
+        data: POST data, or a function of the seeded data returning it
+        kwargs: Function of the seeded data returning the URL kwargs
+        **role_queries: Per-role max queries (staff=, trainer=, member=, anonymous=)
+    """
+    return SimpleNamespace(
+        queries=queries, method=method, data=data, kwargs=kwargs, role_queries=role_queries,
+    )
+
+
+# Hashing seeded passwords with PBKDF2 would dominate the run time
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class QueryBudgetTestCase(TestCase):
+    """
+    Assert query and render-time budgets for every URL of a urlconf.
+
+    Subclasses set `urlpatterns`, `namespace` ('' for the root urlconf) and
+    `budgets` ({url name: budget(...)}).
+    """
+    urlpatterns = []
+    namespace = ''
+    budgets = {}
+
+    # Wall-clock ceiling per request; generous so slow CI machines pass
+    max_ms = getattr(settings, 'REQUEST_TIME_BUDGET_MS', 1000)
+
+    @classmethod
+    def setUpClass(cls):
+        if cls is QueryBudgetTestCase:
+            # Imported into tests.py modules; only subclasses carry budgets
+            raise SkipTest('Base class')
+        super().setUpClass()
+        # These tests assert tighter budgets themselves; the middleware's
+        # over-budget warnings would only repeat them in the test output
+        metrics_logger = logging.getLogger('core.middleware')
+        cls.addClassCleanup(setattr, metrics_logger, 'disabled', metrics_logger.disabled)
+        metrics_logger.disabled = True
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.data = seed_gym_data()
+
+    def setUp(self):
+        # Cached metrics/pages would hide the queries behind them
+        cache.clear()
+
+    def client_for(self, role):
+        client = self.client_class()
+        if role != 'anonymous':
+            client.force_login(getattr(self.data, role))
+        return client
+
+    def url_for(self, name, entry):
+        full_name = f'{self.namespace}:{name}' if self.namespace else name
+        kwargs = entry.kwargs(self.data) if entry.kwargs else None
+        return reverse(full_name, kwargs=kwargs)
+
+    def assertWithinBudget(self, role, name, entry):
+        url = self.url_for(name, entry)
+        client = self.client_for(role)
+        data = entry.data(self.data) if callable(entry.data) else entry.data
+        max_queries = entry.role_queries.get(role, entry.queries)
+
+        with CaptureQueriesContext(connection) as queries:
+            start = time.perf_counter()
+            response = getattr(client, entry.method)(url, data)
+            if response.streaming:
+                b''.join(response.streaming_content)
+            elapsed_ms = (time.perf_counter() - start) * 1000
+
+        self.assertLess(response.status_code, 500, f'{role} {entry.method.upper()} {url}')
+        self.assertLessEqual(
+            len(queries), max_queries,
+            f'{role} {entry.method.upper()} {url} ran {len(queries)} queries (budget {max_queries}):\n'
+            + '\n'.join(query['sql'] for query in queries.captured_queries),
+        )
+        self.assertLessEqual(
+            elapsed_ms, self.max_ms,
+            f'{role} {entry.method.upper()} {url} took {elapsed_ms:.0f} ms (budget {self.max_ms} ms)',
+        )
+
+    def test_every_url_has_a_budget(self):
+        missing = named_patterns(self.urlpatterns) - set(self.budgets)
+        self.assertFalse(missing, f'URLs without a query budget: {sorted(missing)}')
+
+    def test_query_budgets(self):
+        for name, entry in self.budgets.items():
+            for role in ROLES:
+                with self.subTest(url=name, role=role):
+                    # Each request gets a clean slate (POSTs may change data)
+                    sid = transaction.savepoint()
+                    try:
+                        cache.clear()
+                        self.assertWithinBudget(role, name, entry)
+                    finally:
+                        transaction.savepoint_rollback(sid)
@@ -1,3 +1,422 @@
-from django.test import TestCase
+import io
+import time
+from datetime import timedelta
+from decimal import Decimal
+from types import SimpleNamespace
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from core import urls
+from core.management.commands.loadtest_booking import takes_lock
+from core.member_import import import_members
+from core.middleware import metrics_store
+from core.models import CustomUser, MembershipPlan, QRCodeSession, Visit
+from core.occupancy import get_occupancy, is_on_site, record_checkin, record_checkout
+from core.testing import QueryBudgetTestCase, budget, seed_gym_data
+from core.utils import CHECKIN_QR_PREFIX, InvalidCheckinToken, make_checkin_token, verify_checkin_token
+from staff.search import search_members
+
+
+class CoreQueryBudgetTests(QueryBudgetTestCase):
+    """Query and render-time budgets for core/urls.py"""
+    urlpatterns = urls.urlpatterns
+    budgets = {
+        'home': budget(11, anonymous=5),
+        'about': budget(3),
+        'contact': budget(3),
+        'pricing': budget(5, anonymous=2),
+        # N+1: upcoming sessions and their available_spots() per class
+        'schedule': budget(31),
+        'register': budget(2),
+        'login': budget(3),
+        'logout': budget(4, method='post'),
+        'password_reset': budget(3),
+        'password_reset_done': budget(2),
+        'password_reset_confirm': budget(3, kwargs=lambda data: {'uidb64': 'MQ', 'token': 'invalid-token'}),
+        'password_reset_complete': budget(2),
+        'dashboard': budget(30, staff=11, trainer=11),
+        'qr_code': budget(3),
+        'occupancy': budget(1),
+        'select_trainer': budget(7),
+        'subscribe_trainer': budget(7, kwargs=lambda data: {'trainer_id': data.trainer_profile.id}),
+        'cancel_trainer_subscription': budget(
+            4, kwargs=lambda data: {'subscription_id': data.trainer_subscription.id},
+        ),
+    }
+
+
+class SQLiteConnectionTests(TestCase):
+    """PRAGMAs applied to every SQLite connection by core.db"""
+
+    def setUp(self):
+        if connection.vendor != 'sqlite':
+            self.skipTest('SQLite only')
+
+    def pragma(self, name):
+        with connection.cursor() as cursor:
+            cursor.execute(f'PRAGMA {name}')
+            return cursor.fetchone()[0]
+
+    def test_busy_timeout(self):
+        self.assertEqual(self.pragma('busy_timeout'), settings.SQLITE_BUSY_TIMEOUT_MS)
+
+    def test_synchronous_normal(self):
+        # 0 OFF, 1 NORMAL, 2 FULL
+        self.assertEqual(self.pragma('synchronous'), 1)
+
+    def test_write_transactions_begin_immediate(self):
+        self.assertEqual(connection.transaction_mode, 'IMMEDIATE')
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class RequestMetricsTests(TestCase):
+    """Samples recorded by core.middleware and its template backend"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.data = seed_gym_data(members=6, workouts=8, classes=2, days=2)
+
+    def setUp(self):
+        cache.clear()
+        metrics_store.reset()
+        self.client.force_login(self.data.staff)
+
+    def sample(self, view_name):
+        return {row['view']: row for row in metrics_store.summary()}.get(view_name)
+
+    def test_queries_and_template_time(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse('pricing'))
+        sample = self.sample('pricing')
+        self.assertEqual(sample['queries']['max'], len(queries))
+        self.assertGreater(sample['template_ms']['max'], 0)
+
+    def test_streamed_response_measured_until_sent(self):
+        response = self.client.get(reverse('staff:export', kwargs={'dataset': 'members'}))
+        self.assertTrue(response.streaming)
+        self.assertIsNone(self.sample('staff:export'))
+
+        with CaptureQueriesContext(connection) as queries:
+            b''.join(response.streaming_content)
+        self.assertGreater(len(queries), 0)
+        # The queries run while rows were sent are in the sample too
+        self.assertGreater(self.sample('staff:export')['queries']['max'], len(queries))
+
+
+@override_settings(CHECKIN_TOKEN_MAX_AGE=30)
+class CheckinTokenTests(SimpleTestCase):
+    """Signed, single-use check-in tokens (no database needed)"""
+
+    member = SimpleNamespace(id=42)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_valid_token_with_qr_prefix(self):
+        token = make_checkin_token(self.member)
+        self.assertEqual(verify_checkin_token(f' {CHECKIN_QR_PREFIX}{token}\n'), 42)
+
+    def test_tampered_token(self):
+        _, rest = make_checkin_token(self.member).split(':', 1)
+        with self.assertRaisesMessage(InvalidCheckinToken, 'Invalid QR code.'):
+            verify_checkin_token(f'43:{rest}')
+
+    def test_expired_token(self):
+        token = make_checkin_token(self.member)
+        with mock.patch('django.core.signing.time.time', return_value=time.time() + 31):
+            with self.assertRaisesMessage(InvalidCheckinToken, 'This QR code has expired.'):
+                verify_checkin_token(token)
+
+    def test_replayed_nonce(self):
+        token = make_checkin_token(self.member)
+        verify_checkin_token(token)
+        with self.assertRaisesMessage(InvalidCheckinToken, 'This QR code has already been used.'):
+            verify_checkin_token(token)
+
+
+class LoadTestLockClassificationTests(SimpleTestCase):
+    """Which statements loadtest_booking times as lock waits"""
+
+    def test_writes_and_begin_take_locks(self):
+        for sql in ('INSERT INTO "b" VALUES (1)', '  UPDATE "b" SET "status" = 1', 'DELETE FROM "b"', 'BEGIN IMMEDIATE'):
+            self.assertTrue(takes_lock(sql), sql)
+
+    def test_select_naming_update_columns_does_not(self):
+        self.assertFalse(takes_lock('SELECT "b"."updated_at", "b"."deleted" FROM "b" WHERE "b"."id" = 1'))
+        self.assertFalse(takes_lock('SELECT 1 FROM "b" WHERE "b"."note" = \'FOR UPDATE\' LIMIT 1'))
+
+    def test_select_for_update_does(self):
+        self.assertTrue(takes_lock('SELECT "s"."id" FROM "s" WHERE "s"."id" = 1 FOR UPDATE'))
+        self.assertTrue(takes_lock('SELECT "s"."id" FROM "s" WHERE "s"."id" IN (1, 2) FOR UPDATE OF "s" NOWAIT'))
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class AnonymousPageCacheTests(TestCase):
+    """core.page_cache: anonymous pages are cached until their data changes"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.data = seed_gym_data(members=6, workouts=8, classes=2, days=3)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_second_anonymous_request_runs_no_queries(self):
+        for name in ['home', 'about', 'pricing', 'schedule', 'workouts:library']:
+            with self.subTest(url=name):
+                first = self.client.get(reverse(name))
+                with self.assertNumQueries(0):
+                    second = self.client.get(reverse(name))
+                self.assertEqual(first.content, second.content)
+
+    def test_query_string_is_part_of_the_key(self):
+        url = reverse('workouts:library')
+        unfiltered = self.client.get(url)
+        filtered = self.client.get(url, {'search': 'Workout 1'})
+        self.assertNotEqual(unfiltered.content, filtered.content)
+
+    def test_authenticated_users_are_not_served_cached_pages(self):
+        self.client.get(reverse('pricing'))
+        self.client.force_login(self.data.member)
+        response = self.client.get(reverse('pricing'))
+        self.assertContains(response, 'Logout')
+
+    def test_plan_change_invalidates_pricing(self):
+        self.client.get(reverse('pricing'))
+        plan = self.data.plans[0]
+        plan.name = 'Renamed Basic'
+        plan.save()
+        self.assertContains(self.client.get(reverse('pricing')), 'Renamed Basic')
+
+    def test_booking_invalidates_schedule(self):
+        self.client.get(reverse('schedule'))
+        with self.assertNumQueries(0):
+            self.client.get(reverse('schedule'))
+        self.data.booking.delete()
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse('schedule'))
+        self.assertTrue(queries)
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class ConditionalGetTests(TestCase):
+    """core.conditional: 304 until the page's data or viewer changes"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.data = seed_gym_data(members=6, workouts=8, classes=2, days=3)
+
+    def setUp(self):
+        cache.clear()
+
+    def revalidate(self, url):
+        etag = self.client.get(url)['ETag']
+        return self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+    def test_unchanged_pages_return_304(self):
+        self.client.force_login(self.data.member)
+        for url in [
+            reverse('pricing'),
+            reverse('schedule'),
+            reverse('workouts:library'),
+            reverse('workouts:workout_detail', args=[self.data.workout.id]),
+            reverse('community:challenge_detail', args=[self.data.challenge.id]),
+            reverse('community:feed'),
+        ]:
+            with self.subTest(url=url):
+                self.assertEqual(self.revalidate(url).status_code, 304)
+
+    def test_content_change_returns_new_page(self):
+        url = reverse('community:feed')
+        etag = self.client.get(url)['ETag']
+        self.data.post.content = 'Edited post'
+        self.data.post.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertContains(response, 'Edited post')
+
+    def test_viewer_change_returns_new_page(self):
+        url = reverse('pricing')
+        etag = self.client.get(url)['ETag']
+        self.client.force_login(self.data.member)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_completion_changes_workout_detail(self):
+        self.client.force_login(self.data.member)
+        url = reverse('workouts:workout_detail', args=[self.data.workout.id])
+        etag = self.client.get(url)['ETag']
+        self.data.member.workout_completions.create(workout=self.data.workout)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class MemberImportTests(TestCase):
+    """core.member_import: bulk users, hashed passwords and subscriptions"""
+
+    CSV = (
+        'email,username,first_name,last_name,date_of_birth,password,plan,status,period_start\n'
+        'ana@example.com,ana,Ana,Silva,1990-04-02,s3cret-pass,Gold,,2026-01-01\n'
+        'Ben@Example.com,,Ben,Okafor,,,2,cancelled,\n'
+        'ana@example.com,,Duplicate,,,,,,\n'
+        'not-an-email,,Bad,,1990-13-40,,Platinum,frozen,\n'
+        'existing@example.com,,Already,Here,,,,,\n'
+    )
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.gold = MembershipPlan.objects.create(name='Gold', price=Decimal('999'), features='All', duration='3_months')
+        cls.silver = MembershipPlan.objects.create(name='Silver', price=Decimal('499'), features='Gym')
+        CustomUser.objects.create_user('existing', 'existing@example.com', 'password')
+
+    def run_import(self, **kwargs):
+        kwargs.setdefault('workers', 1)
+        return import_members(io.BytesIO(self.CSV.encode()), **kwargs)
+
+    def test_members_and_subscriptions_are_created(self):
+        result = self.run_import()
+        self.assertEqual((result.rows, result.created, result.skipped, result.error_count), (5, 2, 2, 1))
+        line, message = result.errors[0]
+        self.assertEqual(line, 5)
+        for field in ('email', 'date_of_birth', 'plan', 'status'):
+            self.assertIn(field, message)
+
+        ana = CustomUser.objects.get(username='ana')
+        self.assertTrue(ana.check_password('s3cret-pass'))
+        self.assertEqual(str(ana.date_of_birth), '1990-04-02')
+        subscription = ana.subscriptions.get()
+        self.assertEqual((subscription.plan, subscription.status), (self.gold, 'active'))
+        self.assertEqual((subscription.current_period_end - subscription.current_period_start).days, 90)
+
+        ben = CustomUser.objects.get(email='ben@example.com')
+        self.assertEqual(ben.username, 'ben')
+        self.assertFalse(ben.has_usable_password())
+        self.assertEqual(ben.subscriptions.get().plan, self.silver)
+
+    def test_reset_links_for_members_without_password(self):
+        links = []
+        self.run_import(reset_links=links, base_url='https://gym.example.com/')
+        self.assertEqual([email for email, _, _ in links], ['ben@example.com'])
+        response = self.client.get(links[0][2].removeprefix('https://gym.example.com'))
+        # A valid token redirects to the set-password form
+        self.assertRedirects(response, response.url, fetch_redirect_response=False)
+        self.assertIn('set-password', response.url)
+
+    def test_passwords_hashed_in_worker_processes(self):
+        self.run_import(workers=2)
+        self.assertTrue(CustomUser.objects.get(username='ana').check_password('s3cret-pass'))
+
+    def test_imported_members_are_searchable(self):
+        self.run_import()
+        self.assertIn(
+            CustomUser.objects.get(username='ana'),
+            search_members(CustomUser.objects.all(), 'Silva'),
+        )
+
+
+@override_settings(GYM_EXPECTED_DWELL_MINUTES=30, GYM_CAPACITY=10)
+class OccupancyTests(TestCase):
+    """Live on-site count kept in the cache and rebuilt from visits"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.ann = CustomUser.objects.create_user('ann')
+        cls.bob = CustomUser.objects.create_user('bob')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_checkin_counts_member(self):
+        record_checkin(self.ann.id)
+        self.assertTrue(is_on_site(self.ann.id))
+        self.assertFalse(is_on_site(self.bob.id))
+        self.assertEqual(get_occupancy()['count'], 1)
+
+    def test_checkout_removes_member_and_closes_visit(self):
+        visit = Visit.objects.create(user=self.ann)
+        record_checkin(self.ann.id, visit.visited_at)
+        record_checkout(self.ann.id)
+        self.assertFalse(is_on_site(self.ann.id))
+        self.assertEqual(get_occupancy()['count'], 0)
+        visit.refresh_from_db()
+        self.assertIsNotNone(visit.checked_out_at)
+
+    def test_entries_expire_after_dwell_time(self):
+        record_checkin(self.ann.id)
+        with mock.patch('core.occupancy.time.time', return_value=time.time() + 29 * 60):
+            self.assertTrue(is_on_site(self.ann.id))
+        with mock.patch('core.occupancy.time.time', return_value=time.time() + 31 * 60):
+            self.assertFalse(is_on_site(self.ann.id))
+            self.assertEqual(get_occupancy()['count'], 0)
+
+    def test_rebuild_restores_open_visits_only(self):
+        now = timezone.now()
+        Visit.objects.create(user=self.ann, visited_at=now - timedelta(minutes=10))
+        Visit.objects.create(user=self.bob, visited_at=now - timedelta(minutes=5), checked_out_at=now)
+        Visit.objects.create(user=self.bob, visited_at=now - timedelta(minutes=45))
+        record_checkin(self.bob.id)
+        cache.clear()
+
+        self.assertEqual(get_occupancy()['count'], 1)
+        self.assertTrue(is_on_site(self.ann.id))
+        self.assertFalse(is_on_site(self.bob.id))
+
+    def test_levels(self):
+        # (members on site, percent, level) with a capacity of 10
+        expected = [(0, 0, 'quiet'), (3, 30, 'quiet'), (4, 40, 'moderate'), (7, 70, 'moderate'),
+                    (8, 80, 'busy'), (12, 100, 'busy')]
+        for count, percent, level in expected:
+            with self.subTest(count=count):
+                cache.clear()
+                for user_id in range(1000, 1000 + count):
+                    record_checkin(user_id)
+                occupancy = get_occupancy()
+                self.assertEqual(occupancy, {'count': count, 'capacity': 10, 'percent': percent, 'level': level})
+
+    @override_settings(GYM_CAPACITY=0)
+    def test_zero_capacity(self):
+        record_checkin(self.ann.id)
+        self.assertEqual(get_occupancy(), {'count': 1, 'capacity': 0, 'percent': 0, 'level': 'quiet'})
+
+
+class BackfillVisitsTests(TestCase):
+    """backfill_visits turns used QR sessions into visits exactly once"""
+
+    @classmethod
+    def setUpTestData(cls):
+        ann = CustomUser.objects.create_user('ann')
+        bob = CustomUser.objects.create_user('bob')
+        start = timezone.now() - timedelta(days=10)
+        cls.used = []
+        for i, user in enumerate([ann, bob, ann, bob, ann]):
+            # ann and bob share a timestamp, so batches mix users and times
+            used_at = start + timedelta(hours=i // 2)
+            cls.used.append((user.id, used_at))
+            QRCodeSession.objects.create(
+                user=user, session_token=f'used-{i}', expires_at=used_at, used_at=used_at,
+            )
+        QRCodeSession.objects.create(user=ann, session_token='unused', expires_at=start)
+
+    def backfill(self):
+        out = io.StringIO()
+        call_command('backfill_visits', batch_size=2, stdout=out)
+        return out.getvalue()
+
+    def visits(self):
+        return sorted(Visit.objects.values_list('user_id', 'visited_at', 'method'))
+
+    def test_one_visit_per_used_session(self):
+        self.assertIn('Backfilled 5 visits.', self.backfill())
+        self.assertEqual(self.visits(), sorted((user_id, used_at, 'qr') for user_id, used_at in self.used))
+
+    def test_rerun_creates_no_duplicates(self):
+        self.backfill()
+        visits = self.visits()
+        self.assertIn('Backfilled 0 visits.', self.backfill())
+        self.assertEqual(self.visits(), visits)
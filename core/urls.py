@@ -22,6 +22,7 @@ urlpatterns = [
     # Member pages
     path('dashboard/', views.dashboard, name='dashboard'),
     path('qr-code/', views.qr_code, name='qr_code'),
+    path('occupancy/', views.occupancy, name='occupancy'),
     
     # Personal Trainer
     path('trainers/', views.select_trainer, name='select_trainer'),
@@ -1,9 +1,13 @@
 import qrcode
 import io
 import base64
+import secrets
 from datetime import datetime, timedelta
+from django.conf import settings
+from django.core import signing
+from django.core.cache import cache
 from django.utils import timezone
-from .models import QRCodeSession, UserPoints, UserStreak
+from .models import UserPoints, UserStreak
 
 # Import challenge models
 try:
@@ -13,31 +17,76 @@ except ImportError:
     UserChallenge = None
 
 
+CHECKIN_TOKEN_SALT = 'core.checkin'
+CHECKIN_QR_PREFIX = 'GYM_PRANAMYA:'
+
+
+class InvalidCheckinToken(Exception):
+    """Raised when a check-in token is forged, expired or already used"""
+
+
+def _checkin_token_max_age():
+    return getattr(settings, 'CHECKIN_TOKEN_MAX_AGE', 30)
+
+
+def make_checkin_token(user):
+    """
+    Create a signed, time-bounded check-in token for a user.
+    
+    The token is "<user_id>:<nonce>:<timestamp>:<signature>" signed with
+    SECRET_KEY, so it can be verified without touching the database.
+    """
+    signer = signing.TimestampSigner(salt=CHECKIN_TOKEN_SALT)
+    return signer.sign(f"{user.id}:{secrets.token_urlsafe(6)}")
+
+
+def verify_checkin_token(token):
+    """
+    Verify a check-in token and mark it as used.
+    
+    Used nonces are kept in the cache only for the token lifetime, after which
+    the signature check rejects the token anyway.
+    
+    Args:
+        token: Token from make_checkin_token (with or without the QR prefix)
+    
+    Returns:
+        int: ID of the user the token was issued to
+    
+    Raises:
+        InvalidCheckinToken: If the token is invalid, expired or replayed
+    """
+    token = token.strip()
+    if token.startswith(CHECKIN_QR_PREFIX):
+        token = token[len(CHECKIN_QR_PREFIX):]
+    
+    max_age = _checkin_token_max_age()
+    signer = signing.TimestampSigner(salt=CHECKIN_TOKEN_SALT)
+    try:
+        value = signer.unsign(token, max_age=max_age)
+    except signing.SignatureExpired:
+        raise InvalidCheckinToken('This QR code has expired.')
+    except signing.BadSignature:
+        raise InvalidCheckinToken('Invalid QR code.')
+    
+    user_id, nonce = value.split(':', 1)
+    # cache.add only succeeds for the first caller, so a token checks in once.
+    # The nonce is used up before the caller looks the member up, on purpose:
+    # a token is single use whatever the outcome (the member scans the next
+    # QR code, which refreshes within max_age), and replays are rejected
+    # without a database read.
+    if not cache.add(f"checkin_nonce:{nonce}", user_id, timeout=max_age + 5):
+        raise InvalidCheckinToken('This QR code has already been used.')
+    return int(user_id)
+
+
 def generate_qr_code(user):
-    """Generate QR code for gym entry"""
-    # Create or get existing active session
-    expires_at = timezone.now() + timedelta(seconds=30)  # 30 second expiry
-    
-    # Generate session token
-    session_token = f"{user.id}_{int(timezone.now().timestamp())}"
-    
-    # Create QR session
-    qr_session, created = QRCodeSession.objects.update_or_create(
-        user=user,
-        expires_at__gt=timezone.now(),
-        defaults={
-            'session_token': session_token,
-            'expires_at': expires_at,
-        }
-    )
-    
-    if not created:
-        qr_session.session_token = session_token
-        qr_session.expires_at = expires_at
-        qr_session.save()
+    """Generate QR code for gym entry (pure CPU, no database access)"""
+    session_token = make_checkin_token(user)
+    expires_at = timezone.now() + timedelta(seconds=_checkin_token_max_age())
     
     # Generate QR code data
-    qr_data_string = f"GYM_PRANAMYA:{user.id}:{session_token}:{int(expires_at.timestamp())}"
+    qr_data_string = f"{CHECKIN_QR_PREFIX}{session_token}"
     
     # Create QR code image
     qr = qrcode.QRCode(version=1, box_size=10, border=5)
@@ -2,44 +2,41 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth import login, logout
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.db.models import Sum
+from django.db.models import Count, Sum
+from django.http import JsonResponse
 from django.utils import timezone
 from .models import MembershipPlan, Subscription, CustomUser, UserPoints, Trainer, PersonalTrainerSubscription
 from .forms import RegistrationForm, ContactForm
+from .conditional import conditional_page
+from .page_cache import cache_anonymous_page, get_page_versions
 from bookings.models import Booking, GymClass
 from workouts.models import UserWorkoutPlan, Workout
 from datetime import datetime, timedelta
 
 
+@cache_anonymous_page('workouts', 'classes')
 def home(request):
     """Homepage view"""
-    # Get featured workouts (mix of free and popular categories)
-    featured_workouts = Workout.objects.all().order_by('?')[:6]  # Random 6 workouts
+    from workouts.featured import get_featured_workouts
+    from workouts.popularity import get_trending_workouts
+
+    # Random 6 workouts, with access flags for the current user
+    featured_workouts = get_featured_workouts(request.user)
     
     # Get workouts by category for quick access
     workout_categories = Workout.CATEGORY_CHOICES[:8]  # Show first 8 categories
     
-    # Check user access for workouts if authenticated
-    if request.user.is_authenticated:
-        from workouts.utils import user_has_access_to_workout, can_view_workout_details
-        for workout in featured_workouts:
-            workout.has_access = user_has_access_to_workout(request.user, workout)
-            workout.can_view_details = can_view_workout_details(request.user, workout)
-    else:
-        from workouts.utils import can_view_workout_details
-        for workout in featured_workouts:
-            workout.has_access = workout.is_free  # Non-authenticated users only see free workouts
-            workout.can_view_details = can_view_workout_details(request.user, workout)
-    
     context = {
         'active_members': CustomUser.objects.filter(is_active=True).count(),
         'total_classes': GymClass.objects.filter(is_active=True).count(),
         'featured_workouts': featured_workouts,
+        'trending_workouts': get_trending_workouts(request.user),
         'workout_categories': workout_categories,
     }
     return render(request, 'home.html', context)
 
 
+@cache_anonymous_page()
 def about(request):
     """About Us page"""
     return render(request, 'about.html')
@@ -58,12 +55,21 @@ def contact(request):
     return render(request, 'contact.html', {'form': form})
 
 
+@conditional_page(lambda request: get_page_versions(['plans']))
+@cache_anonymous_page('plans')
 def pricing(request):
     """Membership plans page"""
-    plans = MembershipPlan.objects.filter(is_active=True).order_by('price')
+    plans = (
+        MembershipPlan.objects.filter(is_active=True)
+        .annotate(included_workout_count=Count('included_workouts'))
+        .prefetch_related('plan_features')
+        .order_by('price')
+    )
     return render(request, 'pricing.html', {'plans': plans})
 
 
+@conditional_page(lambda request: get_page_versions(['classes', 'sessions']))
+@cache_anonymous_page('classes', 'sessions')
 def schedule(request):
     """Class schedule page - shows upcoming class schedules"""
     from django.utils import timezone
@@ -187,7 +193,12 @@ def dashboard(request):
             user=user
         ).select_related('workout').order_by('-assigned_at')
     
+    from .occupancy import get_occupancy
+    from workouts.recommendations import get_recommended_workouts
+    
     context = {
+        'occupancy': get_occupancy(),
+        'recommended_workouts': get_recommended_workouts(user),
         'subscription': subscription,
         'subscription_details': subscription_details,
         'upcoming_bookings': upcoming_bookings,
@@ -213,6 +224,15 @@ def qr_code(request):
     return render(request, 'core/qr_code.html', context)
 
 
+def occupancy(request):
+    """Live gym occupancy as JSON (polled by the lobby screen)"""
+    from .occupancy import get_occupancy
+    
+    response = JsonResponse(get_occupancy())
+    response['Cache-Control'] = 'no-cache'
+    return response
+
+
 def custom_logout(request):
     """Custom logout view that accepts GET requests"""
     logout(request)
@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
 from pathlib import Path
+import copy
 import os
 from dotenv import load_dotenv
 
@@ -54,6 +55,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.RequestMetricsMiddleware',
+    'core.routers.ReplicaRoutingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -68,7 +71,8 @@ ROOT_URLCONF = 'gym_pranamya.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # Django's backend, with render timing for core.middleware
+        'BACKEND': 'core.template_backends.DjangoTemplates',
         'DIRS': [BASE_DIR / 'templates'],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -89,13 +93,119 @@ WSGI_APPLICATION = 'gym_pranamya.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
-DATABASES = {
+# DB_ENGINE=sqlite (default) or postgres
+DB_ENGINE = os.getenv('DB_ENGINE', 'sqlite')
+
+if DB_ENGINE == 'postgres':
+    # Pooling needs psycopg[pool]; it keeps connections open itself, so
+    # persistent connections (CONN_MAX_AGE) are only used without it
+    DB_POOL = os.getenv('DB_POOL', 'True') == 'True'
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.getenv('DB_NAME', 'fitzone'),
+            'USER': os.getenv('DB_USER', 'postgres'),
+            'PASSWORD': os.getenv('DB_PASSWORD', ''),
+            'HOST': os.getenv('DB_HOST', 'localhost'),
+            'PORT': os.getenv('DB_PORT', '5432'),
+            'CONN_MAX_AGE': 0 if DB_POOL else int(os.getenv('DB_CONN_MAX_AGE', '60')),
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {
+                'pool': {
+                    'min_size': int(os.getenv('DB_POOL_MIN_SIZE', '2')),
+                    'max_size': int(os.getenv('DB_POOL_MAX_SIZE', '10')),
+                    'timeout': int(os.getenv('DB_POOL_TIMEOUT', '10')),
+                },
+            } if DB_POOL else {},
+        }
+    }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.getenv('DB_NAME', BASE_DIR / 'db.sqlite3'),
+            'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', '0')),
+            'OPTIONS': {
+                # BEGIN IMMEDIATE: writers queue on busy_timeout for the lock
+                # instead of failing when a read transaction tries to write
+                'transaction_mode': 'IMMEDIATE',
+            },
+        }
+    }
+
+# Optional read replica for the reporting pages (see core/routers.py). To try
+# it locally, copy db.sqlite3 and point DB_REPLICA_NAME at the copy
+DB_REPLICA_NAME = os.getenv('DB_REPLICA_NAME')
+DB_REPLICA_HOST = os.getenv('DB_REPLICA_HOST')
+if DB_REPLICA_NAME or DB_REPLICA_HOST:
+    DATABASES['replica'] = copy.deepcopy(DATABASES['default'])
+    DATABASES['replica'].update({
+        'NAME': DB_REPLICA_NAME or DATABASES['default']['NAME'],
+        'HOST': DB_REPLICA_HOST or DATABASES['default'].get('HOST', ''),
+        'PORT': os.getenv('DB_REPLICA_PORT', DATABASES['default'].get('PORT', '')),
+        # Tests read the replica through the primary's connection
+        'TEST': {'MIRROR': 'default'},
+    })
+
+READ_REPLICA_ALIAS = 'replica' if 'replica' in DATABASES else None
+DATABASE_ROUTERS = ['core.routers.ReplicaRouter']
+
+# Views (URL names) whose GET requests read from the replica
+READ_REPLICA_VIEWS = [
+    'staff:dashboard',
+    'staff:member_list',
+    'staff:reports',
+    'staff:peak_hours',
+    'staff:cohort_retention',
+    'staff:export',
+]
+# Seconds a user's reads stay on the primary after they write
+READ_REPLICA_STICKY_SECONDS = int(os.getenv('READ_REPLICA_STICKY_SECONDS', '10'))
+
+# PRAGMAs applied to every new SQLite connection (see core/db.py)
+SQLITE_JOURNAL_MODE = os.getenv('SQLITE_JOURNAL_MODE', 'WAL')
+SQLITE_SYNCHRONOUS = os.getenv('SQLITE_SYNCHRONOUS', 'NORMAL')
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv('SQLITE_BUSY_TIMEOUT_MS', '5000'))
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+
+# Use a shared backend (e.g. django.core.cache.backends.redis.RedisCache) when
+# running several workers or the nightly report jobs
+CACHES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'BACKEND': os.getenv('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', 'fitzone'),
     }
 }
 
+# Full-page cache for anonymous visitors to public pages (core/page_cache.py);
+# pages are also dropped as soon as the plans/classes/workouts they show change
+PAGE_CACHE_ENABLED = os.getenv('PAGE_CACHE_ENABLED', 'True') == 'True'
+PAGE_CACHE_TIMEOUT = int(os.getenv('PAGE_CACHE_TIMEOUT', '300'))
+
+# Seconds the homepage's pool of featured workout ids stays cached (also
+# dropped whenever a workout changes)
+FEATURED_WORKOUTS_CACHE_TTL = int(os.getenv('FEATURED_WORKOUTS_CACHE_TTL', '3600'))
+
+# Processes resizing thumbnails for imports uploaded on the staff page
+# (workouts/importer.py). 1 resizes inside the web process, so an upload never
+# starts a pool beside the web workers; 0 uses the CPU count, up to 4. The
+# import_workouts command has its own --workers
+WORKOUT_IMPORT_WORKERS = int(os.getenv('WORKOUT_IMPORT_WORKERS', '1')) or None
+
+# Seconds the staff/admin dashboard metrics stay cached (also invalidated on writes)
+DASHBOARD_METRICS_CACHE_TTL = int(os.getenv('DASHBOARD_METRICS_CACHE_TTL', '60'))
+
+# Seconds a signed QR check-in token stays valid; used tokens are remembered
+# in the cache for the same window, so use a shared cache with several workers
+CHECKIN_TOKEN_MAX_AGE = int(os.getenv('CHECKIN_TOKEN_MAX_AGE', '30'))
+
+# Live occupancy: members count as on site for this long after checking in
+GYM_EXPECTED_DWELL_MINUTES = int(os.getenv('GYM_EXPECTED_DWELL_MINUTES', '90'))
+GYM_CAPACITY = int(os.getenv('GYM_CAPACITY', '100'))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -163,3 +273,30 @@ EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
 # Tailwind Configuration
 TAILWIND_APP_NAME = 'theme'
 NPM_BIN_PATH = r"C:\Program Files\nodejs\npm.cmd" if os.name == 'nt' else 'npm'
+
+# Request instrumentation (core.middleware.RequestMetricsMiddleware)
+REQUEST_METRICS_ENABLED = os.getenv('REQUEST_METRICS_ENABLED', 'True') == 'True'
+REQUEST_METRICS_SAMPLES = int(os.getenv('REQUEST_METRICS_SAMPLES', '500'))  # Kept per view
+REQUEST_METRICS_IGNORE_NAMESPACES = ['django_browser_reload']
+QUERY_BUDGET_DEFAULT = int(os.getenv('QUERY_BUDGET_DEFAULT', '50'))
+QUERY_BUDGETS = {
+    # view name -> max queries, overriding QUERY_BUDGET_DEFAULT
+}
+REQUEST_TIME_BUDGET_MS = int(os.getenv('REQUEST_TIME_BUDGET_MS', '1000'))
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'core.middleware': {
+            'handlers': ['console'],
+            'level': 'WARNING',
+            'propagate': False,
+        },
+    },
+}
@@ -2,11 +2,10 @@ from django.shortcuts import render, redirect
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.core.exceptions import PermissionDenied
-from django.db.models import Count, Sum
 from django.views.generic import TemplateView
 from django.utils.decorators import method_decorator
 
-from core.models import CustomUser, Subscription
+from .metrics import get_dashboard_metrics
 
 
 @method_decorator(login_required, name='dispatch')
@@ -25,15 +24,11 @@ class AdminDashboardView(TemplateView):
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         
-        # Key metrics
-        context['total_users'] = CustomUser.objects.count()
-        context['active_subscriptions'] = Subscription.objects.filter(status='active').count()
-        
-        # Calculate total revenue from active subscriptions
-        total_revenue = Subscription.objects.filter(status='active').aggregate(
-            total=Sum('plan__price')
-        )['total'] or 0
-        context['total_revenue'] = total_revenue
+        # Key metrics (cached, shared with the staff dashboard)
+        metrics = get_dashboard_metrics()
+        context['total_users'] = metrics['total_users']
+        context['active_subscriptions'] = metrics['active_subscriptions']
+        context['total_revenue'] = metrics['total_mrr']
         
         return context
 
@@ -0,0 +1,270 @@
+"""
+Attendance analytics for the staff portal
+
+Timestamps are pulled with a single values_list query per source and binned
+with NumPy, instead of issuing one COUNT per bucket.
+"""
+from datetime import datetime, time, timedelta
+from itertools import islice
+
+import numpy as np
+from django.core.cache import cache
+from django.utils import timezone
+
+PEAK_HOURS_CACHE_TTL = 15 * 60  # Ranges that include today
+PEAK_HOURS_HISTORY_CACHE_TTL = 24 * 60 * 60  # Ranges entirely in the past
+
+COHORT_RETENTION_CACHE_KEY = 'staff:cohort_retention'
+# Refreshed nightly by `manage.py refresh_cohort_retention`; the extra hour
+# keeps the old report around until the job has run
+COHORT_RETENTION_CACHE_TTL = 25 * 60 * 60
+
+WEEKDAYS = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']
+EPOCH_WEEKDAY = 3  # 1970-01-01 was a Thursday (Monday = 0)
+SECONDS_PER_DAY = 24 * 60 * 60
+# Activity rows fetched and converted to arrays at a time
+ACTIVITY_CHUNK_SIZE = 10000
+
+
+def _start_of_day(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def _bin_weekday_hour(weekdays, hours):
+    """Count events into a 7x24 matrix (weekday x hour)"""
+    return np.bincount(weekdays * 24 + hours, minlength=7 * 24).reshape(7, 24)
+
+
+def _visit_matrix(start_date, end_date):
+    from core.models import Visit
+
+    # Bounds as datetimes so the visited_at index can be used
+    timestamps = Visit.objects.filter(
+        visited_at__gte=_start_of_day(start_date),
+        visited_at__lt=_start_of_day(end_date + timedelta(days=1)),
+    ).order_by().values_list('visited_at', flat=True)
+
+    seconds = np.fromiter(
+        (int(ts.timestamp()) for ts in timestamps.iterator(chunk_size=10000)),
+        dtype=np.int64,
+    )
+    # Shift to local wall-clock time. A single offset is exact for zones
+    # without DST (UTC, Asia/Kolkata).
+    seconds += int(timezone.localtime().utcoffset().total_seconds())
+
+    weekdays = (seconds // SECONDS_PER_DAY + EPOCH_WEEKDAY) % 7
+    hours = (seconds % SECONDS_PER_DAY) // 3600
+    return _bin_weekday_hour(weekdays, hours)
+
+
+def _booking_matrix(start_date, end_date):
+    from bookings.models import Booking
+
+    sessions = list(
+        Booking.objects.filter(
+            class_schedule__class_date__gte=start_date,
+            class_schedule__class_date__lte=end_date,
+            status__in=['confirmed', 'completed'],
+        ).order_by().values_list('class_schedule__class_date', 'class_schedule__class_time')
+    )
+    if not sessions:
+        return np.zeros((7, 24), dtype=np.int64)
+
+    dates, times = zip(*sessions)
+    days = np.array(dates, dtype='datetime64[D]').astype(np.int64)
+    weekdays = (days + EPOCH_WEEKDAY) % 7
+    hours = np.fromiter((t.hour for t in times), dtype=np.int64, count=len(times))
+    return _bin_weekday_hour(weekdays, hours)
+
+
+def _heatmap_rows(matrix):
+    """Template-friendly rows with each cell's share of the busiest slot"""
+    peak = int(matrix.max()) or 1
+    return [
+        {
+            'day': WEEKDAYS[day],
+            'cells': [
+                {'count': int(count), 'intensity': round(int(count) * 100 / peak)}
+                for count in matrix[day]
+            ],
+        }
+        for day in range(7)
+    ]
+
+
+def get_peak_hours(start_date, end_date):
+    """
+    Weekday x hour heatmaps of check-ins and class bookings for a date range.
+
+    Bookings are placed at their class session's date and time. Results are
+    cached per range.
+
+    Returns:
+        dict: visits / bookings (heatmap rows), visit_total, booking_total,
+              busiest_visit_slot and busiest_booking_slot
+    """
+    cache_key = f'staff:peak_hours:{start_date.isoformat()}:{end_date.isoformat()}'
+    result = cache.get(cache_key)
+    if result is not None:
+        return result
+
+    visits = _visit_matrix(start_date, end_date)
+    bookings = _booking_matrix(start_date, end_date)
+
+    def busiest(matrix):
+        if not matrix.any():
+            return None
+        day, hour = np.unravel_index(matrix.argmax(), matrix.shape)
+        return f'{WEEKDAYS[day]} {hour:02d}:00'
+
+    result = {
+        'visits': _heatmap_rows(visits),
+        'bookings': _heatmap_rows(bookings),
+        'visit_total': int(visits.sum()),
+        'booking_total': int(bookings.sum()),
+        'busiest_visit_slot': busiest(visits),
+        'busiest_booking_slot': busiest(bookings),
+    }
+
+    in_past = end_date < timezone.localdate()
+    cache.set(cache_key, result, PEAK_HOURS_HISTORY_CACHE_TTL if in_past else PEAK_HOURS_CACHE_TTL)
+    return result
+
+
+def default_range(days=28):
+    """The last `days` days, ending today"""
+    end_date = timezone.localdate()
+    return end_date - timedelta(days=days - 1), end_date
+
+
+def _local_months(timestamps):
+    """Months since 1970-01 (local time) for an iterable of aware datetimes"""
+    seconds = np.fromiter(
+        (int(ts.timestamp()) for ts in timestamps),
+        dtype=np.int64,
+    )
+    seconds += int(timezone.localtime().utcoffset().total_seconds())
+    return seconds.astype('datetime64[s]').astype('datetime64[M]').astype(np.int64)
+
+
+def _date_months(dates):
+    """Months since 1970-01 for a list of dates"""
+    return np.array(dates, dtype='datetime64[M]').astype(np.int64)
+
+
+def _activity_pairs():
+    """
+    All (user_id, month) pairs with a visit, booking or workout completion.
+
+    Returns:
+        tuple: (user_ids, months) as int64 arrays
+    """
+    from core.models import Visit
+    from bookings.models import Booking
+    from workouts.models import UserWorkoutCompletion
+
+    user_ids = []
+    months = []
+
+    sources = [
+        (Visit.objects.values_list('user_id', 'visited_at'), _local_months),
+        (UserWorkoutCompletion.objects.values_list('user_id', 'completed_at'), _local_months),
+        (
+            Booking.objects.filter(status__in=['confirmed', 'completed']).values_list('user_id', 'booking_date'),
+            _date_months,
+        ),
+    ]
+    for queryset, to_months in sources:
+        # One pass over the rows, binned a chunk at a time: only the int64
+        # arrays are kept, never every row at once
+        rows = queryset.order_by().iterator(chunk_size=ACTIVITY_CHUNK_SIZE)
+        while chunk := list(islice(rows, ACTIVITY_CHUNK_SIZE)):
+            ids, stamps = zip(*chunk)
+            user_ids.append(np.array(ids, dtype=np.int64))
+            months.append(to_months(stamps))
+
+    if not user_ids:
+        return np.array([], dtype=np.int64), np.array([], dtype=np.int64)
+    return np.concatenate(user_ids), np.concatenate(months)
+
+
+def compute_cohort_retention():
+    """
+    Build the signup-month cohort retention matrix.
+
+    Cell [c, k] is the share of cohort c's members that had any activity
+    (visit, class booking or workout completion) k months after signing up.
+    Every source is read once and binned with NumPy, so the cost grows with
+    the number of rows rather than cohorts x months.
+
+    Returns:
+        dict: cohorts (label, size, retention percentages by month offset)
+              and max_offset
+    """
+    from core.models import CustomUser
+
+    members = list(
+        CustomUser.objects.filter(is_staff=False).order_by('id').values_list('id', 'created_at')
+    )
+    if not members:
+        return {'cohorts': [], 'max_offset': 0}
+
+    member_ids = np.array([member_id for member_id, _ in members], dtype=np.int64)
+    signup_months = _local_months(created_at for _, created_at in members)
+
+    first_month = int(signup_months.min())
+    current_month = int(np.datetime64(timezone.localdate(), 'M').astype(np.int64))
+    n_cohorts = current_month - first_month + 1
+    n_offsets = n_cohorts
+
+    cohort_index = signup_months - first_month
+    cohort_sizes = np.bincount(cohort_index, minlength=n_cohorts)
+
+    # Map activity rows to members (member_ids is sorted, so searchsorted works)
+    user_ids, months = _activity_pairs()
+    positions = np.searchsorted(member_ids, user_ids)
+    positions = np.clip(positions, 0, len(member_ids) - 1)
+    is_member = member_ids[positions] == user_ids
+    positions, months = positions[is_member], months[is_member]
+
+    offsets = months - signup_months[positions]
+    valid = (offsets >= 0) & (offsets < n_offsets)
+    positions, offsets = positions[valid], offsets[valid]
+
+    # Count each member at most once per month offset
+    active = np.unique(positions * n_offsets + offsets)
+    active_cohorts = cohort_index[active // n_offsets]
+    active_offsets = active % n_offsets
+    counts = np.bincount(
+        active_cohorts * n_offsets + active_offsets,
+        minlength=n_cohorts * n_offsets,
+    ).reshape(n_cohorts, n_offsets)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        retention = np.where(cohort_sizes[:, None] > 0, counts * 100.0 / cohort_sizes[:, None], 0.0)
+
+    cohorts = []
+    for index in range(n_cohorts):
+        size = int(cohort_sizes[index])
+        if not size:
+            continue
+        month = np.datetime64(first_month + index, 'M').astype(object)
+        # Only offsets that have already happened
+        elapsed = n_cohorts - index
+        cohorts.append({
+            'label': month.strftime('%b %Y'),
+            'size': size,
+            'retention': [round(float(value), 1) for value in retention[index, :elapsed]],
+        })
+
+    return {'cohorts': cohorts, 'max_offset': n_offsets - 1}
+
+
+def get_cohort_retention(refresh=False):
+    """Cached cohort retention report (see compute_cohort_retention)"""
+    report = None if refresh else cache.get(COHORT_RETENTION_CACHE_KEY)
+    if report is None:
+        report = compute_cohort_retention()
+        report['generated_at'] = timezone.now()
+        cache.set(COHORT_RETENTION_CACHE_KEY, report, COHORT_RETENTION_CACHE_TTL)
+    return report
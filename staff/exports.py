@@ -0,0 +1,165 @@
+"""
+Streaming CSV exports for staff reports
+"""
+import csv
+
+from django.http import Http404, StreamingHttpResponse
+from django.utils import timezone
+
+from .search import search_members
+
+# Rows fetched from the database per round trip while streaming
+EXPORT_CHUNK_SIZE = 2000
+
+
+class InvalidExportFilter(ValueError):
+    """Raised when an export's GET filter cannot be applied (the view answers 400)"""
+
+
+class Echo:
+    """File-like object that hands each written line straight back to the caller"""
+    def write(self, value):
+        return value
+
+
+def _members(params):
+    from core.models import CustomUser
+
+    queryset = CustomUser.objects.filter(is_staff=False)
+    search_query = params.get('search')
+    if search_query:
+        queryset = search_members(queryset, search_query)
+    return queryset.order_by('id').values_list(
+        'id', 'username', 'first_name', 'last_name', 'email',
+        'phone_number', 'is_active', 'created_at',
+    )
+
+
+def _subscriptions(params):
+    from core.models import Subscription
+
+    queryset = Subscription.objects.all()
+    status = params.get('status')
+    if status:
+        queryset = queryset.filter(status=status)
+    return queryset.order_by('id').values_list(
+        'id', 'user_id', 'user__username', 'plan__name', 'plan__price', 'status',
+        'current_period_start', 'current_period_end', 'created_at',
+    )
+
+
+def _bookings(params):
+    from bookings.models import Booking
+
+    queryset = Booking.objects.all()
+    status = params.get('status')
+    if status:
+        queryset = queryset.filter(status=status)
+    return queryset.order_by('id').values_list(
+        'id', 'user_id', 'user__username', 'gym_class__name',
+        'class_schedule__class_date', 'class_schedule__class_time',
+        'booking_date', 'status', 'created_at',
+    )
+
+
+def _points(params):
+    from core.models import UserPoints
+
+    queryset = UserPoints.objects.all()
+    source = params.get('source')
+    if source:
+        queryset = queryset.filter(source=source)
+    return queryset.order_by('id').values_list(
+        'id', 'user_id', 'user__username', 'points', 'source', 'description', 'created_at',
+    )
+
+
+def _challenge_standings(params):
+    from community.models import Challenge, UserChallenge
+
+    queryset = UserChallenge.objects.all()
+    challenge_id = params.get('challenge')
+    if challenge_id:
+        try:
+            challenge_id = int(challenge_id)
+        except ValueError:
+            raise InvalidExportFilter(f'challenge must be a challenge ID, not "{challenge_id}".')
+        if not Challenge.objects.filter(id=challenge_id).exists():
+            raise Http404('Unknown challenge')
+        queryset = queryset.filter(challenge_id=challenge_id)
+    return queryset.order_by('challenge_id', '-progress', 'joined_at').values_list(
+        'challenge_id', 'challenge__name', 'challenge__goal_type',
+        'user_id', 'user__username', 'progress', 'joined_at',
+    )
+
+
+# dataset name -> (CSV header, function building a values_list queryset from GET params)
+EXPORTS = {
+    'members': (
+        ['ID', 'Username', 'First Name', 'Last Name', 'Email', 'Phone', 'Active', 'Joined'],
+        _members,
+    ),
+    'subscriptions': (
+        ['ID', 'User ID', 'Username', 'Plan', 'Price', 'Status', 'Period Start', 'Period End', 'Created'],
+        _subscriptions,
+    ),
+    'bookings': (
+        ['ID', 'User ID', 'Username', 'Class', 'Session Date', 'Session Time', 'Booking Date', 'Status', 'Created'],
+        _bookings,
+    ),
+    'points': (
+        ['ID', 'User ID', 'Username', 'Points', 'Source', 'Description', 'Created'],
+        _points,
+    ),
+    'challenge_standings': (
+        ['Challenge ID', 'Challenge', 'Goal Type', 'User ID', 'Username', 'Progress', 'Joined'],
+        _challenge_standings,
+    ),
+}
+
+
+def _clean(value):
+    """Format a cell value, neutralising spreadsheet formulas in text fields"""
+    if value is None:
+        return ''
+    if isinstance(value, str) and value[:1] in ('=', '+', '-', '@'):
+        return "'" + value
+    return value
+
+
+def iter_csv_rows(header, queryset, chunk_size=EXPORT_CHUNK_SIZE):
+    """Yield CSV-encoded lines for the header and each queryset row"""
+    writer = csv.writer(Echo())
+    yield writer.writerow(header)
+    for row in queryset.iterator(chunk_size=chunk_size):
+        yield writer.writerow([_clean(value) for value in row])
+
+
+def stream_export(dataset, params):
+    """
+    Build a streaming CSV response for an export dataset.
+
+    Args:
+        dataset: Key of EXPORTS
+        params: QueryDict of optional filters (search, status, source, challenge)
+
+    Returns:
+        StreamingHttpResponse, or None if the dataset is unknown
+
+    Raises:
+        InvalidExportFilter: A filter value is malformed
+        Http404: A filter names something that does not exist
+    """
+    if dataset not in EXPORTS:
+        return None
+
+    header, build_queryset = EXPORTS[dataset]
+    # Filters are checked here, before the response starts streaming
+    queryset = build_queryset(params)
+    filename = f"{dataset}_{timezone.now():%Y%m%d_%H%M}.csv"
+    response = StreamingHttpResponse(
+        iter_csv_rows(header, queryset),
+        content_type='text/csv',
+    )
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
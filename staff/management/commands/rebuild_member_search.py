@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from staff.search import rebuild_member_index
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the member search index (run after bulk user imports)'
+
+    def handle(self, *args, **options):
+        count = rebuild_member_index()
+        if count is None:
+            self.stdout.write('No FTS5 member index on this database; nothing to rebuild.')
+        else:
+            self.stdout.write(self.style.SUCCESS(f'Indexed {count} users.'))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from staff.analytics import get_cohort_retention
+
+
+class Command(BaseCommand):
+    help = 'Recompute the cached cohort retention report (schedule nightly; needs a shared cache backend)'
+
+    def handle(self, *args, **options):
+        report = get_cohort_retention(refresh=True)
+        self.stdout.write(self.style.SUCCESS(f"Cohort retention refreshed ({len(report['cohorts'])} cohorts)."))
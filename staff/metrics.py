@@ -0,0 +1,76 @@
+"""
+Dashboard metrics shared by the staff and admin dashboards
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Sum, Q
+from django.utils import timezone
+
+DASHBOARD_METRICS_CACHE_KEY = 'staff:dashboard_metrics'
+
+
+def get_dashboard_metrics():
+    """
+    Get the key dashboard metrics, served from cache when possible.
+
+    The cached value expires after DASHBOARD_METRICS_CACHE_TTL seconds and is
+    also dropped whenever a user, subscription, booking, class or plan changes
+    (see staff.signals).
+
+    Returns:
+        dict: total_users, total_members, new_members_7d, active_subscriptions,
+              total_mrr, active_classes and bookings_today
+    """
+    metrics = cache.get(DASHBOARD_METRICS_CACHE_KEY)
+    if metrics is None:
+        metrics = compute_dashboard_metrics()
+        cache.set(
+            DASHBOARD_METRICS_CACHE_KEY,
+            metrics,
+            getattr(settings, 'DASHBOARD_METRICS_CACHE_TTL', 60)
+        )
+    return metrics
+
+
+def compute_dashboard_metrics():
+    """Compute all dashboard metrics with two aggregate queries"""
+    from core.models import CustomUser
+    from bookings.models import GymClass
+
+    today = timezone.now().date()
+    seven_days_ago = today - timedelta(days=7)
+    active_sub = Q(subscriptions__status='active')
+
+    # Users LEFT JOIN subscriptions: users are counted distinct, while each
+    # subscription row appears exactly once so its count/sum are not inflated
+    user_metrics = CustomUser.objects.aggregate(
+        total_users=Count('id', distinct=True),
+        total_members=Count('id', distinct=True, filter=Q(is_staff=False)),
+        new_members_7d=Count(
+            'id',
+            distinct=True,
+            filter=Q(is_staff=False, created_at__date__gte=seven_days_ago)
+        ),
+        active_subscriptions=Count('subscriptions', filter=active_sub),
+        total_mrr=Sum('subscriptions__plan__price', filter=active_sub),
+    )
+
+    # Classes LEFT JOIN bookings: every booking belongs to exactly one class
+    class_metrics = GymClass.objects.aggregate(
+        active_classes=Count('id', distinct=True, filter=Q(is_active=True)),
+        bookings_today=Count(
+            'bookings',
+            filter=Q(bookings__booking_date=today, bookings__status='confirmed')
+        ),
+    )
+
+    metrics = {**user_metrics, **class_metrics}
+    metrics['total_mrr'] = metrics['total_mrr'] or 0
+    return metrics
+
+
+def invalidate_dashboard_metrics():
+    """Drop the cached dashboard metrics so the next request recomputes them"""
+    cache.delete(DASHBOARD_METRICS_CACHE_KEY)
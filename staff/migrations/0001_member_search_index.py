@@ -0,0 +1,57 @@
+from django.db import migrations
+
+SEARCH_FIELDS = ['username', 'email', 'first_name', 'last_name', 'phone_number']
+
+
+def create_search_index(apps, schema_editor):
+    """FTS5 table on SQLite, pg_trgm GIN indexes on PostgreSQL"""
+    connection = schema_editor.connection
+    user_table = apps.get_model('core', 'CustomUser')._meta.db_table
+
+    if connection.vendor == 'sqlite':
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT sqlite_compileoption_used('ENABLE_FTS5')")
+            if not cursor.fetchone()[0]:
+                # Without FTS5 the member search falls back to LIKE scans
+                return
+            cursor.execute(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS staff_member_search USING fts5("
+                f"{', '.join(SEARCH_FIELDS)}, "
+                "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+            )
+            values = ', '.join(f"COALESCE({field}, '')" for field in SEARCH_FIELDS)
+            cursor.execute(
+                f"INSERT INTO staff_member_search (rowid, {', '.join(SEARCH_FIELDS)}) "
+                f"SELECT id, {values} FROM {user_table}"
+            )
+
+    elif connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+            for field in SEARCH_FIELDS:
+                # Matches Django's icontains SQL: UPPER("field"::text) LIKE UPPER(%s)
+                cursor.execute(
+                    f'CREATE INDEX IF NOT EXISTS staff_member_search_{field}_trgm '
+                    f'ON {user_table} USING gin (UPPER({field}::text) gin_trgm_ops)'
+                )
+
+
+def drop_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            cursor.execute('DROP TABLE IF EXISTS staff_member_search')
+        elif connection.vendor == 'postgresql':
+            for field in SEARCH_FIELDS:
+                cursor.execute(f'DROP INDEX IF EXISTS staff_member_search_{field}_trgm')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_personaltrainersubscription'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
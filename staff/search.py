@@ -0,0 +1,171 @@
+"""
+Indexed member search for the staff portal
+
+On SQLite members are indexed in an FTS5 table (staff_member_search) kept in
+sync by signals; on PostgreSQL the user columns carry pg_trgm GIN indexes, so
+the ILIKE predicates below are index scans instead of full table scans. Both
+are created by staff/migrations/0001_member_search_index.py.
+
+Every backend splits the query into words and requires each word to match
+some field, so 'jo smi' finds John Smith wherever the search runs.
+"""
+import operator
+import re
+from functools import reduce
+
+from django.db import connection, connections
+from django.db.models import Case, IntegerField, Q, Value, When
+from django.db.models.functions import Coalesce, Greatest
+
+MEMBER_SEARCH_TABLE = 'staff_member_search'
+MEMBER_SEARCH_FIELDS = ['username', 'email', 'first_name', 'last_name', 'phone_number']
+
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+_fts_available = {}
+
+
+def fts_available(using='default'):
+    """Check (once per process) whether the FTS5 member index exists"""
+    if using not in _fts_available:
+        conn = connections[using]
+        _fts_available[using] = (
+            conn.vendor == 'sqlite'
+            and MEMBER_SEARCH_TABLE in conn.introspection.table_names()
+        )
+    return _fts_available[using]
+
+
+def build_match_query(query):
+    """
+    Turn free text into an FTS5 prefix query.
+
+    Every word must match the start of a token in some column, e.g.
+    'jo smi' -> '"jo"* "smi"*'. Punctuation is dropped so user input can
+    never inject FTS5 syntax.
+    """
+    tokens = _TOKEN_RE.findall(query.lower())
+    return ' '.join(f'"{token}"*' for token in tokens)
+
+
+def search_members(queryset, query):
+    """
+    Filter a CustomUser queryset to members matching a search query.
+
+    Each word of the query must match (a prefix of a word in) some field.
+    Results are ordered by relevance (best first), newest members first on ties:
+    FTS5 rank on SQLite, summed trigram similarity per word on PostgreSQL and
+    the number of words matching the start of a field elsewhere.
+
+    Args:
+        queryset: CustomUser queryset to search within
+        query: Free text (name, username, email or phone number fragments)
+
+    Returns:
+        QuerySet: Matching users
+    """
+    query = query.strip()
+    if not query:
+        return queryset
+
+    vendor = connections[queryset.db].vendor
+    if vendor == 'sqlite' and fts_available(queryset.db):
+        match = build_match_query(query)
+        if not match:
+            return queryset.none()
+        table = queryset.model._meta.db_table
+        return queryset.extra(
+            select={'search_rank': f'{MEMBER_SEARCH_TABLE}.rank'},
+            tables=[MEMBER_SEARCH_TABLE],
+            where=[
+                f'{MEMBER_SEARCH_TABLE}.rowid = {table}.id',
+                f'{MEMBER_SEARCH_TABLE} MATCH %s',
+            ],
+            params=[match],
+        ).order_by('search_rank', '-created_at')
+
+    words = _TOKEN_RE.findall(query.lower())
+    if not words:
+        return queryset.none()
+    for word in words:
+        predicate = Q()
+        for field in MEMBER_SEARCH_FIELDS:
+            predicate |= Q(**{f'{field}__icontains': word})
+        queryset = queryset.filter(predicate)
+
+    if vendor == 'postgresql':
+        from django.contrib.postgres.search import TrigramSimilarity
+        ranks = [
+            Greatest(*[
+                TrigramSimilarity(Coalesce(field, Value('')), word)
+                for field in MEMBER_SEARCH_FIELDS
+            ])
+            for word in words
+        ]
+    else:
+        ranks = [
+            Case(
+                When(_starts_with_any(word), then=Value(1)),
+                default=Value(0),
+                output_field=IntegerField(),
+            )
+            for word in words
+        ]
+    return queryset.annotate(
+        search_rank=reduce(operator.add, ranks)
+    ).order_by('-search_rank', '-created_at')
+
+
+def _starts_with_any(word):
+    """Q matching users with a field that starts with the given word"""
+    predicate = Q()
+    for field in MEMBER_SEARCH_FIELDS:
+        predicate |= Q(**{f'{field}__istartswith': word})
+    return predicate
+
+
+def index_member(user):
+    """Add or refresh a user's row in the FTS5 member index"""
+    if not fts_available():
+        return
+    values = [getattr(user, field) or '' for field in MEMBER_SEARCH_FIELDS]
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {MEMBER_SEARCH_TABLE} WHERE rowid = %s', [user.pk])
+        cursor.execute(
+            f'INSERT INTO {MEMBER_SEARCH_TABLE} (rowid, {", ".join(MEMBER_SEARCH_FIELDS)}) '
+            f'VALUES (%s, {", ".join(["%s"] * len(MEMBER_SEARCH_FIELDS))})',
+            [user.pk, *values]
+        )
+
+
+def unindex_member(user_id):
+    """Remove a user from the FTS5 member index"""
+    if not fts_available():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {MEMBER_SEARCH_TABLE} WHERE rowid = %s', [user_id])
+
+
+def rebuild_member_index():
+    """
+    Rebuild the FTS5 member index from the user table.
+
+    Needed after bulk_create/update() imports, which bypass the sync signals.
+
+    Returns:
+        int: Number of indexed users, or None if there is no FTS5 index
+    """
+    if not fts_available():
+        return None
+    from core.models import CustomUser
+
+    table = CustomUser._meta.db_table
+    columns = ', '.join(MEMBER_SEARCH_FIELDS)
+    values = ', '.join(f"COALESCE({field}, '')" for field in MEMBER_SEARCH_FIELDS)
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {MEMBER_SEARCH_TABLE}')
+        cursor.execute(
+            f'INSERT INTO {MEMBER_SEARCH_TABLE} (rowid, {columns}) SELECT id, {values} FROM {table}'
+        )
+        cursor.execute(f"INSERT INTO {MEMBER_SEARCH_TABLE}({MEMBER_SEARCH_TABLE}) VALUES ('optimize')")
+        cursor.execute(f'SELECT COUNT(*) FROM {MEMBER_SEARCH_TABLE}')
+        return cursor.fetchone()[0]
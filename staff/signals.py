@@ -0,0 +1,44 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from core.models import CustomUser, Subscription, MembershipPlan
+from bookings.models import GymClass, Booking
+from .metrics import invalidate_dashboard_metrics
+from .search import index_member, unindex_member
+
+
+@receiver(post_save, sender=CustomUser)
+@receiver(post_delete, sender=CustomUser)
+def user_changed(sender, instance, update_fields=None, **kwargs):
+    """Invalidate dashboard metrics when a user is added, changed or removed"""
+    # Logins only touch last_login, which no metric depends on
+    if update_fields and set(update_fields) == {'last_login'}:
+        return
+    invalidate_dashboard_metrics()
+
+
+@receiver(post_save, sender=Subscription)
+@receiver(post_delete, sender=Subscription)
+@receiver(post_save, sender=MembershipPlan)
+@receiver(post_delete, sender=MembershipPlan)
+@receiver(post_save, sender=GymClass)
+@receiver(post_delete, sender=GymClass)
+@receiver(post_save, sender=Booking)
+@receiver(post_delete, sender=Booking)
+def dashboard_data_changed(sender, **kwargs):
+    """Invalidate dashboard metrics when subscriptions, plans, classes or bookings change"""
+    invalidate_dashboard_metrics()
+
+
+@receiver(post_save, sender=CustomUser)
+def user_saved_search_index(sender, instance, update_fields=None, **kwargs):
+    """Keep the member search index in sync with user details"""
+    if update_fields and set(update_fields) == {'last_login'}:
+        return
+    index_member(instance)
+
+
+@receiver(post_delete, sender=CustomUser)
+def user_deleted_search_index(sender, instance, **kwargs):
+    """Drop deleted users from the member search index"""
+    unindex_member(instance.pk)
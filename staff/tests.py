@@ -1,3 +1,463 @@
-from django.test import TestCase
+from collections import Counter
+from datetime import datetime, time, timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import HttpResponse, StreamingHttpResponse
+from django.core.cache import cache
+from django.db import connection
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.urls import resolve, reverse
+from django.utils import timezone
+
+from staff import analytics, urls, urls_trainer
+from staff.metrics import DASHBOARD_METRICS_CACHE_KEY, compute_dashboard_metrics, get_dashboard_metrics
+from staff.search import MEMBER_SEARCH_TABLE, rebuild_member_index, search_members
+from bookings.models import Booking, ClassSchedule, GymClass
+from core.models import CustomUser, MembershipPlan, Subscription, Visit
+from workouts.models import UserWorkoutCompletion, Workout
+from core.routers import STICKY_COOKIE, ReplicaRouter, ReplicaRoutingMiddleware
+from core.testing import QueryBudgetTestCase, budget, seed_gym_data
+from core.utils import make_checkin_token
+
+
+def member_kwargs(data):
+    return {'user_id': data.member.id}
+
+
+class StaffQueryBudgetTests(QueryBudgetTestCase):
+    """Query and render-time budgets for staff/urls.py"""
+    urlpatterns = urls.urlpatterns
+    namespace = 'staff'
+    budgets = {
+        'dashboard': budget(8),
+        'member_list': budget(5),
+        'member_autocomplete': budget(3, data={'q': 'member'}),
+        'member_detail': budget(18, kwargs=member_kwargs),
+        'add_manual_points': budget(8, method='post', kwargs=member_kwargs, data={'points': '5'}),
+        'manage_subscription': budget(3, method='post', kwargs=member_kwargs, data={'action': 'cancel'}),
+        'checkout_member': budget(5, method='post', kwargs=member_kwargs),
+        'plan_list': budget(4),
+        'plan_create': budget(4),
+        # N+1: `workout in plan.included_workouts.all` per workout checkbox
+        'plan_edit': budget(42, kwargs=lambda data: {'plan_id': data.plan.id}),
+        # N+1: schedules per class
+        'class_list': budget(40),
+        'class_create': budget(7),
+        'class_edit': budget(10, kwargs=lambda data: {'class_id': data.gym_class.id}),
+        'workout_list': budget(4),
+        'workout_create': budget(3),
+        'workout_import': budget(3),
+        'workout_edit': budget(4, kwargs=lambda data: {'workout_id': data.workout.id}),
+        'checkin': budget(3),
+        'reports': budget(7),
+        'peak_hours': budget(5),
+        'cohort_retention': budget(7),
+        'performance': budget(3),
+        'export': budget(3, kwargs=lambda data: {'dataset': 'members'}),
+        'trainer_list': budget(7),
+        'trainer_create': budget(4),
+        'trainer_edit': budget(5, kwargs=lambda data: {'trainer_id': data.trainer_profile.id}),
+        'challenge_list': budget(4),
+        'challenge_create': budget(3),
+        'challenge_edit': budget(4, kwargs=lambda data: {'challenge_id': data.challenge.id}),
+        'staff_user_list': budget(7),
+        'staff_user_create': budget(3),
+        'toggle_staff_status': budget(6, method='post', kwargs=member_kwargs),
+    }
+
+
+class TrainerPortalQueryBudgetTests(QueryBudgetTestCase):
+    """Query and render-time budgets for staff/urls_trainer.py"""
+    urlpatterns = urls_trainer.urlpatterns
+    namespace = 'trainer'
+    budgets = {
+        'schedule': budget(6),
+        # N+1: member per booking
+        'class_roster': budget(28, kwargs=lambda data: {'class_id': data.gym_class.id}),
+        'mark_attendance': budget(
+            13, method='post',
+            kwargs=lambda data: {'booking_id': data.trainer_booking.id}, data={'action': 'attended'},
+        ),
+        'plan_list': budget(6),
+        'plan_create': budget(4),
+        # N+1: plan membership per workout checkbox
+        'plan_edit': budget(41, kwargs=lambda data: {'plan_id': data.workout_plan.id}),
+        'plan_assign': budget(6, kwargs=lambda data: {'plan_id': data.workout_plan.id}),
+        'assign_workout': budget(6),
+    }
+
+
+@override_settings(READ_REPLICA_ALIAS='replica', READ_REPLICA_VIEWS=['staff:reports'])
+class ReplicaRoutingTests(SimpleTestCase):
+    """Which database core.routers sends a request's reads to"""
+
+    def route(self, url, method='get', cookies=None, write=False):
+        """Run a request through the middleware; return (read alias, response)"""
+        router = ReplicaRouter()
+        seen = {}
+
+        def view(request):
+            middleware.process_view(request, None, (), {})
+            if write:
+                router.db_for_write(CustomUser)
+            seen['alias'] = router.db_for_read(CustomUser) or 'default'
+            return HttpResponse()
+
+        middleware = ReplicaRoutingMiddleware(view)
+        request = getattr(RequestFactory(), method)(url)
+        request.COOKIES.update(cookies or {})
+        request.resolver_match = resolve(url)
+        response = middleware(request)
+        return seen['alias'], response
+
+    def test_reporting_view_reads_from_replica(self):
+        alias, response = self.route(reverse('staff:reports'))
+        self.assertEqual(alias, 'replica')
+        self.assertNotIn(STICKY_COOKIE, response.cookies)
+
+    def test_other_views_read_from_primary(self):
+        alias, _ = self.route(reverse('staff:member_list'))
+        self.assertEqual(alias, 'default')
+
+    def test_post_reads_from_primary(self):
+        alias, _ = self.route(reverse('staff:reports'), method='post')
+        self.assertEqual(alias, 'default')
+
+    def test_write_sets_sticky_cookie_and_later_reads_use_primary(self):
+        alias, response = self.route(reverse('staff:reports'), write=True)
+        self.assertEqual(alias, 'default')
+        self.assertIn(STICKY_COOKIE, response.cookies)
+
+        alias, _ = self.route(reverse('staff:reports'), cookies={STICKY_COOKIE: '1'})
+        self.assertEqual(alias, 'default')
+
+    def test_streamed_response_reads_from_replica_while_streaming(self):
+        router = ReplicaRouter()
+        reads = Counter()
+
+        def rows():
+            for _ in range(3):
+                reads[router.db_for_read(CustomUser) or 'default'] += 1
+                yield 'row\n'
+
+        def view(request):
+            middleware.process_view(request, None, (), {})
+            reads[router.db_for_read(CustomUser) or 'default'] += 1
+            return StreamingHttpResponse(rows())
+
+        url = reverse('staff:reports')
+        middleware = ReplicaRoutingMiddleware(view)
+        request = RequestFactory().get(url)
+        request.resolver_match = resolve(url)
+        response = middleware(request)
+        self.assertEqual(reads, {'replica': 1})
+
+        self.assertEqual(b''.join(response.streaming_content), b'row\n' * 3)
+        self.assertEqual(reads, {'replica': 4})
+        # Routing state does not leak past the response
+        self.assertIsNone(router.db_for_read(CustomUser))
+
+    def test_reads_outside_requests_use_primary(self):
+        self.assertIsNone(ReplicaRouter().db_for_read(CustomUser))
+
+    @override_settings(READ_REPLICA_ALIAS=None)
+    def test_middleware_unused_without_replica(self):
+        with self.assertRaises(MiddlewareNotUsed):
+            ReplicaRoutingMiddleware(lambda request: HttpResponse())
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class CheckinViewTests(TestCase):
+    """QR check-in at the front desk"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = CustomUser.objects.create_user('desk', password='x', is_staff=True)
+        cls.member = CustomUser.objects.create_user('member', password='x', first_name='Mira')
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.staff)
+
+    def scan(self, user):
+        return self.client.post(
+            reverse('staff:checkin'), {'session_token': make_checkin_token(user), 'door': 'main'}, follow=True,
+        )
+
+    def test_member_checks_in(self):
+        response = self.scan(self.member)
+        self.assertContains(response, 'Check-in successful!')
+        self.assertEqual(Visit.objects.filter(user=self.member).count(), 1)
+
+    def test_inactive_member_rejected(self):
+        self.member.is_active = False
+        self.member.save()
+        response = self.scan(self.member)
+        self.assertContains(response, 'Invalid QR code.')
+        self.assertFalse(Visit.objects.exists())
+
+    def test_unknown_member_rejected(self):
+        response = self.scan(CustomUser(id=self.member.id + 1000))
+        self.assertContains(response, 'Invalid QR code.')
+        self.assertFalse(Visit.objects.exists())
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class ExportTests(TestCase):
+    """Streamed CSV exports and their filters"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.data = seed_gym_data(members=6, workouts=8, classes=2, days=2)
+
+    def setUp(self):
+        self.client.force_login(self.data.staff)
+
+    def export(self, dataset, **params):
+        return self.client.get(reverse('staff:export', kwargs={'dataset': dataset}), params)
+
+    def test_members_csv(self):
+        response = self.export('members')
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0], 'ID,Username,First Name,Last Name,Email,Phone,Active,Joined')
+        self.assertEqual(len(lines) - 1, CustomUser.objects.filter(is_staff=False).count())
+
+    def test_challenge_standings_filter(self):
+        challenge = self.data.challenge
+        response = self.export('challenge_standings', challenge=challenge.id)
+        rows = b''.join(response.streaming_content).decode().splitlines()[1:]
+        self.assertEqual(len(rows), challenge.participants.count())
+        self.assertTrue(all(row.startswith(f'{challenge.id},') for row in rows))
+
+    def test_malformed_challenge_is_bad_request(self):
+        self.assertEqual(self.export('challenge_standings', challenge='abc').status_code, 400)
+
+    def test_unknown_challenge_and_dataset_not_found(self):
+        self.assertEqual(self.export('challenge_standings', challenge='999999').status_code, 404)
+        self.assertEqual(self.export('payroll').status_code, 404)
+
+
+class AnalyticsTests(TestCase):
+    """Peak hours and cohort retention from known activity"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.today = timezone.localdate()
+        cls.day = cls.today - timedelta(days=3)
+        cls.ann = CustomUser.objects.create_user('ann')
+        cls.bob = CustomUser.objects.create_user('bob')
+        CustomUser.objects.create_user('desk', is_staff=True)
+        cls.gym_class = GymClass.objects.create(name='Spin', description='', duration=45)
+
+    def setUp(self):
+        cache.clear()
+
+    def at(self, day, hour, minute=0):
+        return timezone.make_aware(datetime.combine(day, time(hour, minute)))
+
+    def book(self, user, day, hour, status='confirmed'):
+        schedule, _ = ClassSchedule.objects.get_or_create(gym_class=self.gym_class, class_date=day, class_time=time(hour))
+        return Booking.objects.create(
+            user=user, gym_class=self.gym_class, class_schedule=schedule, booking_date=day, status=status,
+        )
+
+    def test_peak_hours(self):
+        for user, hour, minute in [(self.ann, 7, 15), (self.bob, 7, 45), (self.ann, 18, 0)]:
+            Visit.objects.create(user=user, visited_at=self.at(self.day, hour, minute))
+        # Outside the range
+        Visit.objects.create(user=self.ann, visited_at=self.at(self.day - timedelta(days=10), 7))
+        self.book(self.ann, self.day, 18)
+        self.book(self.bob, self.day + timedelta(days=1), 18, status='cancelled')
+
+        peak = analytics.get_peak_hours(self.day, self.today)
+        weekday = analytics.WEEKDAYS[self.day.weekday()]
+        self.assertEqual(peak['visit_total'], 3)
+        self.assertEqual(peak['busiest_visit_slot'], f'{weekday} 07:00')
+        self.assertEqual(peak['booking_total'], 1)
+        self.assertEqual(peak['busiest_booking_slot'], f'{weekday} 18:00')
+        row = peak['visits'][self.day.weekday()]
+        self.assertEqual(row['cells'][7], {'count': 2, 'intensity': 100})
+        self.assertEqual(row['cells'][18], {'count': 1, 'intensity': 50})
+
+    def test_cohort_retention(self):
+        this_month = self.today.replace(day=1)
+        signup_month = (this_month - timedelta(days=40)).replace(day=1)
+        next_month = (signup_month + timedelta(days=32)).replace(day=1)
+        CustomUser.objects.filter(pk__in=[self.ann.pk, self.bob.pk]).update(created_at=self.at(signup_month, 9))
+        # Bob books in his signup month, Ann visits the month after, Bob works out this month
+        self.book(self.bob, signup_month + timedelta(days=2), 18)
+        Visit.objects.create(user=self.ann, visited_at=self.at(next_month, 7))
+        completion = UserWorkoutCompletion.objects.create(
+            user=self.bob, workout=Workout.objects.create(title='Row', description='', category='chest'),
+        )
+        UserWorkoutCompletion.objects.filter(pk=completion.pk).update(completed_at=self.at(this_month, 6))
+
+        # Chunks smaller than the data, so rows are binned across several chunks
+        with mock.patch.object(analytics, 'ACTIVITY_CHUNK_SIZE', 1):
+            report = analytics.compute_cohort_retention()
+        self.assertEqual(report['max_offset'], 2)
+        [cohort] = report['cohorts']
+        self.assertEqual(cohort['label'], signup_month.strftime('%b %Y'))
+        self.assertEqual(cohort['size'], 2)
+        self.assertEqual(cohort['retention'], [50.0, 50.0, 50.0])
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class MemberSearchTests(TestCase):
+    """Member search, its index and the autocomplete endpoint"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.john = CustomUser.objects.create_user(
+            'jsmith', email='john@example.com', first_name='John', last_name='Smith', phone_number='555-0101',
+        )
+        cls.jane = CustomUser.objects.create_user('jane', first_name='Jane', last_name='Smith')
+        cls.joan = CustomUser.objects.create_user('joan', first_name='Joan', last_name='Blacksmith')
+        cls.staff = CustomUser.objects.create_user('desk', password='x', first_name='John', is_staff=True)
+
+    def search(self, query, fts=True):
+        with mock.patch('staff.search.fts_available', return_value=fts):
+            return list(search_members(CustomUser.objects.filter(is_staff=False), query))
+
+    def test_words_match_prefixes_on_every_backend(self):
+        for fts in (True, False):
+            with self.subTest(fts=fts):
+                self.assertEqual(self.search('jo smi', fts=fts)[0], self.john)
+                self.assertEqual(self.search('SMITH jane', fts=fts), [self.jane])
+                self.assertEqual(self.search('jo nobody', fts=fts), [])
+                self.assertEqual(self.search('!!', fts=fts), [])
+
+    def test_fts_ranks_more_matching_fields_first(self):
+        smith = CustomUser.objects.create_user('smith', email='smith@example.com', last_name='Smith')
+        results = self.search('smith')
+        self.assertEqual(results[0], smith)
+        self.assertEqual(set(results), {smith, self.john, self.jane})
+
+    def test_fts_matches_word_starts_only(self):
+        self.assertEqual(self.search('jo smi'), [self.john])
+
+    def test_fallback_ranks_word_starts_first(self):
+        # 'smi' starts Smith but sits inside Blacksmith; ties go to the newest member
+        self.assertEqual(self.search('smi', fts=False), [self.jane, self.john, self.joan])
+
+    def test_index_follows_saves_and_deletes(self):
+        self.john.last_name = 'Carter'
+        self.john.save()
+        self.assertEqual(self.search('john carter'), [self.john])
+        self.assertEqual(self.search('john smith'), [])
+
+        self.jane.delete()
+        self.assertEqual(self.search('jane'), [])
+        with connection.cursor() as cursor:
+            cursor.execute(f'SELECT COUNT(*) FROM {MEMBER_SEARCH_TABLE} WHERE rowid = %s', [self.jane.id])
+            self.assertEqual(cursor.fetchone()[0], 0)
+
+    def test_rebuild_picks_up_bulk_changes(self):
+        # update() and bulk_create() bypass the sync signals
+        CustomUser.objects.filter(pk=self.joan.pk).update(last_name='Rivers')
+        CustomUser.objects.bulk_create([CustomUser(username='bulk', first_name='Bulky')])
+        self.assertEqual(self.search('rivers'), [])
+        self.assertEqual(self.search('bulky'), [])
+
+        self.assertEqual(rebuild_member_index(), CustomUser.objects.count())
+        self.assertEqual(self.search('rivers'), [self.joan])
+        self.assertEqual([user.username for user in self.search('bulky')], ['bulk'])
+        self.assertEqual(self.search('blacksmith'), [])
+
+    def test_autocomplete_json(self):
+        self.client.force_login(self.staff)
+        url = reverse('staff:member_autocomplete')
+        self.assertEqual(self.client.get(url, {'q': 'j'}).json(), {'results': []})
+
+        results = self.client.get(url, {'q': 'jo smi'}).json()['results']
+        self.assertEqual(results, [{
+            'id': self.john.id,
+            'name': 'John Smith',
+            'username': 'jsmith',
+            'email': 'john@example.com',
+            'phone_number': '555-0101',
+            'url': reverse('staff:member_detail', args=[self.john.id]),
+        }])
+        # Staff accounts never show up, even when they match
+        names = [result['username'] for result in self.client.get(url, {'q': 'john'}).json()['results']]
+        self.assertEqual(names, ['jsmith'])
+
+
+class DashboardMetricsTests(TestCase):
+    """Dashboard KPIs from known rows and their cache invalidation"""
+
+    @classmethod
+    def setUpTestData(cls):
+        today = timezone.localdate()
+        cls.ann = CustomUser.objects.create_user('ann')
+        cls.bob = CustomUser.objects.create_user('bob')
+        cls.cat = CustomUser.objects.create_user('cat')
+        CustomUser.objects.create_user('desk', is_staff=True)
+        CustomUser.objects.filter(pk=cls.ann.pk).update(created_at=timezone.now() - timedelta(days=30))
+
+        gold = MembershipPlan.objects.create(name='Gold', price=50, features='')
+        silver = MembershipPlan.objects.create(name='Silver', price=30, features='')
+        # Several subscriptions per user must neither inflate the user counts
+        # nor be collapsed into one
+        Subscription.objects.create(user=cls.ann, plan=gold)
+        Subscription.objects.create(user=cls.ann, plan=silver)
+        Subscription.objects.create(user=cls.ann, plan=gold, status='cancelled')
+        Subscription.objects.create(user=cls.bob, plan=silver)
+        Subscription.objects.create(user=cls.cat, plan=None)
+
+        spin = GymClass.objects.create(name='Spin', description='', duration=45)
+        yoga = GymClass.objects.create(name='Yoga', description='', duration=60, is_active=False)
+        Booking.objects.create(user=cls.ann, gym_class=spin, booking_date=today)
+        Booking.objects.create(user=cls.bob, gym_class=spin, booking_date=today)
+        Booking.objects.create(user=cls.bob, gym_class=yoga, booking_date=today)
+        Booking.objects.create(user=cls.cat, gym_class=spin, booking_date=today, status='cancelled')
+        Booking.objects.create(user=cls.ann, gym_class=yoga, booking_date=today - timedelta(days=1))
+
+    def setUp(self):
+        cache.clear()
+
+    def test_each_metric(self):
+        self.assertEqual(compute_dashboard_metrics(), {
+            'total_users': 4,
+            'total_members': 3,
+            'new_members_7d': 2,
+            'active_subscriptions': 4,
+            'total_mrr': 110,
+            'active_classes': 1,
+            'bookings_today': 3,
+        })
+
+    def test_metrics_served_from_cache(self):
+        metrics = get_dashboard_metrics()
+        CustomUser.objects.filter(pk=self.cat.pk).update(is_staff=True)
+        self.assertEqual(get_dashboard_metrics(), metrics)
+
+    def assertInvalidates(self, change, invalidates=True):
+        cache.set(DASHBOARD_METRICS_CACHE_KEY, {'stale': True})
+        change()
+        if invalidates:
+            self.assertIsNone(cache.get(DASHBOARD_METRICS_CACHE_KEY))
+        else:
+            self.assertEqual(cache.get(DASHBOARD_METRICS_CACHE_KEY), {'stale': True})
+
+    def test_changes_invalidate_cache(self):
+        subscription = self.bob.subscriptions.get()
+        booking = self.cat.bookings.get()
+        changes = {
+            'user saved': lambda: CustomUser.objects.create_user('dan'),
+            'user deleted': lambda: CustomUser.objects.get(username='dan').delete(),
+            'subscription saved': subscription.save,
+            'subscription deleted': subscription.delete,
+            'booking saved': booking.save,
+            'booking deleted': booking.delete,
+        }
+        for name, change in changes.items():
+            with self.subTest(name):
+                self.assertInvalidates(change)
+
+    def test_login_keeps_cache(self):
+        self.bob.last_login = timezone.now()
+        self.assertInvalidates(lambda: self.bob.save(update_fields=['last_login']), invalidates=False)
+        self.assertInvalidates(lambda: self.bob.save(update_fields=['last_login', 'first_name']))
@@ -7,9 +7,11 @@ urlpatterns = [
     # Staff Dashboard
     path('', views.StaffDashboard.as_view(), name='dashboard'),
     path('members/', views.MemberListView.as_view(), name='member_list'),
+    path('members/autocomplete/', views.member_autocomplete, name='member_autocomplete'),
     path('members/<int:user_id>/', views.member_detail, name='member_detail'),
     path('members/<int:user_id>/add-points/', views.add_manual_points, name='add_manual_points'),
     path('members/<int:user_id>/manage-subscription/', views.manage_subscription, name='manage_subscription'),
+    path('members/<int:user_id>/checkout/', views.checkout_member, name='checkout_member'),
     
     # Membership Plans
     path('plans/', views.PlanListView.as_view(), name='plan_list'),
@@ -24,6 +26,7 @@ urlpatterns = [
     # Workouts
     path('workouts/', views.workout_list, name='workout_list'),
     path('workouts/create/', views.workout_create, name='workout_create'),
+    path('workouts/import/', views.workout_import, name='workout_import'),
     path('workouts/<int:workout_id>/edit/', views.workout_edit, name='workout_edit'),
     
     # Check-in
@@ -31,6 +34,10 @@ urlpatterns = [
     
     # Reports
     path('reports/', views.reports_dashboard, name='reports'),
+    path('reports/peak-hours/', views.peak_hours, name='peak_hours'),
+    path('reports/retention/', views.cohort_retention, name='cohort_retention'),
+    path('reports/performance/', views.performance, name='performance'),
+    path('exports/<slug:dataset>.csv', views.export_data, name='export'),
     
     # Trainers
     path('trainers/', views.TrainerListView.as_view(), name='trainer_list'),
@@ -1,18 +1,27 @@
-from django.shortcuts import render, redirect, get_object_or_404
+from django.shortcuts import render, redirect, get_object_or_404, reverse
 from django.contrib.auth.decorators import login_required
+from django.conf import settings
 from django.contrib import messages
 from django.core.exceptions import PermissionDenied
 from django.utils import timezone
+from django.db import transaction
 from django.db.models import Count, Sum, Q
+from django.db.models.functions import TruncDate
+from django.http import Http404, HttpResponseBadRequest, JsonResponse
 from django.views.decorators.http import require_POST
 from django.utils.decorators import method_decorator
 from django.views.generic import ListView, DetailView
 from datetime import datetime, timedelta
 from .mixins import StaffRequiredMixin, TrainerRequiredMixin, SuperuserRequiredMixin
+from .metrics import get_dashboard_metrics
+from .search import search_members
+from core.occupancy import get_occupancy, record_checkin, record_checkout, is_on_site
 
-from core.models import CustomUser, MembershipPlan, Subscription, Trainer, UserPoints, QRCodeSession, PlanFeature, PersonalTrainerSubscription
+from core.models import CustomUser, MembershipPlan, Subscription, Trainer, UserPoints, PlanFeature, PersonalTrainerSubscription, Visit
 from bookings.models import GymClass, Booking, ClassSchedule
 from workouts.models import Workout, WorkoutPlan, UserWorkoutPlan, TrainerAssignedWorkout
+from workouts.importer import file_format_for, import_workouts
+from workouts.similarity import update_similar_workouts
 from community.models import Challenge
 
 
@@ -29,36 +38,18 @@ class StaffDashboard(StaffRequiredMixin, ListView):
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         
-        # Key metrics
-        today = timezone.now().date()
-        seven_days_ago = today - timedelta(days=7)
-        
-        context['total_members'] = CustomUser.objects.filter(is_staff=False).count()
-        context['active_subscriptions'] = Subscription.objects.filter(status='active').count()
-        
-        # Revenue calculations
-        active_subs = Subscription.objects.filter(status='active')
-        context['total_mrr'] = sum([sub.plan.price for sub in active_subs if sub.plan])
-        
-        # Recent members
-        context['new_members_7d'] = CustomUser.objects.filter(
-            is_staff=False,
-            created_at__gte=seven_days_ago
-        ).count()
-        
-        # Today's classes
-        context['todays_classes'] = GymClass.objects.filter(
-            is_active=True
-        ).count()
-        
-        # Class bookings today
-        context['bookings_today'] = Booking.objects.filter(
-            booking_date=today,
-            status='confirmed'
-        ).count()
+        # Key metrics (cached, shared with the admin dashboard)
+        metrics = get_dashboard_metrics()
+        context['total_members'] = metrics['total_members']
+        context['active_subscriptions'] = metrics['active_subscriptions']
+        context['total_mrr'] = metrics['total_mrr']
+        context['new_members_7d'] = metrics['new_members_7d']
+        context['todays_classes'] = metrics['active_classes']
+        context['bookings_today'] = metrics['bookings_today']
+        context['occupancy'] = get_occupancy()
         
         # Recent transactions
-        context['recent_subscriptions'] = Subscription.objects.all().order_by('-created_at')[:5]
+        context['recent_subscriptions'] = Subscription.objects.select_related('user', 'plan').order_by('-created_at')[:5]
         
         return context
 
@@ -73,15 +64,10 @@ class MemberListView(StaffRequiredMixin, ListView):
     def get_queryset(self):
         queryset = CustomUser.objects.filter(is_staff=False)
         
-        # Search functionality
+        # Search functionality (indexed, ordered by relevance)
         search_query = self.request.GET.get('search')
         if search_query:
-            queryset = queryset.filter(
-                Q(username__icontains=search_query) |
-                Q(email__icontains=search_query) |
-                Q(first_name__icontains=search_query) |
-                Q(last_name__icontains=search_query)
-            )
+            return search_members(queryset, search_query)
         
         return queryset.order_by('-created_at')
 
@@ -91,6 +77,33 @@ class MemberListView(StaffRequiredMixin, ListView):
         return context
 
 
+@login_required
+def member_autocomplete(request):
+    """JSON member lookup for the front desk search box"""
+    if not request.user.is_staff:
+        raise PermissionDenied("You do not have permission to access this page.")
+    
+    query = request.GET.get('q', '')
+    results = []
+    if len(query.strip()) >= 2:
+        members = search_members(CustomUser.objects.filter(is_staff=False), query).only(
+            'id', 'username', 'first_name', 'last_name', 'email', 'phone_number'
+        )[:10]
+        results = [
+            {
+                'id': member.id,
+                'name': member.get_full_name() or member.username,
+                'username': member.username,
+                'email': member.email,
+                'phone_number': member.phone_number or '',
+                'url': reverse('staff:member_detail', args=[member.id]),
+            }
+            for member in members
+        ]
+    
+    return JsonResponse({'results': results})
+
+
 @login_required
 def member_detail(request, user_id):
     """Detailed view of a specific member"""
@@ -127,6 +140,11 @@ def member_detail(request, user_id):
     except:
         streak = None
     
+    # Visit stats (served by the (user, visited_at) index)
+    month_start = timezone.now().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    visits_this_month = member.visits.filter(visited_at__gte=month_start).count()
+    last_visit = member.visits.order_by('-visited_at').values_list('visited_at', flat=True).first()
+    
     # Get all plans for subscription management
     all_plans = MembershipPlan.objects.filter(is_active=True).order_by('price')
     
@@ -140,6 +158,9 @@ def member_detail(request, user_id):
         'total_points': total_points,
         'recent_points': recent_points,
         'streak': streak,
+        'visits_this_month': visits_this_month,
+        'last_visit': last_visit,
+        'on_site': is_on_site(member.id),
         'all_plans': all_plans,
     }
     
@@ -177,6 +198,21 @@ def add_manual_points(request, user_id):
     return redirect('staff:member_detail', user_id=user_id)
 
 
+@login_required
+@require_POST
+def checkout_member(request, user_id):
+    """Check a member out so they no longer count towards occupancy"""
+    if not request.user.is_staff:
+        raise PermissionDenied("You do not have permission to access this page.")
+    
+    member = get_object_or_404(CustomUser, id=user_id, is_staff=False)
+    
+    record_checkout(member.id)
+    
+    messages.success(request, f'{member.get_full_name() or member.username} checked out.')
+    return redirect('staff:member_detail', user_id=user_id)
+
+
 @login_required
 @require_POST
 def manage_subscription(request, user_id):
@@ -227,7 +263,12 @@ class PlanListView(StaffRequiredMixin, ListView):
     """List all membership plans"""
     template_name = 'staff/plan_list.html'
     context_object_name = 'plans'
-    model = MembershipPlan
+
+    def get_queryset(self):
+        return MembershipPlan.objects.annotate(
+            feature_count=Count('plan_features'),
+            highlighted_feature_count=Count('plan_features', filter=Q(plan_features__is_highlighted=True)),
+        )
 
 
 @login_required
@@ -536,11 +577,10 @@ def workout_create(request):
         thumbnails = request.FILES.getlist('workout_thumbnail[]')
         
         created_count = 0
+        created_ids = []
         errors = []
         
         try:
-            from django.db import transaction
-            
             with transaction.atomic():
                 for idx, title in enumerate(titles):
                     if not title.strip():
@@ -558,10 +598,13 @@ def workout_create(request):
                             thumbnail=thumbnails[idx] if idx < len(thumbnails) and thumbnails[idx] else None
                         )
                         created_count += 1
+                        created_ids.append(workout.id)
                     except Exception as e:
                         errors.append(f"Error creating workout '{title}': {str(e)}")
                 
                 if created_count > 0:
+                    # Add the new workouts to the similar lists once they are saved
+                    transaction.on_commit(lambda: update_similar_workouts(created_ids))
                     messages.success(request, f'Successfully created {created_count} workout(s) in category "{dict(Workout.CATEGORY_CHOICES).get(selected_category, selected_category)}"!')
                     if errors:
                         for error in errors:
@@ -582,6 +625,44 @@ def workout_create(request):
     })
 
 
+@login_required
+def workout_import(request):
+    """Import a library of workouts from a CSV/JSONL file and a zip of thumbnails"""
+    if not request.user.is_staff:
+        raise PermissionDenied("You do not have permission to access this page.")
+    
+    result = None
+    dry_run = request.POST.get('dry_run') == 'on'
+    if request.method == 'POST':
+        upload = request.FILES.get('file')
+        if not upload:
+            messages.error(request, 'Choose a CSV or JSONL file to import.')
+        else:
+            try:
+                result = import_workouts(
+                    upload,
+                    file_format_for(upload.name),
+                    thumbnails=request.FILES.get('thumbnails'),
+                    workers=settings.WORKOUT_IMPORT_WORKERS,
+                    dry_run=dry_run,
+                    # Only the new workouts' similar lists, not a rebuild of every list
+                    similar='update',
+                )
+            except ValueError as e:
+                messages.error(request, f'Error importing workouts: {str(e)}')
+            else:
+                if result.created and not result.error_count and not dry_run:
+                    messages.success(request, f'Successfully imported {result.created} workout(s)!')
+                    return redirect('staff:workout_list')
+    
+    return render(request, 'staff/workout_import.html', {
+        'result': result,
+        'dry_run': dry_run,
+        'hidden_errors': result.error_count - len(result.errors) if result else 0,
+        'categories': Workout.CATEGORY_CHOICES,
+    })
+
+
 @login_required
 def workout_edit(request, workout_id):
     """Edit a workout"""
@@ -605,6 +686,7 @@ def workout_edit(request, workout_id):
         
         try:
             workout.save()
+            transaction.on_commit(lambda: update_similar_workouts([workout.id]))
             messages.success(request, f'Workout "{workout.title}" updated successfully!')
             return redirect('staff:workout_list')
         except Exception as e:
@@ -626,40 +708,39 @@ def checkin_view(request):
     
     if request.method == 'POST':
         session_token = request.POST.get('session_token')
+        door = request.POST.get('door', '').strip()[:50]
+        request.session['checkin_door'] = door  # Remember the kiosk for the next scan
         
         if session_token:
+            from core.utils import verify_checkin_token, InvalidCheckinToken, award_points_and_update_streak
             try:
-                qr_session = QRCodeSession.objects.get(
-                    session_token=session_token,
-                    used_at__isnull=True
-                )
+                # Signature, expiry and replay checks need no database read
+                user_id = verify_checkin_token(session_token)
+                # A deactivated member's unexpired code no longer checks in
+                member = CustomUser.objects.get(id=user_id, is_active=True)
                 
-                # Check if expired
-                if qr_session.expires_at < timezone.now():
-                    messages.error(request, 'This QR code has expired.')
-                    return redirect('staff:checkin')
-                
-                # Mark as used
-                qr_session.used_at = timezone.now()
-                qr_session.save()
+                # Record the visit and count the member as on site
+                visit = Visit.objects.create(user=member, door=door, method='qr')
+                record_checkin(member.id, visit.visited_at)
                 
                 # Award points for check-in (Phase 2)
-                from core.utils import award_points_and_update_streak
                 award_points_and_update_streak(
-                    qr_session.user,
+                    member,
                     points=5,
                     source='checkin'
                 )
                 
-                messages.success(request, f'Check-in successful! {qr_session.user.get_full_name()} scanned in.')
+                messages.success(request, f'Check-in successful! {member.get_full_name()} scanned in.')
                 return redirect('staff:checkin')
                 
-            except QRCodeSession.DoesNotExist:
-                messages.error(request, 'Invalid or already used QR code.')
+            except InvalidCheckinToken as e:
+                messages.error(request, str(e))
+            except CustomUser.DoesNotExist:
+                messages.error(request, 'Invalid QR code.')
             except Exception as e:
                 messages.error(request, f'Error processing check-in: {str(e)}')
     
-    return render(request, 'staff/checkin.html')
+    return render(request, 'staff/checkin.html', {'door': request.session.get('checkin_door', '')})
 
 
 # Reports Dashboard
@@ -670,12 +751,13 @@ def reports_dashboard(request):
         raise PermissionDenied("You do not have permission to access this page.")
     
     # MRR (Monthly Recurring Revenue)
-    active_subs = Subscription.objects.filter(status='active')
-    total_mrr = sum([sub.plan.price for sub in active_subs if sub.plan])
+    total_mrr = Subscription.objects.filter(status='active').aggregate(
+        total=Sum('plan__price')
+    )['total'] or 0
     
     # Member growth (last 12 months)
     today = timezone.now().date()
-    member_growth = []
+    months = []
     for i in range(11, -1, -1):
         month_start = today.replace(day=1) - timedelta(days=30*i)
         month_end = month_start.replace(day=28) + timedelta(days=10)
@@ -684,15 +766,20 @@ def reports_dashboard(request):
         if i > 0:
             next_month_start = today.replace(day=1) - timedelta(days=30*(i-1))
             month_end = next_month_start - timedelta(days=1)
-        
-        count = CustomUser.objects.filter(
-            is_staff=False,
-            created_at__date__gte=month_start,
-            created_at__date__lte=month_end
-        ).count()
+        months.append((month_start, month_end))
+    
+    # Signups per day in one query, then summed into the months above
+    signups = CustomUser.objects.filter(
+        is_staff=False,
+        created_at__date__gte=months[0][0],
+        created_at__date__lte=max(month_end for _, month_end in months)
+    ).annotate(day=TruncDate('created_at')).values('day').annotate(count=Count('id')).values_list('day', 'count')
+    signups = list(signups)
+    member_growth = []
+    for month_start, month_end in months:
         member_growth.append({
             'month': month_start.strftime('%b %Y'),
-            'count': count
+            'count': sum(count for day, count in signups if month_start <= day <= month_end)
         })
     
     # Class popularity
@@ -701,23 +788,26 @@ def reports_dashboard(request):
     ).order_by('-bookings_count')[:10]
     
     # Trainer performance
+    trainers = Trainer.objects.select_related('user').annotate(
+        classes_taught=Count('gymclass', distinct=True),
+        attendance=Count('gymclass__bookings', filter=Q(gymclass__bookings__status='completed'), distinct=True)
+    )
     trainer_performance = []
-    for trainer in Trainer.objects.all():
-        classes_taught = GymClass.objects.filter(trainer=trainer).count()
-        total_attendance = Booking.objects.filter(
-            gym_class__trainer=trainer,
-            status='completed'
-        ).count()
+    for trainer in trainers:
         trainer_performance.append({
             'name': trainer.user.get_full_name(),
-            'classes_taught': classes_taught,
-            'attendance': total_attendance
+            'classes_taught': trainer.classes_taught,
+            'attendance': trainer.attendance
         })
     trainer_performance = sorted(trainer_performance, key=lambda x: x['attendance'], reverse=True)[:10]
     
     # Active vs Inactive members
-    active_members = CustomUser.objects.filter(is_staff=False, is_active=True).count()
-    inactive_members = CustomUser.objects.filter(is_staff=False, is_active=False).count()
+    member_counts = CustomUser.objects.filter(is_staff=False).aggregate(
+        active=Count('id', filter=Q(is_active=True)),
+        inactive=Count('id', filter=Q(is_active=False))
+    )
+    active_members = member_counts['active']
+    inactive_members = member_counts['inactive']
     
     context = {
         'total_mrr': total_mrr,
@@ -731,6 +821,119 @@ def reports_dashboard(request):
     return render(request, 'staff/reports.html', context)
 
 
+@login_required
+def peak_hours(request):
+    """Weekday x hour heatmap of check-ins and class bookings"""
+    if not request.user.is_staff:
+        raise PermissionDenied("You do not have permission to access this page.")
+    
+    from .analytics import get_peak_hours, default_range
+    
+    start_date, end_date = default_range()
+    try:
+        if request.GET.get('start'):
+            start_date = datetime.strptime(request.GET['start'], '%Y-%m-%d').date()
+        if request.GET.get('end'):
+            end_date = datetime.strptime(request.GET['end'], '%Y-%m-%d').date()
+    except ValueError:
+        messages.error(request, 'Invalid date format. Showing the last 4 weeks.')
+        start_date, end_date = default_range()
+    
+    if start_date > end_date:
+        start_date, end_date = end_date, start_date
+    
+    peak = get_peak_hours(start_date, end_date)
+    context = {
+        'start_date': start_date,
+        'end_date': end_date,
+        'hours': range(24),
+        'heatmaps': [
+            {
+                'title': 'Check-ins',
+                'rows': peak['visits'],
+                'total': peak['visit_total'],
+                'busiest': peak['busiest_visit_slot'],
+                'rgb': '234, 88, 12',
+            },
+            {
+                'title': 'Class Bookings',
+                'rows': peak['bookings'],
+                'total': peak['booking_total'],
+                'busiest': peak['busiest_booking_slot'],
+                'rgb': '147, 51, 234',
+            },
+        ],
+    }
+    return render(request, 'staff/peak_hours.html', context)
+
+
+@login_required
+def cohort_retention(request):
+    """Monthly signup cohorts and the share of each still active in later months"""
+    if not request.user.is_staff:
+        raise PermissionDenied("You do not have permission to access this page.")
+    
+    from .analytics import get_cohort_retention
+    
+    try:
+        months = max(1, min(int(request.GET.get('months', 12)), 60))
+    except ValueError:
+        months = 12
+    
+    report = get_cohort_retention()
+    cohorts = [
+        {**cohort, 'retention': cohort['retention'][:months + 1]}
+        for cohort in report['cohorts']
+    ]
+    
+    return render(request, 'staff/cohort_retention.html', {
+        'cohorts': cohorts,
+        'offsets': range(min(months, report['max_offset']) + 1),
+        'months': months,
+        'generated_at': report['generated_at'],
+    })
+
+
+@login_required
+def performance(request):
+    """Per-view query counts and latency percentiles recorded by RequestMetricsMiddleware"""
+    if not request.user.is_staff:
+        raise PermissionDenied("You do not have permission to access this page.")
+    
+    from core.middleware import metrics_store, query_budget
+    
+    if request.method == 'POST':
+        metrics_store.reset()
+        messages.success(request, 'Request metrics reset.')
+        return redirect('staff:performance')
+    
+    views = metrics_store.summary()
+    for row in views:
+        row['query_budget'] = query_budget(row['view'])
+    
+    return render(request, 'staff/performance.html', {
+        'views': views,
+        'time_budget_ms': settings.REQUEST_TIME_BUDGET_MS,
+        'max_samples': metrics_store.max_samples,
+    })
+
+
+@login_required
+def export_data(request, dataset):
+    """Stream a CSV export of members, subscriptions, bookings, points or challenge standings"""
+    if not request.user.is_staff:
+        raise PermissionDenied("You do not have permission to access this page.")
+    
+    from .exports import InvalidExportFilter, stream_export
+    try:
+        response = stream_export(dataset, request.GET)
+    except InvalidExportFilter as e:
+        return HttpResponseBadRequest(str(e))
+    if response is None:
+        raise Http404("Unknown export")
+    return response
+
+
 # Trainer Management Views
 @method_decorator(login_required, name='dispatch')
 class TrainerListView(StaffRequiredMixin, ListView):
@@ -954,15 +1157,10 @@ class StaffUserListView(SuperuserRequiredMixin, ListView):
         elif staff_filter == 'members':
             queryset = queryset.filter(is_staff=False)
         
-        # Search functionality
+        # Search functionality (indexed, ordered by relevance)
         search_query = self.request.GET.get('search')
         if search_query:
-            queryset = queryset.filter(
-                Q(username__icontains=search_query) |
-                Q(email__icontains=search_query) |
-                Q(first_name__icontains=search_query) |
-                Q(last_name__icontains=search_query)
-            )
+            return search_members(queryset, search_query)
         
         return queryset.order_by('-is_staff', '-created_at')
 
@@ -0,0 +1,104 @@
+"""
+Per-member daily workout activity
+
+get_daily_activity loads the member's completions since the start of the
+week in one query and answers "done today?" / "done this week?" from sets of
+workout ids, so pages listing many workouts never query per workout. The
+snapshot is remembered on the user for the rest of the request, and
+record_completion keeps it current after a workout is marked done; the
+unique (user, workout, completed_on) constraint makes it safe against double
+submits.
+"""
+from datetime import timedelta
+
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+
+class DailyActivity:
+    """A member's completions today and this week (weeks start on Monday)"""
+
+    def __init__(self, today, completions):
+        self.today = today
+        self.week_start = today - timedelta(days=today.weekday())
+        self.completions_today = []
+        self.completed_today = set()
+        self.completed_this_week = set()
+        self.active_days = set()
+        for completion in completions:
+            self.add(completion)
+
+    def add(self, completion):
+        day = completion.completed_on
+        if day < self.week_start:
+            return
+        self.completed_this_week.add(completion.workout_id)
+        self.active_days.add(day)
+        if day == self.today:
+            self.completed_today.add(completion.workout_id)
+            # Newest first, like UserWorkoutCompletion's default ordering
+            self.completions_today.insert(0, completion)
+
+    def is_completed_today(self, workout):
+        return workout.id in self.completed_today
+
+    def is_completed_this_week(self, workout):
+        return workout.id in self.completed_this_week
+
+    @property
+    def active_days_this_week(self):
+        return len(self.active_days)
+
+
+def get_daily_activity(user):
+    """
+    The member's DailyActivity for today (one query, then remembered on `user`).
+
+    Returns:
+        DailyActivity: empty for anonymous visitors
+    """
+    from .models import UserWorkoutCompletion
+
+    today = timezone.localdate()
+    activity = getattr(user, '_daily_activity', None)
+    if activity is not None and activity.today == today:
+        return activity
+
+    completions = []
+    if user.is_authenticated:
+        week_start = today - timedelta(days=today.weekday())
+        completions = (
+            UserWorkoutCompletion.objects.filter(user=user, completed_on__gte=week_start)
+            .select_related('workout')
+            .order_by('completed_at')
+        )
+    activity = DailyActivity(today, completions)
+    user._daily_activity = activity
+    return activity
+
+
+def record_completion(user, workout):
+    """
+    Mark `workout` done for today unless it already is (insert or ignore).
+
+    Returns:
+        UserWorkoutCompletion or None: The new completion, None if the
+        member had already completed the workout today
+    """
+    from .models import UserWorkoutCompletion
+
+    activity = get_daily_activity(user)
+    if activity.is_completed_today(workout):
+        return None
+    try:
+        # A savepoint, so a concurrent request's row does not break the caller's transaction
+        with transaction.atomic():
+            completion = UserWorkoutCompletion.objects.create(
+                user=user, workout=workout, completed_on=activity.today,
+            )
+    except IntegrityError:
+        activity.completed_today.add(workout.id)
+        activity.completed_this_week.add(workout.id)
+        return None
+    activity.add(completion)
+    return completion
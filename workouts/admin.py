@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Workout, UserWorkoutCompletion
+from .models import Workout, UserWorkoutCompletion, WorkoutStats
 
 
 @admin.register(Workout)
@@ -32,3 +32,17 @@ class UserWorkoutCompletionAdmin(admin.ModelAdmin):
     search_fields = ['user__username', 'workout__title']
     ordering = ['-completed_at']
     readonly_fields = ['completed_at']
+
+
+@admin.register(WorkoutStats)
+class WorkoutStatsAdmin(admin.ModelAdmin):
+    """Read-only view of the popularity index"""
+    list_display = ['workout', 'popularity', 'completions_7d', 'completions_30d', 'completions_total', 'distinct_users', 'plan_inclusions', 'updated_at']
+    ordering = ['-popularity']
+    search_fields = ['workout__title']
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
@@ -0,0 +1,50 @@
+"""
+Featured workouts for the homepage
+
+Picks a few random workouts without ORDER BY RANDOM(): the ids of all
+workouts are cached, a sample is drawn in Python and only those rows are
+fetched by primary key, so the cost does not grow with the library.
+"""
+import random
+
+from django.conf import settings
+from django.core.cache import cache
+
+FEATURED_WORKOUT_IDS_CACHE_KEY = 'workouts:featured_ids'
+
+
+def get_featured_workout_ids():
+    """Ids of every workout that can be featured (cached)"""
+    from .models import Workout
+
+    ids = cache.get(FEATURED_WORKOUT_IDS_CACHE_KEY)
+    if ids is None:
+        ids = list(Workout.objects.values_list('id', flat=True))
+        cache.set(
+            FEATURED_WORKOUT_IDS_CACHE_KEY,
+            ids,
+            getattr(settings, 'FEATURED_WORKOUTS_CACHE_TTL', 3600)
+        )
+    return ids
+
+
+def invalidate_featured_workouts():
+    cache.delete(FEATURED_WORKOUT_IDS_CACHE_KEY)
+
+
+def get_featured_workouts(user, count=6):
+    """
+    A random sample of workouts with access flags for `user`.
+
+    Returns:
+        list: Up to `count` Workout instances with has_access and
+              can_view_details set
+    """
+    from .models import Workout
+    from .utils import annotate_access
+
+    ids = get_featured_workout_ids()
+    sample = random.sample(ids, min(count, len(ids)))
+    by_id = Workout.objects.in_bulk(sample)
+    # A workout deleted since the ids were cached is simply skipped
+    return annotate_access(user, [by_id[workout_id] for workout_id in sample if workout_id in by_id])
@@ -0,0 +1,302 @@
+"""
+Bulk workout import
+
+import_workouts reads a CSV or JSON Lines file a row at a time, validates
+each row with the model's own field validation, resizes the row's thumbnail
+(looked up by file name in an optional zip) in a process pool, and inserts
+the valid rows with bulk_create one chunk at a time. A bad row is reported
+with its line number and skipped; it never stops the rest of the file.
+
+Columns / keys: title, description, category (value or label), difficulty
+(1-3), sets, is_free (true/false, default true), video_url, thumbnail (file
+name inside the zip). Rows repeating the title of an existing workout in the
+same category are skipped, so re-running an import is safe.
+"""
+import io
+import multiprocessing
+import os
+import posixpath
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.exceptions import ValidationError
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+
+from core.importing import ImportResult, read_rows
+
+CHUNK_SIZE = 200
+THUMBNAIL_SIZE = (800, 800)
+THUMBNAIL_UPLOAD_TO = 'workout_thumbnails/'
+# Largest image read from the zip (uncompressed), so a zip bomb is never inflated
+MAX_THUMBNAIL_BYTES = 10 * 1024 * 1024
+
+TRUE_VALUES = {'1', 'true', 'yes', 'y', 'free'}
+FALSE_VALUES = {'0', 'false', 'no', 'n', 'paid', 'premium'}
+
+
+def process_thumbnail(data):
+    """
+    Check and shrink one uploaded image (runs in a worker process).
+
+    Returns:
+        bytes: JPEG no larger than THUMBNAIL_SIZE
+    """
+    from PIL import Image
+
+    with Image.open(io.BytesIO(data)) as image:
+        image.thumbnail(THUMBNAIL_SIZE)
+        output = io.BytesIO()
+        image.convert('RGB').save(output, 'JPEG', quality=85, optimize=True)
+    return output.getvalue()
+
+
+def file_format_for(name):
+    """'csv' or 'jsonl' from a file name"""
+    extension = os.path.splitext(name)[1].lower()
+    if extension == '.csv':
+        return 'csv'
+    if extension in ('.jsonl', '.ndjson', '.json'):
+        return 'jsonl'
+    raise ValueError(f'Unsupported file type "{extension}": upload a .csv or .jsonl file.')
+
+
+def _value(row, *keys):
+    for key in keys:
+        value = row.get(key)
+        if value not in (None, ''):
+            return str(value).strip()
+    return ''
+
+
+def build_workout(row, categories):
+    """
+    An unsaved, validated Workout from one row.
+
+    Returns:
+        tuple: (Workout, thumbnail file name or '')
+
+    Raises:
+        ValidationError: With every problem found in the row
+    """
+    from .models import Workout
+
+    errors = []
+    category = _value(row, 'category')
+    category = categories.get(category.lower(), category)
+
+    is_free = _value(row, 'is_free', 'free').lower() or 'true'
+    if is_free not in TRUE_VALUES | FALSE_VALUES:
+        errors.append(f'is_free: "{is_free}" is not true or false.')
+
+    sets = _value(row, 'sets') or '1'
+    try:
+        sets = int(sets)
+        if sets < 1:
+            raise ValueError
+    except ValueError:
+        errors.append(f'sets: "{sets}" is not a positive whole number.')
+        sets = 1
+
+    workout = Workout(
+        title=_value(row, 'title'),
+        description=_value(row, 'description'),
+        category=category,
+        difficulty_level=_value(row, 'difficulty', 'difficulty_level') or '1',
+        sets=sets,
+        is_free=is_free in TRUE_VALUES,
+        video_url=_value(row, 'video_url') or None,
+    )
+    try:
+        workout.full_clean(exclude=['thumbnail'])
+    except ValidationError as e:
+        errors.extend(
+            f'{field}: {message}' for field, messages in e.message_dict.items() for message in messages
+        )
+    if errors:
+        raise ValidationError(errors)
+    return workout, _value(row, 'thumbnail')
+
+
+class _ZipImages:
+    """Images of the thumbnails zip by file name (with or without folders)"""
+
+    def __init__(self, archive):
+        self.archive = archive
+        self.infos = {}
+        if archive:
+            for info in archive.infolist():
+                if not info.is_dir():
+                    self.infos.setdefault(info.filename, info)
+                    self.infos.setdefault(posixpath.basename(info.filename), info)
+
+    def read(self, name):
+        """
+        Raises:
+            KeyError: No such image in the zip
+            ValueError: The image is larger than MAX_THUMBNAIL_BYTES
+        """
+        if not self.archive:
+            raise KeyError(name)
+        info = self.infos[name]
+        # Reading stops at file_size, so checking it bounds what is inflated
+        if info.file_size > MAX_THUMBNAIL_BYTES:
+            raise ValueError(
+                f'"{name}" is {info.file_size / 1024 / 1024:.0f} MB; images can be up to '
+                f'{MAX_THUMBNAIL_BYTES // 1024 // 1024} MB.'
+            )
+        return self.archive.read(info)
+
+
+def _save_chunk(chunk, thumbnails, executor, result, dry_run):
+    """
+    Resize the chunk's thumbnails and bulk_create the rows that are still valid.
+
+    Returns:
+        list: The created workouts (empty on a dry run)
+    """
+    from .models import Workout
+
+    images = {}
+    for line, workout, thumbnail in chunk:
+        if thumbnail:
+            try:
+                images[line] = thumbnails.read(thumbnail)
+            except KeyError:
+                result.add_error(line, f'thumbnail: "{thumbnail}" is not in the thumbnails zip.')
+            except ValueError as e:
+                result.add_error(line, f'thumbnail: {e}')
+
+    resized = {}
+    if images:
+        lines = list(images)
+        mapper = executor.map if executor else map
+        outputs = mapper(_safe_process_thumbnail, [images[line] for line in lines])
+        for line, (data, error) in zip(lines, outputs):
+            if error:
+                result.add_error(line, f'thumbnail: {error}')
+            else:
+                resized[line] = data
+
+    valid = [
+        (line, workout, thumbnail) for line, workout, thumbnail in chunk
+        if not thumbnail or line in resized
+    ]
+    if dry_run:
+        result.created += len(valid)
+        return []
+
+    saved = []
+    try:
+        for line, workout, thumbnail in valid:
+            if thumbnail:
+                name = posixpath.splitext(posixpath.basename(thumbnail))[0] + '.jpg'
+                workout.thumbnail.name = default_storage.save(THUMBNAIL_UPLOAD_TO + name, ContentFile(resized[line]))
+                saved.append(workout.thumbnail.name)
+        with transaction.atomic():
+            created = Workout.objects.bulk_create([workout for _, workout, _ in valid])
+    except Exception:
+        for name in saved:
+            default_storage.delete(name)
+        raise
+    result.created += len(valid)
+    return created
+
+
+def _safe_process_thumbnail(data):
+    """process_thumbnail returning (bytes, None) or (None, error) instead of raising"""
+    try:
+        return process_thumbnail(data), None
+    except Exception as e:
+        return None, f'not a readable image ({e.__class__.__name__}).'
+
+
+def import_workouts(
+    lines, file_format, thumbnails=None, chunk_size=CHUNK_SIZE, workers=None, dry_run=False, similar='rebuild',
+):
+    """
+    Validate and insert workouts from a CSV/JSONL file.
+
+    Args:
+        lines: Iterable of the file's lines (bytes or text)
+        file_format: 'csv' or 'jsonl'
+        thumbnails: Path or file object of a zip of images, or None
+        chunk_size: Rows per bulk_create
+        workers: Image processes (default: CPU count, up to 4); 1 resizes in-process
+        dry_run: Validate everything but write nothing
+        similar: 'rebuild' recomputes every similar-workouts list afterwards;
+                 'update' compares only the new workouts with the rest once
+                 the transaction commits (update_similar_workouts), which
+                 is what a request should do
+
+    Returns:
+        ImportResult
+
+    Raises:
+        ValueError: The thumbnails are not a zip, or the file is not UTF-8
+    """
+    from core.page_cache import bump_page_version
+    from .featured import invalidate_featured_workouts
+    from .models import Workout
+    from .similarity import refresh_similar_workouts, update_similar_workouts
+
+    categories = {}
+    for value, label in Workout.CATEGORY_CHOICES:
+        categories[value.lower()] = value
+        categories[label.lower()] = value
+    existing = {
+        (title.lower(), category) for title, category in Workout.objects.values_list('title', 'category')
+    }
+
+    workers = workers or min(4, os.cpu_count() or 1)
+    result = ImportResult()
+    created_ids = []
+    try:
+        archive = zipfile.ZipFile(thumbnails) if thumbnails else None
+    except zipfile.BadZipFile:
+        raise ValueError('The thumbnails file is not a zip archive.')
+    thumbnail_files = _ZipImages(archive)
+    # spawn: forking a process that holds database connections and threads is unsafe
+    executor = ProcessPoolExecutor(
+        max_workers=workers, mp_context=multiprocessing.get_context('spawn'),
+    ) if workers > 1 and archive else None
+
+    try:
+        chunk = []
+        for line, row in read_rows(lines, file_format):
+            result.rows += 1
+            try:
+                if isinstance(row, ValidationError):
+                    raise row
+                workout, thumbnail = build_workout(row, categories)
+            except ValidationError as e:
+                result.add_error(line, ' '.join(e.messages))
+                continue
+            key = (workout.title.lower(), workout.category)
+            if key in existing:
+                result.skipped += 1
+                continue
+            existing.add(key)
+            chunk.append((line, workout, thumbnail))
+            if len(chunk) >= chunk_size:
+                created_ids.extend(workout.pk for workout in _save_chunk(chunk, thumbnail_files, executor, result, dry_run))
+                chunk = []
+        if chunk:
+            created_ids.extend(workout.pk for workout in _save_chunk(chunk, thumbnail_files, executor, result, dry_run))
+    finally:
+        if executor:
+            executor.shutdown()
+        if archive:
+            archive.close()
+
+    if result.created and not dry_run:
+        # bulk_create sends no post_save, so do what core.signals would
+        bump_page_version('workouts')
+        invalidate_featured_workouts()
+        if similar == 'update':
+            transaction.on_commit(lambda: update_similar_workouts(created_ids))
+        else:
+            refresh_similar_workouts()
+    return result
+
@@ -0,0 +1,48 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from workouts.importer import CHUNK_SIZE, file_format_for, import_workouts
+
+
+class Command(BaseCommand):
+    help = 'Import workouts from a CSV or JSONL file, with thumbnails from an optional zip'
+
+    def add_arguments(self, parser):
+        parser.add_argument('file', help='.csv or .jsonl file, one workout per row')
+        parser.add_argument('--thumbnails', help='Zip of the images named in the thumbnail column')
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help='Rows inserted per bulk_create')
+        parser.add_argument('--workers', type=int, default=None, help='Image processes (default: CPU count, up to 4)')
+        parser.add_argument('--dry-run', action='store_true', help='Validate every row but create nothing')
+
+    def handle(self, *args, **options):
+        try:
+            file_format = file_format_for(options['file'])
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        started = time.perf_counter()
+        try:
+            with open(options['file'], 'rb') as lines:
+                result = import_workouts(
+                    lines, file_format,
+                    thumbnails=options['thumbnails'],
+                    chunk_size=options['chunk_size'],
+                    workers=options['workers'],
+                    dry_run=options['dry_run'],
+                )
+        except (OSError, ValueError) as e:
+            raise CommandError(f'Could not read the import: {e}')
+        elapsed = time.perf_counter() - started
+
+        for line, message in result.errors:
+            self.stderr.write(f'Line {line}: {message}')
+        if result.error_count > len(result.errors):
+            self.stderr.write(f'... and {result.error_count - len(result.errors)} more errors')
+
+        verb = 'Would create' if options['dry_run'] else 'Created'
+        summary = (
+            f'{verb} {result.created} of {result.rows} workouts in {elapsed:.1f}s '
+            f'({result.skipped} already existed, {result.error_count} with errors).'
+        )
+        self.stdout.write(self.style.WARNING(summary) if result.error_count else self.style.SUCCESS(summary))
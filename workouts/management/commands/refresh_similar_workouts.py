@@ -0,0 +1,18 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from workouts.similarity import SIMILAR_PER_WORKOUT, refresh_similar_workouts
+
+
+class Command(BaseCommand):
+    help = 'Recompute the content-based "Similar workouts" lists (staff edits update the lists they affect)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--similar', type=int, default=SIMILAR_PER_WORKOUT, help='Similar workouts kept per workout')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        count = refresh_similar_workouts(n=options['similar'])
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(f'Similar workouts refreshed for {count} workouts in {elapsed:.1f}s.'))
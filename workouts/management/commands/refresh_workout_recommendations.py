@@ -0,0 +1,18 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from workouts.recommendations import NEIGHBORS_PER_WORKOUT, refresh_workout_neighbors
+
+
+class Command(BaseCommand):
+    help = 'Recompute co-completion neighbours behind "Recommended for you" (schedule nightly)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--neighbors', type=int, default=NEIGHBORS_PER_WORKOUT, help='Neighbours kept per workout')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        count = refresh_workout_neighbors(k=options['neighbors'])
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(f'Recommendations refreshed for {count} workouts in {elapsed:.1f}s.'))
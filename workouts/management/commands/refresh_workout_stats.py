@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from workouts.popularity import refresh_workout_stats
+
+
+class Command(BaseCommand):
+    help = 'Recompute workout popularity stats (completions, plan inclusions, assignments); schedule hourly'
+
+    def handle(self, *args, **options):
+        count = refresh_workout_stats()
+        self.stdout.write(self.style.SUCCESS(f'Workout stats refreshed for {count} workouts.'))
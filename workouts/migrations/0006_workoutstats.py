@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-19 00:06
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('workouts', '0005_trainerassignedworkout'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WorkoutStats',
+            fields=[
+                ('workout', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='workouts.workout')),
+                ('completions_7d', models.PositiveIntegerField(default=0)),
+                ('completions_30d', models.PositiveIntegerField(default=0)),
+                ('completions_total', models.PositiveIntegerField(default=0)),
+                ('distinct_users', models.PositiveIntegerField(default=0, help_text='Members who completed it at least once')),
+                ('plan_inclusions', models.PositiveIntegerField(default=0, help_text='Trainer workout plans that include it')),
+                ('trainer_assignments', models.PositiveIntegerField(default=0)),
+                ('popularity', models.FloatField(default=0, help_text='Weighted score used to rank workouts')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name_plural': 'Workout stats',
+                'indexes': [models.Index(fields=['-popularity'], name='workoutstats_popularity_idx'), models.Index(fields=['-completions_7d'], name='workoutstats_trending_idx')],
+            },
+        ),
+    ]
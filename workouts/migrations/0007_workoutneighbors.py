@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-19 00:09
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('workouts', '0006_workoutstats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WorkoutNeighbors',
+            fields=[
+                ('workout', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='neighbors', serialize=False, to='workouts.workout')),
+                ('co_completed', models.JSONField(default=list, help_text='[[workout id, similarity], ...] for workouts completed by the same members, most similar first')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name_plural': 'Workout neighbors',
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 00:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('workouts', '0007_workoutneighbors'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='workoutneighbors',
+            name='similar',
+            field=models.JSONField(default=list, help_text='[[workout id, similarity], ...] for workouts with similar content, most similar first'),
+        ),
+    ]
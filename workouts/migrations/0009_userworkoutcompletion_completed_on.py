@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-19 00:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('workouts', '0008_workoutneighbors_similar'),
+    ]
+
+    operations = [
+        # Nullable until 0010 has filled in existing rows
+        migrations.AddField(
+            model_name='userworkoutcompletion',
+            name='completed_on',
+            field=models.DateField(null=True),
+        ),
+    ]
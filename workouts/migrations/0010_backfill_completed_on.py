@@ -0,0 +1,46 @@
+"""
+Fill in completed_on for existing completions, a primary-key range at a time
+so each batch commits on its own and no long write lock is held. Rows that
+repeat a (user, workout, day) are removed before 0011 makes that unique,
+keeping the earliest.
+"""
+from django.db import migrations
+from django.db.models import Count, Max, Min
+from django.db.models.functions import TruncDate
+
+BATCH_SIZE = 10_000
+
+
+def backfill_completed_on(apps, schema_editor):
+    UserWorkoutCompletion = apps.get_model('workouts', 'UserWorkoutCompletion')
+    bounds = UserWorkoutCompletion.objects.aggregate(low=Min('id'), high=Max('id'))
+    if bounds['low'] is None:
+        return
+    for start in range(bounds['low'], bounds['high'] + 1, BATCH_SIZE):
+        # TruncDate converts to the current time zone, like timezone.localdate
+        UserWorkoutCompletion.objects.filter(
+            id__gte=start, id__lt=start + BATCH_SIZE, completed_on__isnull=True,
+        ).update(completed_on=TruncDate('completed_at'))
+
+    duplicates = (
+        UserWorkoutCompletion.objects.values('user_id', 'workout_id', 'completed_on')
+        .annotate(count=Count('id'), keep=Min('id'))
+        .filter(count__gt=1)
+        .order_by()
+    )
+    for group in list(duplicates):
+        UserWorkoutCompletion.objects.filter(
+            user_id=group['user_id'], workout_id=group['workout_id'], completed_on=group['completed_on'],
+        ).exclude(id=group['keep']).delete()
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('workouts', '0009_userworkoutcompletion_completed_on'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_completed_on, migrations.RunPython.noop),
+    ]
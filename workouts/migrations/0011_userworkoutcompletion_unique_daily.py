@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-19 00:15
+
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('workouts', '0010_backfill_completed_on'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterUniqueTogether(
+            name='userworkoutcompletion',
+            unique_together=set(),
+        ),
+        migrations.AlterField(
+            model_name='userworkoutcompletion',
+            name='completed_on',
+            field=models.DateField(default=django.utils.timezone.localdate),
+        ),
+        migrations.AddConstraint(
+            model_name='userworkoutcompletion',
+            constraint=models.UniqueConstraint(fields=('user', 'workout', 'completed_on'), name='unique_daily_workout_completion'),
+        ),
+    ]
@@ -1,5 +1,6 @@
 from django.db import models
 from django.conf import settings
+from django.utils import timezone
 
 # Import Trainer from core app
 try:
@@ -68,10 +69,14 @@ class UserWorkoutCompletion(models.Model):
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='workout_completions')
     workout = models.ForeignKey(Workout, on_delete=models.CASCADE, related_name='completions')
     completed_at = models.DateTimeField(auto_now_add=True)
+    # Local date of completed_at: a workout counts once per day
+    completed_on = models.DateField(default=timezone.localdate)
     
     class Meta:
         ordering = ['-completed_at']
-        unique_together = [['user', 'workout', 'completed_at']]
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'workout', 'completed_on'], name='unique_daily_workout_completion'),
+        ]
     
     def __str__(self):
         return f"{self.user.username} - {self.workout.title} on {self.completed_at.date()}"
@@ -152,3 +157,56 @@ class TrainerAssignedWorkout(models.Model):
 
     def __str__(self):
         return f"{self.trainer.user.get_full_name()} -> {self.user.username}: {self.workout.title}"
+
+
+class WorkoutStats(models.Model):
+    """Popularity counters per workout, recomputed by workouts.popularity.refresh_workout_stats"""
+    workout = models.OneToOneField(
+        Workout,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats'
+    )
+    completions_7d = models.PositiveIntegerField(default=0)
+    completions_30d = models.PositiveIntegerField(default=0)
+    completions_total = models.PositiveIntegerField(default=0)
+    distinct_users = models.PositiveIntegerField(default=0, help_text="Members who completed it at least once")
+    plan_inclusions = models.PositiveIntegerField(default=0, help_text="Trainer workout plans that include it")
+    trainer_assignments = models.PositiveIntegerField(default=0)
+    popularity = models.FloatField(default=0, help_text="Weighted score used to rank workouts")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name_plural = "Workout stats"
+        indexes = [
+            models.Index(fields=['-popularity'], name='workoutstats_popularity_idx'),
+            models.Index(fields=['-completions_7d'], name='workoutstats_trending_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.workout.title}: {self.popularity:.1f}"
+
+
+class WorkoutNeighbors(models.Model):
+    """Precomputed related workouts, read by the workout's primary key"""
+    workout = models.OneToOneField(
+        Workout,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='neighbors'
+    )
+    co_completed = models.JSONField(
+        default=list,
+        help_text="[[workout id, similarity], ...] for workouts completed by the same members, most similar first"
+    )
+    similar = models.JSONField(
+        default=list,
+        help_text="[[workout id, similarity], ...] for workouts with similar content, most similar first"
+    )
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name_plural = "Workout neighbors"
+
+    def __str__(self):
+        return f"Neighbors of {self.workout.title}"
@@ -0,0 +1,118 @@
+"""
+Workout popularity index
+
+refresh_workout_stats recomputes WorkoutStats for every workout from a few
+GROUP BY aggregates (completions, trainer plans, trainer assignments) and
+upserts the rows in bulk. Pages read the stored counters instead of
+aggregating per request; run `manage.py refresh_workout_stats` hourly.
+"""
+from datetime import timedelta
+
+from django.db.models import Count, F, Q
+from django.utils import timezone
+
+# Weights of the popularity score: recent use counts most, being picked by
+# trainers signals quality even before members catch up
+POPULARITY_WEIGHTS = {
+    'completions_7d': 3.0,
+    'completions_30d': 1.0,
+    'distinct_users': 0.5,
+    'plan_inclusions': 5.0,
+    'trainer_assignments': 2.0,
+}
+
+STATS_FIELDS = [
+    'completions_7d', 'completions_30d', 'completions_total',
+    'distinct_users', 'plan_inclusions', 'trainer_assignments',
+]
+
+
+def compute_workout_stats(now=None):
+    """
+    Popularity counters for every workout (three aggregate queries plus the workout ids).
+
+    Returns:
+        dict: workout id -> dict of STATS_FIELDS and popularity
+    """
+    from .models import Workout, UserWorkoutCompletion, WorkoutPlan, TrainerAssignedWorkout
+
+    now = now or timezone.now()
+    stats = {
+        workout_id: dict.fromkeys(STATS_FIELDS, 0)
+        for workout_id in Workout.objects.values_list('id', flat=True)
+    }
+
+    completions = UserWorkoutCompletion.objects.values('workout_id').annotate(
+        completions_7d=Count('id', filter=Q(completed_at__gte=now - timedelta(days=7))),
+        completions_30d=Count('id', filter=Q(completed_at__gte=now - timedelta(days=30))),
+        completions_total=Count('id'),
+        distinct_users=Count('user_id', distinct=True),
+    ).order_by()
+    for row in completions:
+        if row['workout_id'] in stats:
+            stats[row['workout_id']].update(row)
+
+    plan_inclusions = WorkoutPlan.workouts.through.objects.values('workout_id').annotate(
+        total=Count('workoutplan_id')
+    ).order_by()
+    assignments = TrainerAssignedWorkout.objects.values('workout_id').annotate(total=Count('id')).order_by()
+    for field, rows in [('plan_inclusions', plan_inclusions), ('trainer_assignments', assignments)]:
+        for row in rows:
+            if row['workout_id'] in stats:
+                stats[row['workout_id']][field] = row['total']
+
+    for counters in stats.values():
+        counters.pop('workout_id', None)
+        counters['popularity'] = sum(counters[field] * weight for field, weight in POPULARITY_WEIGHTS.items())
+    return stats
+
+
+def refresh_workout_stats(batch_size=1000):
+    """
+    Recompute and store WorkoutStats for every workout.
+
+    Returns:
+        int: Number of workouts refreshed
+    """
+    from core.page_cache import bump_page_version
+    from .models import WorkoutStats
+
+    now = timezone.now()
+    stats = compute_workout_stats(now)
+    WorkoutStats.objects.bulk_create(
+        [
+            WorkoutStats(workout_id=workout_id, updated_at=now, **counters)
+            for workout_id, counters in stats.items()
+        ],
+        batch_size=batch_size,
+        update_conflicts=True,
+        unique_fields=['workout'],
+        update_fields=STATS_FIELDS + ['popularity', 'updated_at'],
+    )
+    # Library and homepage order by these numbers
+    bump_page_version('workouts')
+    return len(stats)
+
+
+def by_popularity(queryset):
+    """Order a Workout queryset most popular first (workouts without stats last)"""
+    return queryset.order_by(F('stats__popularity').desc(nulls_last=True), 'title')
+
+
+def get_trending_workouts(user, count=4):
+    """
+    Workouts completed most in the last 7 days, with access flags for `user`.
+
+    Returns:
+        list: Up to `count` Workout instances (stats loaded, has_access and
+              can_view_details set)
+    """
+    from .models import Workout
+    from .utils import annotate_access
+
+    trending = (
+        Workout.objects.filter(stats__completions_7d__gt=0)
+        .select_related('stats')
+        .order_by('-stats__completions_7d', '-stats__popularity')[:count]
+    )
+    return annotate_access(user, trending)
@@ -0,0 +1,185 @@
+"""
+"Recommended for you": item-item recommendations from co-completions
+
+Offline, refresh_workout_neighbors turns the distinct (member, workout)
+completion pairs into a members x workouts 0/1 matrix, multiplies it by
+itself in blocks of members to count how many members completed each pair
+of workouts, and keeps the top-k most similar workouts (cosine similarity)
+per workout in WorkoutNeighbors. Only the workouts x workouts matrix is ever
+held in memory, so millions of completions take seconds to minutes.
+
+Online, get_recommended_workouts reads the neighbour lists of the member's
+recent workouts by primary key, sums their similarities, drops what the
+member has done and keeps what their plan gives them access to.
+"""
+from collections import defaultdict
+
+import numpy as np
+from django.db.models import Max
+from django.utils import timezone
+
+NEIGHBORS_PER_WORKOUT = 20
+# Pairs completed together by fewer members are noise
+MIN_COMMON_MEMBERS = 2
+MEMBER_BLOCK_SIZE = 4096
+# How many of the member's most recent workouts seed their recommendations
+RECENT_SEEDS = 20
+
+
+def completion_pairs(batch_size=100_000):
+    """
+    Distinct (user id, workout id) pairs of all completions, streamed.
+
+    Returns:
+        tuple: two int64 arrays (user ids, workout ids), sorted by user
+    """
+    from .models import UserWorkoutCompletion
+
+    rows = (
+        UserWorkoutCompletion.objects.values_list('user_id', 'workout_id')
+        .distinct().order_by('user_id')
+        .iterator(chunk_size=batch_size)
+    )
+    pairs = np.fromiter(
+        (value for row in rows for value in row), dtype=np.int64,
+    ).reshape(-1, 2)
+    return pairs[:, 0], pairs[:, 1]
+
+
+def co_completion_counts(user_ids, item_index, n_items, block_size=MEMBER_BLOCK_SIZE):
+    """
+    Members who completed both workouts i and j, for every pair.
+
+    Args:
+        user_ids: Sorted user id per pair
+        item_index: Column (0..n_items-1) per pair
+        n_items: Number of workouts
+
+    Returns:
+        ndarray: n_items x n_items float32 matrix (diagonal = members per workout)
+    """
+    counts = np.zeros((n_items, n_items), dtype=np.float32)
+    np.fill_diagonal(counts, np.bincount(item_index, minlength=n_items))
+
+    # Members with a single workout only add to the diagonal
+    _, user_rows, per_user = np.unique(user_ids, return_inverse=True, return_counts=True)
+    keep = per_user[user_rows] > 1
+    user_rows, item_index = user_rows[keep], item_index[keep]
+    if not len(user_rows):
+        return counts
+    # Renumber the remaining members 0..n-1 (still sorted)
+    _, user_rows = np.unique(user_rows, return_inverse=True)
+    n_users = user_rows[-1] + 1
+
+    off_diagonal = np.zeros_like(counts)
+    for start in range(0, n_users, block_size):
+        lo, hi = np.searchsorted(user_rows, [start, start + block_size])
+        block = np.zeros((min(block_size, n_users - start), n_items), dtype=np.float32)
+        block[user_rows[lo:hi] - start, item_index[lo:hi]] = 1
+        off_diagonal += block.T @ block
+    np.fill_diagonal(off_diagonal, 0)
+    return counts + off_diagonal
+
+
+def top_neighbors(counts, k=NEIGHBORS_PER_WORKOUT, min_common=MIN_COMMON_MEMBERS):
+    """
+    Cosine similarity of every workout pair and the k best per workout.
+
+    Returns:
+        list: per workout row, [(column, similarity), ...] best first
+    """
+    members = np.diag(counts).copy()
+    norms = np.sqrt(members)
+    norms[norms == 0] = 1
+    similarity = counts / norms[:, None] / norms[None, :]
+    similarity[counts < min_common] = 0
+    np.fill_diagonal(similarity, 0)
+
+    k = min(k, max(len(members) - 1, 0))
+    if k == 0:
+        return [[] for _ in members]
+    best = np.argpartition(-similarity, k - 1, axis=1)[:, :k]
+    neighbors = []
+    for row, columns in enumerate(best):
+        scores = similarity[row, columns]
+        order = np.argsort(-scores)
+        neighbors.append([
+            (int(columns[i]), round(float(scores[i]), 4)) for i in order if scores[i] > 0
+        ])
+    return neighbors
+
+
+def refresh_workout_neighbors(k=NEIGHBORS_PER_WORKOUT, batch_size=1000):
+    """
+    Recompute co-completion neighbours for every workout.
+
+    Returns:
+        int: Number of workouts refreshed
+    """
+    from .models import Workout, WorkoutNeighbors
+
+    workout_ids = np.array(sorted(Workout.objects.values_list('id', flat=True)), dtype=np.int64)
+    user_ids, completed = completion_pairs()
+    known = np.isin(completed, workout_ids)
+    item_index = np.searchsorted(workout_ids, completed[known])
+
+    counts = co_completion_counts(user_ids[known], item_index, len(workout_ids))
+    neighbors = top_neighbors(counts, k)
+
+    now = timezone.now()
+    WorkoutNeighbors.objects.bulk_create(
+        [
+            WorkoutNeighbors(
+                workout_id=int(workout_id),
+                co_completed=[[int(workout_ids[column]), score] for column, score in row],
+                updated_at=now,
+            )
+            for workout_id, row in zip(workout_ids, neighbors)
+        ],
+        batch_size=batch_size,
+        update_conflicts=True,
+        unique_fields=['workout'],
+        update_fields=['co_completed', 'updated_at'],
+    )
+    return len(workout_ids)
+
+
+def get_recommended_workouts(user, count=6):
+    """
+    Workouts the member has not done, liked by members who did what they did.
+
+    Returns:
+        list: Up to `count` accessible Workout instances, best first
+              (has_access and can_view_details set)
+    """
+    from .models import Workout, UserWorkoutCompletion, WorkoutNeighbors
+    from .utils import annotate_access
+
+    if not user.is_authenticated:
+        return []
+
+    completed = list(
+        UserWorkoutCompletion.objects.filter(user=user)
+        .values('workout_id').annotate(last=Max('completed_at'))
+        .order_by('-last').values_list('workout_id', flat=True)
+    )
+    if not completed:
+        return []
+
+    seeds = completed[:RECENT_SEEDS]
+    done = set(completed)
+    scores = defaultdict(float)
+    for rank, row in sorted(
+        (seeds.index(workout_id), row) for workout_id, row in WorkoutNeighbors.objects.in_bulk(seeds).items()
+    ):
+        # More recent workouts count more
+        weight = 0.9 ** rank
+        for workout_id, similarity in row.co_completed:
+            if workout_id not in done:
+                scores[workout_id] += similarity * weight
+
+    # Some candidates may be locked; fetch a few spare
+    candidates = sorted(scores, key=scores.get, reverse=True)[:count * 3]
+    by_id = Workout.objects.in_bulk(candidates)
+    workouts = annotate_access(user, [by_id[workout_id] for workout_id in candidates if workout_id in by_id])
+    return [workout for workout in workouts if workout.has_access][:count]
@@ -0,0 +1,212 @@
+"""
+Content-based "similar workouts"
+
+refresh_similar_workouts builds a TF-IDF vector per workout from its title
+(counted twice), description, category and difficulty, then compares every
+workout with every other by cosine similarity in blocks of rows, keeping the
+top-N per workout in WorkoutNeighbors.similar. Terms found in a single
+workout cannot make two workouts similar, so they only count towards the
+vector's length and get no column; the vocabulary is also capped, which keeps
+the matrix small. Runs nightly via `manage.py refresh_similar_workouts`;
+when staff create or edit workouts, update_similar_workouts compares just
+those workouts with the rest and patches the lists they affect.
+"""
+import math
+import re
+from collections import Counter
+
+import numpy as np
+from django.utils import timezone
+
+SIMILAR_PER_WORKOUT = 8
+MAX_TERMS = 4096
+ROW_BLOCK_SIZE = 512
+
+_TOKEN_RE = re.compile(r'[a-z0-9]{2,}')
+
+STOP_WORDS = frozenset("""
+    a about above after all also an and any are as at be been before being below between both but by
+    can do does doing down during each few for from further had has have having he her here hers him
+    his how if in into is it its itself just more most my no nor not now of off on once only or other
+    our out over own same she should so some such than that the their them then there these they this
+    those through to too under until up very was we were what when where which while who whom why will
+    with you your yours
+""".split())
+
+
+def workout_terms(workout):
+    """Term counts for one workout (title words count twice)"""
+    words = _TOKEN_RE.findall(f'{workout.title} {workout.title} {workout.description}'.lower())
+    terms = Counter(word for word in words if word not in STOP_WORDS)
+    terms[f'category:{workout.category}'] += 1
+    terms[f'level:{workout.difficulty_level}'] += 1
+    return terms
+
+
+def tfidf_matrix(documents, max_terms=MAX_TERMS):
+    """
+    L2-normalised TF-IDF rows for a list of term Counters.
+
+    Returns:
+        ndarray: len(documents) x vocabulary float32 matrix
+    """
+    n_docs = len(documents)
+    document_frequency = Counter(term for terms in documents for term in terms)
+    # Smoothed IDF, as in most TF-IDF implementations
+    idf = {
+        term: math.log((1 + n_docs) / (1 + count)) + 1
+        for term, count in document_frequency.items()
+    }
+    shared = [term for term, count in document_frequency.most_common() if count > 1][:max_terms]
+    columns = {term: index for index, term in enumerate(shared)}
+
+    matrix = np.zeros((n_docs, len(columns)), dtype=np.float32)
+    for row, terms in enumerate(documents):
+        weights = {term: (1 + math.log(count)) * idf[term] for term, count in terms.items()}
+        norm = math.sqrt(sum(weight * weight for weight in weights.values())) or 1.0
+        for term, weight in weights.items():
+            column = columns.get(term)
+            if column is not None:
+                matrix[row, column] = weight / norm
+    return matrix
+
+
+def _best_columns(similarity, n):
+    """Per row of a similarity block, [(column, similarity), ...] of its n best, best first"""
+    if n == 0:
+        return [[] for _ in range(similarity.shape[0])]
+    best = np.argpartition(-similarity, n - 1, axis=1)[:, :n]
+    results = []
+    for row, columns in enumerate(best):
+        scores = similarity[row, columns]
+        order = np.argsort(-scores)
+        results.append([
+            (int(columns[i]), round(float(scores[i]), 4)) for i in order if scores[i] > 0
+        ])
+    return results
+
+
+def top_similar(matrix, n=SIMILAR_PER_WORKOUT, block_size=ROW_BLOCK_SIZE):
+    """
+    The n most similar rows to each row (cosine, rows already normalised).
+
+    Returns:
+        list: per row, [(row, similarity), ...] best first
+    """
+    n_rows = matrix.shape[0]
+    n = min(n, max(n_rows - 1, 0))
+    results = []
+    for start in range(0, n_rows, block_size):
+        similarity = matrix[start:start + block_size] @ matrix.T
+        # A workout is not similar to itself
+        similarity[np.arange(similarity.shape[0]), np.arange(start, start + similarity.shape[0])] = 0
+        results.extend(_best_columns(similarity, n))
+    return results
+
+
+def refresh_similar_workouts(n=SIMILAR_PER_WORKOUT, batch_size=1000):
+    """
+    Recompute the similar-workouts lists of every workout.
+
+    Returns:
+        int: Number of workouts refreshed
+    """
+    from core.page_cache import bump_page_version
+    from .models import Workout, WorkoutNeighbors
+
+    workouts = list(Workout.objects.only('id', 'title', 'description', 'category', 'difficulty_level').order_by('id'))
+    matrix = tfidf_matrix([workout_terms(workout) for workout in workouts])
+    similar = top_similar(matrix, n)
+
+    now = timezone.now()
+    WorkoutNeighbors.objects.bulk_create(
+        [
+            WorkoutNeighbors(
+                workout_id=workout.id,
+                similar=[[workouts[row].id, score] for row, score in rows],
+                updated_at=now,
+            )
+            for workout, rows in zip(workouts, similar)
+        ],
+        batch_size=batch_size,
+        update_conflicts=True,
+        unique_fields=['workout'],
+        update_fields=['similar', 'updated_at'],
+    )
+    # Workout pages list these
+    bump_page_version('workouts')
+    return len(workouts)
+
+
+def update_similar_workouts(workout_ids, n=SIMILAR_PER_WORKOUT):
+    """
+    Refresh the lists of a few new or edited workouts, and only the other
+    lists they enter, leave or move in.
+
+    Compares just those workouts with the rest (a few rows of the full
+    rebuild's matrix product). Other workouts' scores keep the term weights
+    of the last full rebuild, and a list the workout drops out of stays one
+    short, until the next `manage.py refresh_similar_workouts`.
+
+    Returns:
+        int: Number of lists written
+    """
+    from core.page_cache import bump_page_version
+    from .models import Workout, WorkoutNeighbors
+
+    workouts = list(Workout.objects.only('id', 'title', 'description', 'category', 'difficulty_level').order_by('id'))
+    index = {workout.id: row for row, workout in enumerate(workouts)}
+    rows = sorted({index[workout_id] for workout_id in workout_ids if workout_id in index})
+    if not rows:
+        return 0
+    edited = {workouts[row].id for row in rows}
+
+    matrix = tfidf_matrix([workout_terms(workout) for workout in workouts])
+    similarity = matrix[rows] @ matrix.T
+    similarity[np.arange(len(rows)), rows] = 0
+    changed = {
+        workouts[row].id: [[workouts[column].id, score] for column, score in columns]
+        for row, columns in zip(rows, _best_columns(similarity, min(n, len(workouts) - 1)))
+    }
+
+    for workout_id, similar in WorkoutNeighbors.objects.exclude(workout_id__in=edited).values_list('workout_id', 'similar'):
+        column = index.get(workout_id)
+        if column is None:
+            continue
+        entries = [entry for entry in similar if entry[0] not in edited]
+        for position, row in enumerate(rows):
+            score = round(float(similarity[position, column]), 4)
+            if score > 0:
+                entries.append([workouts[row].id, score])
+        entries = sorted(entries, key=lambda entry: -entry[1])[:n]
+        if entries != similar:
+            changed[workout_id] = entries
+
+    now = timezone.now()
+    WorkoutNeighbors.objects.bulk_create(
+        [
+            WorkoutNeighbors(workout_id=workout_id, similar=similar, updated_at=now)
+            for workout_id, similar in changed.items()
+        ],
+        update_conflicts=True,
+        unique_fields=['workout'],
+        update_fields=['similar', 'updated_at'],
+    )
+    bump_page_version('workouts')
+    return len(changed)
+
+
+def get_similar_workouts(user, workout, count=4):
+    """
+    Workouts most like `workout`, with access flags for `user`.
+
+    Returns:
+        list: Up to `count` Workout instances, best first
+    """
+    from .models import Workout, WorkoutNeighbors
+    from .utils import annotate_access
+
+    row = WorkoutNeighbors.objects.filter(workout_id=workout.id).values_list('similar', flat=True).first()
+    ids = [workout_id for workout_id, _ in (row or [])[:count]]
+    by_id = Workout.objects.in_bulk(ids)
+    return annotate_access(user, [by_id[workout_id] for workout_id in ids if workout_id in by_id])
@@ -1,3 +1,441 @@
-from django.test import TestCase
+import io
+import json
+import shutil
+import tempfile
+import zipfile
+from collections import Counter
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+from PIL import Image
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from workouts import urls
+from core.models import UserPoints
+from core.testing import QueryBudgetTestCase, budget, seed_gym_data
+from workouts.activity import get_daily_activity, record_completion
+from workouts.featured import get_featured_workout_ids, get_featured_workouts
+from workouts.importer import file_format_for, import_workouts
+from workouts.models import UserWorkoutCompletion, Workout, WorkoutNeighbors, WorkoutStats
+from workouts.popularity import by_popularity, get_trending_workouts, refresh_workout_stats
+from workouts.recommendations import (
+    co_completion_counts, get_recommended_workouts, refresh_workout_neighbors, top_neighbors,
+)
+from workouts.similarity import (
+    get_similar_workouts, refresh_similar_workouts, tfidf_matrix, top_similar, update_similar_workouts, workout_terms,
+)
+from workouts.utils import annotate_access, can_view_workout_details, user_has_access_to_workout
+
+
+class WorkoutsQueryBudgetTests(QueryBudgetTestCase):
+    """Query and render-time budgets for workouts/urls.py"""
+    urlpatterns = urls.urlpatterns
+    namespace = 'workouts'
+    budgets = {
+        'library': budget(6, anonymous=1),
+        'workout_today': budget(10),
+        'workout_detail': budget(11, kwargs=lambda data: {'workout_id': data.workout.id}),
+        'mark_completed': budget(15, method='post', kwargs=lambda data: {'workout_id': data.workout.id}),
+    }
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class WorkoutAccessTests(TestCase):
+    """Bulk access flags agree with the per-workout checks"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.data = seed_gym_data(members=6, workouts=12, classes=2, days=3)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_annotate_access_matches_per_workout_checks(self):
+        users = [AnonymousUser(), self.data.staff, self.data.trainer] + self.data.members
+        workouts = list(Workout.objects.all())
+        for user in users:
+            with self.subTest(user=str(user)):
+                annotated = annotate_access(user, Workout.objects.all())
+                self.assertEqual(
+                    [(workout.has_access, workout.can_view_details) for workout in annotated],
+                    [
+                        (user_has_access_to_workout(user, workout), can_view_workout_details(user, workout))
+                        for workout in workouts
+                    ],
+                )
+
+    def test_annotate_access_query_count(self):
+        workouts = list(Workout.objects.all())
+        with self.assertNumQueries(3):
+            annotate_access(self.data.member, workouts)
+
+    def test_featured_workouts_are_distinct_and_annotated(self):
+        featured = get_featured_workouts(self.data.member)
+        self.assertEqual(len(featured), 6)
+        self.assertEqual(len({workout.id for workout in featured}), 6)
+        self.assertTrue(all(hasattr(workout, 'has_access') for workout in featured))
+
+    def test_deleted_workout_is_skipped(self):
+        get_featured_workout_ids()
+        Workout.objects.filter(id=self.data.workout.id).delete()
+        featured = get_featured_workouts(self.data.member, count=12)
+        self.assertNotIn(self.data.workout.id, [workout.id for workout in featured])
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class WorkoutPopularityTests(TestCase):
+    """workouts.popularity: stored counters match the source rows"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.data = seed_gym_data(members=6, workouts=12, classes=2, days=3)
+
+    def test_counters_match_source_rows(self):
+        old = UserWorkoutCompletion.objects.create(user=self.data.member, workout=self.data.workout)
+        UserWorkoutCompletion.objects.filter(id=old.id).update(completed_at=timezone.now() - timedelta(days=20))
+        refresh_workout_stats()
+
+        for workout in Workout.objects.select_related('stats'):
+            completions = workout.completions.all()
+            with self.subTest(workout=workout.title):
+                self.assertEqual(workout.stats.completions_total, completions.count())
+                self.assertEqual(
+                    workout.stats.completions_7d,
+                    completions.filter(completed_at__gte=timezone.now() - timedelta(days=7)).count(),
+                )
+                self.assertEqual(workout.stats.distinct_users, completions.values('user').distinct().count())
+                self.assertEqual(workout.stats.plan_inclusions, workout.plans.count())
+                self.assertEqual(workout.stats.trainer_assignments, workout.trainer_assignments.count())
+
+    def test_refresh_updates_existing_rows(self):
+        refresh_workout_stats()
+        before = WorkoutStats.objects.get(workout=self.data.workout).completions_total
+        UserWorkoutCompletion.objects.create(user=self.data.staff, workout=self.data.workout)
+        self.assertEqual(refresh_workout_stats(), Workout.objects.count())
+        self.assertEqual(WorkoutStats.objects.get(workout=self.data.workout).completions_total, before + 1)
+
+    def test_library_lists_most_popular_first(self):
+        refresh_workout_stats()
+        ordered = list(by_popularity(Workout.objects.all()).values_list('stats__popularity', flat=True))
+        self.assertEqual(ordered, sorted(ordered, reverse=True))
+
+    def test_trending_is_ordered_by_recent_completions(self):
+        trending = get_trending_workouts(self.data.member)
+        counts = [workout.stats.completions_7d for workout in trending]
+        self.assertTrue(counts)
+        self.assertEqual(counts, sorted(counts, reverse=True))
+
+
+class CoCompletionMathTests(SimpleTestCase):
+    """workouts.recommendations matrix helpers on a hand-checked example"""
+
+    def test_counts_and_neighbors(self):
+        # Members 1 and 2 did workouts 0 and 1; member 3 did 1 and 2; member 4 only 2
+        users = np.array([1, 1, 2, 2, 3, 3, 4])
+        items = np.array([0, 1, 0, 1, 1, 2, 2])
+        counts = co_completion_counts(users, items, 3, block_size=2)
+        np.testing.assert_array_equal(counts, [[2, 2, 0], [2, 3, 1], [0, 1, 2]])
+
+        neighbors = top_neighbors(counts, k=2, min_common=1)
+        self.assertEqual([column for column, _ in neighbors[0]], [1])
+        self.assertEqual([column for column, _ in neighbors[1]], [0, 2])
+        self.assertAlmostEqual(neighbors[0][0][1], 2 / np.sqrt(6), places=4)
+
+    def test_min_common_members_drops_rare_pairs(self):
+        counts = co_completion_counts(np.array([1, 1]), np.array([0, 1]), 2)
+        self.assertEqual(top_neighbors(counts, k=1, min_common=2), [[], []])
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class RecommendationTests(TestCase):
+    """Per-member recommendations from stored neighbours"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.data = seed_gym_data(members=6, workouts=12, classes=2, days=3)
+
+    def setUp(self):
+        self.free = list(Workout.objects.filter(is_free=True)[:3])
+        self.members = self.data.members
+        # Everyone who did free[0] also did free[1]
+        for member in self.members[2:]:
+            for workout in self.free[:2]:
+                UserWorkoutCompletion.objects.get_or_create(user=member, workout=workout, completed_on=timezone.localdate())
+        refresh_workout_neighbors()
+
+    def test_recommends_co_completed_workout_not_yet_done(self):
+        member = self.data.staff
+        UserWorkoutCompletion.objects.create(user=member, workout=self.free[0])
+        recommended = get_recommended_workouts(member)
+        self.assertEqual(recommended[0], self.free[1])
+        self.assertNotIn(self.free[0], recommended)
+
+    def test_only_accessible_workouts_are_recommended(self):
+        member = self.data.members[0]  # Cancelled subscription: free workouts only
+        UserWorkoutCompletion.objects.create(user=member, workout=self.free[0])
+        self.assertTrue(all(workout.is_free for workout in get_recommended_workouts(member)))
+
+    def test_no_completions_no_recommendations(self):
+        self.assertEqual(get_recommended_workouts(self.data.staff), [])
+        self.assertEqual(get_recommended_workouts(AnonymousUser()), [])
+
+
+class SimilarityMathTests(SimpleTestCase):
+    """workouts.similarity TF-IDF and top-N helpers"""
+
+    def test_shared_terms_make_workouts_similar(self):
+        documents = [
+            Counter({'kettlebell': 2, 'swing': 1, 'category:strength': 1}),
+            Counter({'kettlebell': 1, 'swing': 2, 'category:strength': 1}),
+            Counter({'yoga': 1, 'flow': 1, 'category:flexibility': 1}),
+            Counter({'yoga': 1, 'stretch': 1, 'category:flexibility': 1}),
+        ]
+        matrix = tfidf_matrix(documents)
+        # Terms in a single workout ('flow', 'stretch') get no column
+        self.assertEqual(matrix.shape, (4, 5))
+
+        similar = top_similar(matrix, n=3, block_size=3)
+        self.assertEqual([row for row, _ in similar[0]], [1])
+        self.assertEqual([row for row, _ in similar[2]], [3])
+        # Unshared terms still count towards the vector length
+        self.assertLess(similar[2][0][1], 1)
+        self.assertAlmostEqual(similar[0][0][1], similar[1][0][1], places=4)
+
+    def test_single_workout_has_no_similar(self):
+        self.assertEqual(top_similar(tfidf_matrix([Counter({'run': 1})])), [[]])
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class SimilarWorkoutsTests(TestCase):
+    """Stored similar-workouts lists and their refresh on staff edits"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.data = seed_gym_data(members=6, workouts=8, classes=2, days=3)
+
+    def test_similar_workouts_share_content(self):
+        workout = self.data.workout
+        similar = get_similar_workouts(self.data.staff, workout, count=3)
+        self.assertTrue(similar)
+        self.assertNotIn(workout, similar)
+        for other in similar:
+            self.assertTrue(workout_terms(workout).keys() & workout_terms(other).keys())
+            self.assertTrue(hasattr(other, 'has_access'))
+
+    def test_staff_edit_refreshes_index(self):
+        workout, other = Workout.objects.exclude(pk=self.data.workout.pk)[:2]
+        self.client.force_login(self.data.staff)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('staff:workout_edit', args=[workout.id]), {
+                'title': f'{other.title} copy',
+                'description': other.description,
+                'video_url': '',
+                'difficulty_level': other.difficulty_level,
+                'sets': 3,
+                'category': other.category,
+                'is_free': 'true',
+            })
+        self.assertEqual(get_similar_workouts(self.data.staff, workout, count=1), [other])
+        # The lists the edited workout now belongs in are patched too
+        self.assertEqual(get_similar_workouts(self.data.staff, other, count=1), [workout])
+
+    def test_update_matches_full_rebuild_for_edited_workout(self):
+        workout = self.data.workout
+        Workout.objects.filter(pk=workout.pk).update(description='Kettlebell swings and goblet squats')
+        self.assertGreaterEqual(update_similar_workouts([workout.id, 0]), 1)
+        updated = WorkoutNeighbors.objects.get(workout=workout).similar
+        refresh_similar_workouts()
+        self.assertEqual(updated, WorkoutNeighbors.objects.get(workout=workout).similar)
+        self.assertEqual(update_similar_workouts([0]), 0)
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class DailyActivityTests(TestCase):
+    """The per-member completion snapshot and the pages sharing it"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.data = seed_gym_data(members=6, workouts=8, classes=2, days=3)
+
+    def setUp(self):
+        cache.clear()
+        self.member = self.data.staff
+        self.workout = self.data.workout
+
+    def test_today_and_week_sets(self):
+        old = UserWorkoutCompletion.objects.create(user=self.member, workout=self.workout)
+        UserWorkoutCompletion.objects.filter(pk=old.pk).update(
+            completed_at=timezone.now() - timedelta(days=8), completed_on=timezone.localdate() - timedelta(days=8),
+        )
+        activity = get_daily_activity(self.member)
+        self.assertFalse(activity.is_completed_this_week(self.workout))
+
+        record_completion(self.member, self.workout)
+        self.assertTrue(activity.is_completed_today(self.workout))
+        self.assertTrue(activity.is_completed_this_week(self.workout))
+        self.assertEqual(activity.active_days_this_week, 1)
+        self.assertEqual([c.workout for c in activity.completions_today], [self.workout])
+
+    def test_snapshot_is_loaded_once_per_user(self):
+        with self.assertNumQueries(1):
+            get_daily_activity(self.member)
+            get_daily_activity(self.member)
+
+    def test_record_completion_once_per_day(self):
+        self.assertIsNotNone(record_completion(self.member, self.workout))
+        self.assertIsNone(record_completion(self.member, self.workout))
+        self.assertEqual(UserWorkoutCompletion.objects.filter(user=self.member, workout=self.workout).count(), 1)
+
+    def test_category_page_queries_do_not_grow_with_workouts(self):
+        self.client.force_login(self.member)
+        url = reverse('workouts:workout_today')
+        category = {'category': self.workout.category}
+
+        def add_workouts(count):
+            Workout.objects.bulk_create([
+                Workout(title=f'Extra {i}', category=self.workout.category, is_free=i % 2 == 0) for i in range(count)
+            ])
+
+        add_workouts(2)
+        with CaptureQueriesContext(connection) as before:
+            self.client.get(url, category)
+        add_workouts(6)
+        with CaptureQueriesContext(connection) as after:
+            response = self.client.get(url, category)
+        self.assertEqual(len(after), len(before))
+        self.assertEqual(
+            len(response.context['free_workouts']) + len(response.context['paid_workouts']),
+            Workout.objects.filter(category=self.workout.category).count(),
+        )
+
+    def test_concurrent_completion_is_ignored(self):
+        activity = get_daily_activity(self.member)
+        # Another request completed it after this one loaded its snapshot
+        UserWorkoutCompletion.objects.create(user=self.member, workout=self.workout)
+        self.assertIsNone(record_completion(self.member, self.workout))
+        self.assertTrue(activity.is_completed_today(self.workout))
+
+    def test_mark_completed_awards_points_once_per_day(self):
+        self.client.force_login(self.member)
+        url = reverse('workouts:mark_completed', args=[self.workout.id])
+        self.client.post(url)
+        self.client.post(url)
+        self.assertEqual(UserWorkoutCompletion.objects.filter(user=self.member, workout=self.workout).count(), 1)
+        self.assertEqual(
+            UserPoints.objects.filter(user=self.member, source='workout', description=f'Completed {self.workout.title}').count(),
+            1,
+        )
+
+
+def _image_zip(**images):
+    """A zip of solid-colour PNGs, e.g. _image_zip(**{'a.png': (2000, 1000)})"""
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w') as archive:
+        for name, size in images.items():
+            image = io.BytesIO()
+            Image.new('RGB', size, 'orange').save(image, 'PNG')
+            archive.writestr(f'images/{name}', image.getvalue())
+    buffer.seek(0)
+    return buffer
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp(), WORKOUT_IMPORT_WORKERS=1)
+class WorkoutImportTests(TestCase):
+    """workouts.importer and the staff upload page"""
+
+    CSV = (
+        'title,description,category,difficulty,sets,is_free,thumbnail\n'
+        'Goblet Squat,Hold a kettlebell at the chest,Legs,2,3,false,squat.png\n'
+        'Plank,"Hold a straight line,\nbreathe",abs,1,3,true,\n'
+        ',No title,abs,1,3,true,\n'
+        'Burpee,Jump,nowhere,5,3,maybe,\n'
+        'Lunge,Step forward,legs,1,3,true,missing.png\n'
+    )
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(settings.MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def run_import(self, content=CSV, file_format='csv', **kwargs):
+        kwargs.setdefault('thumbnails', _image_zip(**{'squat.png': (2000, 1000)}))
+        kwargs.setdefault('workers', 1)
+        return import_workouts(io.BytesIO(content.encode()), file_format, **kwargs)
+
+    def test_valid_rows_are_created_and_bad_rows_reported(self):
+        result = self.run_import()
+        self.assertEqual((result.rows, result.created, result.error_count), (5, 2, 3))
+        self.assertEqual([line for line, _ in result.errors], [5, 6, 7])
+        self.assertIn('title', result.errors[0][1])
+        self.assertIn('is_free', result.errors[1][1])
+        self.assertIn('category', result.errors[1][1])
+        self.assertIn('missing.png', result.errors[2][1])
+
+        squat = Workout.objects.get(title='Goblet Squat')
+        self.assertEqual((squat.category, squat.difficulty_level, squat.is_free), ('legs', '2', False))
+        with Image.open(squat.thumbnail.path) as thumbnail:
+            self.assertEqual(thumbnail.size, (800, 400))
+        self.assertEqual(Workout.objects.get(title='Plank').description, 'Hold a straight line,\nbreathe')
+        # bulk_create skips signals; the import refreshes the similar index itself
+        self.assertTrue(WorkoutNeighbors.objects.filter(workout=squat).exists())
+
+    def test_reimport_skips_existing_workouts(self):
+        self.run_import()
+        result = self.run_import()
+        self.assertEqual((result.created, result.skipped), (0, 2))
+
+    def test_dry_run_creates_nothing(self):
+        result = self.run_import(dry_run=True)
+        self.assertEqual(result.created, 2)
+        self.assertFalse(Workout.objects.exists())
+
+    def test_jsonl_in_chunks_with_process_pool(self):
+        lines = [
+            json.dumps({'title': f'Row {i}', 'description': 'Imported', 'category': 'cardio', 'thumbnail': 'squat.png'})
+            for i in range(5)
+        ]
+        lines.insert(2, '{not json')
+        result = self.run_import('\n'.join(lines), 'jsonl', chunk_size=2, workers=2)
+        self.assertEqual((result.created, result.error_count), (5, 1))
+        self.assertEqual(result.errors[0][0], 3)
+        self.assertEqual(Workout.objects.exclude(thumbnail='').count(), 5)
+
+    def test_staff_upload_page(self):
+        staff = get_user_model().objects.create_user('staff', 'staff@example.com', 'password', is_staff=True)
+        self.client.force_login(staff)
+        upload = SimpleUploadedFile('workouts.csv', self.CSV.encode(), content_type='text/csv')
+        thumbnails = SimpleUploadedFile('thumbnails.zip', _image_zip(**{'squat.png': (300, 300)}).getvalue())
+        with self.captureOnCommitCallbacks() as callbacks:
+            response = self.client.post(reverse('staff:workout_import'), {'file': upload, 'thumbnails': thumbnails})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['result'].created, 2)
+        self.assertContains(response, 'missing.png')
+
+        # Only the imported workouts' lists are computed, once the import is committed
+        self.assertFalse(WorkoutNeighbors.objects.exists())
+        for callback in callbacks:
+            callback()
+        self.assertEqual(
+            set(WorkoutNeighbors.objects.values_list('workout__title', flat=True)), {'Goblet Squat', 'Plank'},
+        )
+
+    def test_oversized_thumbnail_is_not_read(self):
+        with mock.patch('workouts.importer.MAX_THUMBNAIL_BYTES', 100):
+            result = self.run_import()
+        self.assertEqual(result.created, 1)
+        self.assertIn('images can be up to 0 MB', dict(result.errors)[2])
+        self.assertFalse(Workout.objects.filter(title='Goblet Squat').exists())
+
+    def test_unsupported_file_type(self):
+        with self.assertRaises(ValueError):
+            file_format_for('workouts.xlsx')
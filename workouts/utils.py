@@ -107,3 +107,62 @@ def can_view_workout_details(user, workout):
     # For paid workouts, check if user has access
     return user_has_access_to_workout(user, workout)
 
+
+
+def workout_access_scope(user):
+    """
+    What paid workouts an authenticated user can open: ('all', None) for
+    trainers, else ('plan', id of their active plan or None).
+
+    Remembered on the user, so several lists (and the page's ETag) on one
+    page look it up once.
+    """
+    from core.models import Subscription
+
+    if not hasattr(user, '_workout_access_scope'):
+        if hasattr(user, 'trainer_profile'):
+            user._workout_access_scope = ('all', None)
+        else:
+            user._workout_access_scope = ('plan', Subscription.objects.filter(
+                user=user,
+                status='active',
+                current_period_end__gte=timezone.now()
+            ).values_list('plan_id', flat=True).first())
+    return user._workout_access_scope
+
+
+def annotate_access(user, workouts):
+    """
+    Set `has_access` and `can_view_details` on every workout in bulk.
+
+    Same rules as user_has_access_to_workout, but resolved with at most three
+    queries for the whole list instead of up to six per workout.
+
+    Args:
+        user: CustomUser instance (can be AnonymousUser)
+        workouts: Iterable of Workout instances
+
+    Returns:
+        list: The workouts, annotated
+    """
+    from .models import Workout
+
+    workouts = list(workouts)
+    paid_ids = [workout.id for workout in workouts if not workout.is_free]
+    full_access = False
+    plan_workout_ids = set()
+
+    if paid_ids and user.is_authenticated:
+        scope, plan_id = workout_access_scope(user)
+
+        if scope == 'all':
+            full_access = True
+        elif plan_id:
+            plan_workout_ids = set(
+                Workout.objects.filter(id__in=paid_ids, membership_plans=plan_id).values_list('id', flat=True)
+            )
+
+    for workout in workouts:
+        workout.has_access = workout.is_free or full_access or workout.id in plan_workout_ids
+        workout.can_view_details = workout.has_access
+    return workouts
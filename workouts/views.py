@@ -1,18 +1,37 @@
 from django.shortcuts import render, redirect, get_object_or_404, reverse
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
+from django.db import transaction
 from django.db.models import Q
-from django.utils import timezone
 from datetime import date
+from .activity import get_daily_activity, record_completion
 from .models import Workout, UserWorkoutCompletion
-from .utils import user_has_access_to_workout, get_accessible_workouts, can_view_workout_details
+from .popularity import by_popularity, get_trending_workouts
+from .recommendations import get_recommended_workouts
+from .similarity import get_similar_workouts
+from .utils import annotate_access, user_has_access_to_workout, get_accessible_workouts, can_view_workout_details
+from core.conditional import access_key, conditional_page
+from core.page_cache import cache_anonymous_page, get_page_versions
 from core.utils import award_points_and_update_streak
 
 
+def _library_fingerprint(request):
+    return get_page_versions(['workouts', 'plans']), access_key(request.user)
+
+
+def _workout_detail_fingerprint(request, workout_id):
+    completions = 0
+    if request.user.is_authenticated:
+        completions = UserWorkoutCompletion.objects.filter(user=request.user, workout_id=workout_id).count()
+    return get_page_versions(['workouts', 'plans']), access_key(request.user), completions
+
+
+@conditional_page(_library_fingerprint)
+@cache_anonymous_page('workouts')
 def library(request):
     """Workout library"""
-    # Get all workouts for filtering, but we'll check access per workout
-    all_workouts = Workout.objects.all()
+    # Get all workouts for filtering, most popular first; access is checked for the whole list
+    all_workouts = by_popularity(Workout.objects.all())
     
     # Filtering
     category = request.GET.get('category')
@@ -30,13 +49,11 @@ def library(request):
     free_workouts = []
     premium_workouts = []
     
-    for workout in all_workouts:
-        has_access = user_has_access_to_workout(request.user, workout)
-        can_view_details = can_view_workout_details(request.user, workout)
+    for workout in annotate_access(request.user, all_workouts):
         workout_data = {
             'workout': workout,
-            'has_access': has_access,
-            'can_view_details': can_view_details
+            'has_access': workout.has_access,
+            'can_view_details': workout.can_view_details
         }
         
         if workout.is_free:
@@ -56,6 +73,7 @@ def library(request):
     return render(request, 'workouts/library.html', context)
 
 
+@conditional_page(_workout_detail_fingerprint)
 def workout_detail(request, workout_id):
     """Workout detail page"""
     workout = get_object_or_404(Workout, id=workout_id)
@@ -64,19 +82,15 @@ def workout_detail(request, workout_id):
     has_access = user_has_access_to_workout(request.user, workout)
     can_view_details = can_view_workout_details(request.user, workout)
     
-    # Check if user has completed this workout
-    completed = False
-    if request.user.is_authenticated:
-        completed = UserWorkoutCompletion.objects.filter(
-            user=request.user,
-            workout=workout
-        ).exists()
+    # Check if user has completed this workout today
+    completed = get_daily_activity(request.user).is_completed_today(workout)
     
     context = {
         'workout': workout,
         'completed': completed,
         'has_access': has_access,
         'can_view_details': can_view_details,
+        'similar_workouts': get_similar_workouts(request.user, workout),
     }
     return render(request, 'workouts/workout_detail.html', context)
 
@@ -85,30 +99,23 @@ def workout_detail(request, workout_id):
 def workout_today(request):
     """What workout will you be doing today? - Category-based workout selection"""
     category = request.GET.get('category')
-    today = timezone.now().date()
-    
-    # Get today's completed workouts
-    completed_today = UserWorkoutCompletion.objects.filter(
-        user=request.user,
-        completed_at__date=today
-    ).select_related('workout')
     
     if category:
-        # Get workouts for selected category
-        workouts = Workout.objects.filter(category=category)
+        activity = get_daily_activity(request.user)
+        # Get workouts for selected category, most popular first
+        workouts = annotate_access(request.user, by_popularity(Workout.objects.filter(category=category)))
         
         # Separate free and paid workouts
         free_workouts = []
         paid_workouts = []
         
         for workout in workouts:
-            has_access = user_has_access_to_workout(request.user, workout)
-            can_view_details = can_view_workout_details(request.user, workout)
             workout_data = {
                 'workout': workout,
-                'has_access': has_access,
-                'can_view_details': can_view_details,
-                'completed_today': completed_today.filter(workout=workout).exists()
+                'has_access': workout.has_access,
+                'can_view_details': workout.can_view_details,
+                'completed_today': activity.is_completed_today(workout),
+                'completed_this_week': activity.is_completed_this_week(workout),
             }
             
             if workout.is_free:
@@ -121,14 +128,16 @@ def workout_today(request):
             'category_name': dict(Workout.CATEGORY_CHOICES).get(category, category),
             'free_workouts': free_workouts,
             'paid_workouts': paid_workouts,
-            'completed_today': completed_today,
+            'activity': activity,
+            'completed_today': activity.completions_today,
             'categories': Workout.CATEGORY_CHOICES,
         }
     else:
-        # Show category selection
+        # Show category selection, with this week's most done workouts
         context = {
             'categories': Workout.CATEGORY_CHOICES,
-            'completed_today': completed_today,
+            'trending_workouts': get_trending_workouts(request.user),
+            'recommended_workouts': get_recommended_workouts(request.user),
         }
     
     return render(request, 'workouts/workout_today.html', context)
@@ -148,27 +157,18 @@ def mark_completed(request, workout_id):
             return HttpResponseRedirect(f"{reverse('workouts:workout_today')}?category={workout.category}")
         return redirect('workouts:workout_detail', workout_id=workout_id)
     
-    # Create completion record (only once per day)
-    today = timezone.now().date()
-    created = UserWorkoutCompletion.objects.filter(
-        user=request.user,
-        workout=workout,
-        completed_at__date=today
-    ).exists()
-    
-    if not created:
-        UserWorkoutCompletion.objects.create(
-            user=request.user,
-            workout=workout
-        )
-        
-        # Award points and update streak
-        award_points_and_update_streak(
-            request.user,
-            points=10,
-            source='workout',
-            description=f'Completed {workout.title}'
-        )
+    # Create completion record (only once per day); points only for a new one
+    with transaction.atomic():
+        completion = record_completion(request.user, workout)
+        if completion:
+            # Award points and update streak
+            award_points_and_update_streak(
+                request.user,
+                points=10,
+                source='workout',
+                description=f'Completed {workout.title}'
+            )
+    if completion:
         messages.success(request, f'Congratulations! You completed {workout.title}.')
     else:
         messages.info(request, f'You have already completed {workout.title} today.')